@@ -2,6 +2,8 @@ from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from stockease.testing import Budget, QueryBudgetMixin
 from .models import User
 from .utils.redis_utils import store_user_data, get_user_data
 import json
@@ -56,7 +58,7 @@ class AccountsAPITestCase(TestCase):
         
         response = self.client.post(reverse('signup'), signup_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn('email', response.data)
+        self.assertEqual(response.json(), {'email': ['user with this email already exists.']})
         
         # Verify email was not sent
         mock_send_email.assert_not_called()
@@ -297,3 +299,73 @@ class AccountsAPITestCase(TestCase):
         # Try to access other user's profile
         response = self.client.get(reverse('user_details', args=[other_user.id]))
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+# Most queries and Redis commands each account endpoint may make, counting
+# the JWT user lookup on authenticated endpoints
+ACCOUNT_QUERY_BUDGETS = {
+    'signup': Budget(queries=1, redis_commands=1),
+    'verify-otp': Budget(queries=2, redis_commands=2),
+    'login': Budget(queries=2, redis_commands=0),
+    'token-refresh': Budget(queries=2, redis_commands=0),
+    # Blacklisting looks up the outstanding token, then creates its blacklist entry
+    'logout': Budget(queries=8, redis_commands=0),
+    'update-email': Budget(queries=3, redis_commands=0),
+    'change-password': Budget(queries=2, redis_commands=0),
+    'user-details': Budget(queries=2, redis_commands=0),
+    'user-list': Budget(queries=3, redis_commands=0),
+}
+
+
+class AccountsQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    """Test suite holding each account endpoint to its query and Redis command budget."""
+
+    query_budgets = ACCOUNT_QUERY_BUDGETS
+
+    def setUp(self):
+        """Set up a user and a client authenticated with a JWT."""
+        self.user = User.objects.create_user(email='budget@example.com', password='budgetpassword123')
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+
+    def request(self, name, method, url, data=None, client=None):
+        """Make a request within the named budget."""
+        with self.assertWithinBudget(name):
+            response = getattr(client or self.client, method)(url, data, format='json')
+        self.assertLess(response.status_code, 400, name)
+        return response
+
+    @patch('accounts.views.send_otp_email')
+    def test_signup_budget(self, mock_send_email):
+        """Test signing up and verifying the OTP."""
+        response = self.request('signup', 'post', reverse('signup'), {
+            'email': 'new@example.com', 'password': 'newpassword123', 'password2': 'newpassword123'
+        }, client=APIClient())
+        otp = mock_send_email.call_args[0][1]
+        self.request('verify-otp', 'post', reverse('verify_otp'), {
+            'token': response.data['token'], 'otp': otp
+        }, client=APIClient())
+
+    def test_token_budgets(self):
+        """Test logging in, refreshing and logging out."""
+        self.request('login', 'post', reverse('login'), {
+            'email': 'budget@example.com', 'password': 'budgetpassword123'
+        }, client=APIClient())
+        self.request('token-refresh', 'post', reverse('token_refresh'), {'refresh': str(self.refresh)}, client=APIClient())
+        self.request('logout', 'post', reverse('logout'), {'refresh': str(self.refresh)})
+
+    def test_profile_budgets(self):
+        """Test reading and changing the user's profile."""
+        self.request('user-details', 'get', reverse('user_details', args=[self.user.id]))
+        self.request('update-email', 'put', reverse('update_email'), {'email': 'changed@example.com'})
+        self.request('change-password', 'put', reverse('change_password'), {
+            'current_password': 'budgetpassword123', 'new_password': 'changedpassword123',
+            'confirm_password': 'changedpassword123',
+        })
+
+    def test_user_list_budget(self):
+        """Test listing users as an admin."""
+        self.user.is_staff = True
+        self.user.save()
+        self.request('user-list', 'get', reverse('user_list'))
@@ -24,14 +24,8 @@ class UserSignupView(APIView):
         
         email = serializer.validated_data['email']
         password = serializer.validated_data['password']
+        # Taken emails were already rejected by the serializer's unique validator
 
-        if User.objects.filter(email=email).exists():
-            logger.warning(f"Signup attempt with existing email: {email}")
-            return Response(
-                {"email": "User with this email already exists."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
         token, otp = store_user_data(email, password)
         
         send_otp_email(email, otp)
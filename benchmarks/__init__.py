@@ -0,0 +1,16 @@
+"""
+Benchmarks for StockEase.
+
+Each module can be run on its own, e.g. ``python -m benchmarks.cache_hits``,
+with the same environment (.env) as manage.py.
+"""
+import os
+
+
+def setup_django():
+    """
+    Configure Django the way manage.py does so benchmarks can import the apps.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stockease.settings')
+    import django
+    django.setup()
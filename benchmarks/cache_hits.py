@@ -0,0 +1,96 @@
+"""
+Micro-benchmark of the CPU cost of serving a cached product list page.
+
+Compares the previous hit path (decode the cached JSON string and let DRF
+re-render it) with serving the cached, pre-rendered bytes directly.
+
+Usage:
+    python -m benchmarks.cache_hits [--page-size 100] [--iterations 2000]
+"""
+import argparse
+import json
+import time
+
+from benchmarks import setup_django
+
+
+def make_page(page_size):
+    """
+    Build a list page shaped like ProductViewSet.list's paginated response.
+    """
+    results = [
+        {
+            'id': i,
+            'name': f'Benchmark Product {i}',
+            'price': 1000 + i,
+            'quantity': i % 50,
+            'created_at': '2025-03-15T07:12:00.123456Z',
+            'updated_at': '2025-03-16T09:30:00.654321Z',
+        }
+        for i in range(1, page_size + 1)
+    ]
+    return {
+        'count': page_size * 10,
+        'next': 'http://testserver/api/products/?page=2&page_size=%d' % page_size,
+        'previous': None,
+        'page_size': page_size,
+        'results': results,
+    }
+
+
+def render(response, renderer):
+    """
+    Negotiate plain JSON on a response and return its body, as DRF would.
+    """
+    response.accepted_renderer = renderer
+    response.accepted_media_type = renderer.media_type
+    response.renderer_context = {}
+    return response.rendered_content
+
+
+def measure(label, hit, iterations):
+    """
+    Time iterations calls of hit, returning CPU microseconds per call.
+    """
+    hit()  # warm up
+    start = time.process_time()
+    for _ in range(iterations):
+        hit()
+    per_hit = (time.process_time() - start) / iterations * 1e6
+    print(f"{label:<28} {per_hit:10.1f} us/hit")
+    return per_hit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.response import Response
+    from inventory.responses import PrerenderedJSONResponse, render_json
+
+    renderer = JSONRenderer()
+    page = make_page(args.page_size)
+    cached_string = json.dumps(page)
+    cached_bytes = render_json(page)
+    assert render(PrerenderedJSONResponse(cached_bytes), renderer) == render(Response(page), renderer)
+
+    print(f"page_size={args.page_size}, {len(cached_bytes)} bytes per page, {args.iterations} iterations")
+    before = measure(
+        'json.loads + DRF render',
+        lambda: render(Response(json.loads(cached_string)), renderer),
+        args.iterations
+    )
+    after = measure(
+        'pre-rendered bytes',
+        lambda: render(PrerenderedJSONResponse(cached_bytes), renderer),
+        args.iterations
+    )
+    print(f"{'saving':<28} {before - after:10.1f} us/hit ({(1 - after / before) * 100:.0f}%)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+"""
+Load benchmark of the API endpoints on one machine.
+
+Creates a throwaway test database, seeds --users users with --products
+products each, then drives the real URLconf through Django's test client
+from --clients concurrent threads, one endpoint at a time. For each
+endpoint it reports latency percentiles, requests/s, database queries per
+request and product cache hits as JSON, so runs can be diffed between
+commits.
+
+The product and OTP caches use an in-process fakeredis server (pip install
+fakeredis), or with --redis-url a local Redis, which is flushed.
+
+Usage:
+    python -m benchmarks.load [--users 10] [--products 1000] [--clients 8] [--requests 400]
+        [--warmup 0] [--endpoints list,retrieve,...] [--redis-url redis://localhost:6379]
+        [--output results.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+from benchmarks import setup_django
+
+PASSWORD = 'benchmark-password'
+PRODUCT_CACHE_DB = 1
+
+
+def login(user, rng):
+    return 'post', '/api/auth/login/', {'email': user.email, 'password': PASSWORD}
+
+
+def list_products(user, rng):
+    return 'get', '/api/products/', {'page': rng.randint(1, 5)}
+
+
+def search_products(user, rng):
+    return 'get', '/api/products/', {'search': f'product {rng.randint(1, 99)}'}
+
+
+def retrieve_product(user, rng):
+    return 'get', f'/api/products/{rng.choice(user.product_ids)}/', None
+
+
+def summary(user, rng):
+    return 'get', '/api/products/summary/', None
+
+
+def low_stock(user, rng):
+    return 'get', '/api/products/low-stock/', None
+
+
+def changes(user, rng):
+    return 'get', '/api/products/changes/', {'limit': 100}
+
+
+def create_product(user, rng):
+    return 'post', '/api/products/', {
+        'name': f'Load {uuid.uuid4().hex}', 'price': rng.randint(100, 100000), 'quantity': rng.randint(0, 200),
+    }
+
+
+# Endpoints by name, each building a (method, path, data) request for a user
+ENDPOINTS = {
+    'login': login,
+    'list': list_products,
+    'search': search_products,
+    'retrieve': retrieve_product,
+    'summary': summary,
+    'low_stock': low_stock,
+    'changes': changes,
+    'create': create_product,
+}
+
+
+def configure_redis(settings, redis_url):
+    """
+    Point the Redis caches at redis_url, or at an in-process fake server.
+    """
+    if redis_url:
+        settings.CACHES['otp_cache']['LOCATION'] = redis_url
+        settings.CACHES['product_cache']['LOCATION'] = f'{redis_url}/{PRODUCT_CACHE_DB}'
+        return
+    try:
+        import fakeredis
+    except ImportError:
+        sys.exit('fakeredis is not installed: pip install fakeredis, or pass --redis-url.')
+    import redis.asyncio
+
+    server = fakeredis.FakeServer()
+    for alias in ('otp_cache', 'product_cache'):
+        settings.CACHES[alias]['OPTIONS']['CONNECTION_POOL_KWARGS'] = {
+            'connection_class': fakeredis.FakeConnection, 'server': server,
+        }
+    # The async read views connect with redis.asyncio
+    redis.asyncio.Redis.from_url = classmethod(
+        lambda cls, url, **kwargs: fakeredis.FakeAsyncRedis(server=server, db=PRODUCT_CACHE_DB)
+    )
+
+
+def seed(users, products, rng):
+    """
+    Create users with products, their inventory summaries and access tokens.
+
+    Returns:
+        list: The users, each with product_ids and token attributes
+    """
+    from django.contrib.auth.hashers import make_password
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from accounts.models import User
+    from inventory.models import InventorySummary, Product, normalize_product_name
+
+    password = make_password(PASSWORD)
+    seeded = User.objects.bulk_create(
+        User(email=f'load{i}@example.com', password=password) for i in range(users)
+    )
+    for user in seeded:
+        Product.objects.bulk_create(
+            (
+                Product(
+                    user=user, name=f'Product {j}', normalized_name=normalize_product_name(f'Product {j}'),
+                    price=rng.randint(100, 100000), quantity=rng.randint(0, 200),
+                )
+                for j in range(products)
+            ),
+            batch_size=5000,
+        )
+        user.product_ids = list(Product.objects.filter(user=user).values_list('id', flat=True))
+        user.token = str(RefreshToken.for_user(user).access_token)
+        InventorySummary.objects.rebuild(user.id)
+    return seeded
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of sorted values.
+    """
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))]
+
+
+def format_stat(value, width):
+    """
+    Format a latency or mean for the summary, or '-' when nothing was measured.
+    """
+    if value is None:
+        return '-'.rjust(width)
+    return f"{value:{width}.2f}"
+
+
+def run_endpoint(name, users, clients, requests, warmup, seed_value):
+    """
+    Send requests requests to one endpoint from clients threads.
+
+    Returns:
+        dict: Throughput, latency, status, query and cache statistics
+    """
+    from django.db import connection
+    from django.test import Client
+    from inventory.utils.cache_utils import get_cache_stats
+
+    make_request = ENDPOINTS[name]
+    latencies = []
+    queries = []
+    statuses = {}
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(clients + 1)
+
+    def send(client, rng, measured):
+        user = rng.choice(users)
+        method, path, data = make_request(user, rng)
+        kwargs = {'HTTP_AUTHORIZATION': f'Bearer {user.token}'}
+        if method == 'post':
+            kwargs['content_type'] = 'application/json'
+        count = [0]
+
+        def count_query(execute, sql, params, many, context):
+            count[0] += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            started = time.perf_counter()
+            response = getattr(client, method)(path, data, **kwargs)
+            elapsed = time.perf_counter() - started
+        if measured:
+            with lock:
+                latencies.append(elapsed)
+                queries.append(count[0])
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    def worker(index):
+        rng = random.Random(f'{seed_value}:{name}:{index}')
+        client = Client(raise_request_exception=False)
+        share = requests // clients + (index < requests % clients)
+        try:
+            for _ in range(warmup // clients):
+                send(client, rng, False)
+            start_barrier.wait()
+            for _ in range(share):
+                send(client, rng, True)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    cache_before = get_cache_stats()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    cache_after = get_cache_stats()
+
+    latencies.sort()
+    cache = {}
+    for tier in ('l1', 'l2'):
+        hits = cache_after[tier]['hits'] - cache_before[tier]['hits']
+        misses = cache_after[tier]['misses'] - cache_before[tier]['misses']
+        cache[tier] = {
+            'hits': hits, 'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    return {
+        'requests': len(latencies),
+        'errors': sum(count for status, count in statuses.items() if status >= 400),
+        'statuses': {str(status): statuses[status] for status in sorted(statuses)},
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            label: round(percentile(latencies, pct) * 1000, 3) if latencies else None
+            for label, pct in (('p50', 50), ('p95', 95), ('p99', 99), ('max', 100))
+        },
+        'queries_per_request': {
+            'mean': round(sum(queries) / len(queries), 2) if queries else None,
+            'max': max(queries, default=None),
+        },
+        'cache': cache,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--products', type=int, default=1000, help='Products per user')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent client threads')
+    parser.add_argument('--requests', type=int, default=400, help='Measured requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=0, help='Unmeasured requests per endpoint, sent first')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help='Comma-separated endpoints to run')
+    parser.add_argument('--redis-url', help='Scratch Redis to use instead of fakeredis; it is flushed')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the JSON results here instead of stdout')
+    args = parser.parse_args()
+    endpoints = [name.strip() for name in args.endpoints.split(',') if name.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stockease.settings')
+    from django.conf import settings
+    configure_redis(settings, args.redis_url)
+    setup_django()
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from django_redis import get_redis_connection
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        for alias in ('otp_cache', 'product_cache'):
+            get_redis_connection(alias).flushdb()
+        rng = random.Random(args.seed)
+        print(f"Seeding {args.users} users x {args.products} products", file=sys.stderr)
+        users = seed(args.users, args.products, rng)
+
+        results = {}
+        for name in endpoints:
+            results[name] = run_endpoint(name, users, args.clients, args.requests, args.warmup, args.seed)
+            latency = results[name]['latency_ms']
+            print(
+                f"{name:<10} {results[name]['requests_per_second']:10,.1f} req/s  "
+                f"p50 {format_stat(latency['p50'], 8)} ms  p95 {format_stat(latency['p95'], 8)} ms  "
+                f"p99 {format_stat(latency['p99'], 8)} ms  "
+                f"{format_stat(results[name]['queries_per_request']['mean'], 6)} queries  "
+                f"{results[name]['errors']} errors",
+                file=sys.stderr,
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    report = json.dumps({
+        'config': {
+            'users': args.users, 'products': args.products, 'clients': args.clients,
+            'requests': args.requests, 'warmup': args.warmup, 'seed': args.seed,
+            'redis': 'redis' if args.redis_url else 'fakeredis',
+            'database': connection.vendor,
+            'async_reads': settings.PRODUCT_ASYNC_READS,
+        },
+        'endpoints': results,
+    }, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
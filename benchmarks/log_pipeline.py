@@ -0,0 +1,129 @@
+"""
+Benchmark of request throughput under each logging mode.
+
+Serves cached product detail requests through ProductViewSet while the
+app's loggers write to a log file, first directly from the request thread,
+then through the background queue, then queued with inventory.cache
+sampled. --write-delay-us adds a pause to every write, standing in for a
+console whose reader (e.g. a container log driver) can't keep up. Needs
+the product cache's Redis, but no database.
+
+Usage:
+    python -m benchmarks.log_pipeline [--requests 5000] [--sample-rate 0.01] [--write-delay-us 0]
+        [--log-file PATH]
+"""
+import argparse
+import copy
+import logging.config
+import os
+import tempfile
+import time
+
+from benchmarks import setup_django
+
+BENCHMARK_USER_ID = 999_999_999
+BENCHMARK_PRODUCT_ID = 1
+
+
+class SlowFileHandler(logging.FileHandler):
+    """
+    File handler taking an extra delay_us microseconds per record.
+    """
+    def __init__(self, filename, delay_us=0):
+        super().__init__(filename)
+        self.delay = delay_us / 1e6
+
+    def emit(self, record):
+        if self.delay:
+            time.sleep(self.delay)
+        super().emit(record)
+
+
+def configure(log_file, queued, sample_rate, delay_us):
+    """
+    Apply the app's LOGGING with the console handler writing to log_file.
+
+    Returns:
+        list: The QueueListeners started for queued mode
+    """
+    from django.conf import settings
+    from stockease.logging_utils import queue_handlers
+
+    config = copy.deepcopy(settings.LOGGING)
+    config['handlers']['console'] = {
+        '()': SlowFileHandler,
+        'level': 'DEBUG',
+        'filename': log_file,
+        'delay_us': delay_us,
+        'formatter': 'json',
+    }
+    config['filters']['cache_sampling']['rate'] = sample_rate
+    logging.config.dictConfig(config)
+    return queue_handlers(list(config['loggers'])) if queued else []
+
+
+def measure(label, serve, requests):
+    """
+    Serve requests requests, returning requests per wall-clock second.
+    """
+    serve()  # warm up
+    start = time.perf_counter()
+    for _ in range(requests):
+        serve()
+    rate = requests / (time.perf_counter() - start)
+    print(f"{label:<40} {rate:12,.0f} req/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--sample-rate', type=float, default=0.01)
+    parser.add_argument('--write-delay-us', type=int, default=0)
+    parser.add_argument('--log-file', help='File the logs are written to (default: a temporary file)')
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.test import APIRequestFactory, force_authenticate
+    from accounts.models import User
+    from inventory.responses import render_json
+    from inventory.utils.cache_utils import get_cache_key, invalidate_product_cache, set_cache_entry
+    from inventory.views import ProductViewSet
+
+    user = User(id=BENCHMARK_USER_ID, email='benchmark@example.com')
+    cache_key = get_cache_key(user.id, BENCHMARK_PRODUCT_ID)
+    set_cache_entry(cache_key, render_json({
+        'id': BENCHMARK_PRODUCT_ID, 'name': 'Benchmark Product', 'price': 1000, 'quantity': 5,
+        'created_at': '2025-03-15T07:12:00.123456Z', 'updated_at': '2025-03-16T09:30:00.654321Z',
+    }))
+    view = ProductViewSet.as_view({'get': 'retrieve'})
+    request_factory = APIRequestFactory()
+
+    def serve():
+        request = request_factory.get(f'/api/products/{BENCHMARK_PRODUCT_ID}/')
+        force_authenticate(request, user=user)
+        return view(request, pk=BENCHMARK_PRODUCT_ID).render()
+
+    log_file = args.log_file or os.path.join(tempfile.mkdtemp(), 'benchmark.log')
+    modes = [
+        ('sync handlers', False, 1.0),
+        ('queued', True, 1.0),
+        (f'queued, cache sampled at {args.sample_rate:g}', True, args.sample_rate),
+    ]
+    print(f"{args.requests} cached product requests, logging to {log_file} (+{args.write_delay_us} us/write)")
+    try:
+        rates = []
+        for label, queued, sample_rate in modes:
+            listeners = configure(log_file, queued, sample_rate, args.write_delay_us)
+            rates.append(measure(label, serve, args.requests))
+            # Let the backlog drain before the next mode
+            for listener in listeners:
+                listener.queue.join()
+    finally:
+        invalidate_product_cache(user.id, BENCHMARK_PRODUCT_ID)
+    for (label, _, _), rate in zip(modes[1:], rates[1:]):
+        print(f"{'speedup, ' + label:<40} {rate / rates[0]:12.1f}x")
+
+
+if __name__ == '__main__':
+    main()
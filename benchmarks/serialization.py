@@ -0,0 +1,77 @@
+"""
+Micro-benchmark of encoding a product list page on a cache miss.
+
+Compares building model instances and running ProductSerializer with the
+read-only fast path (values() dicts and the precompiled row encoder). Rows
+are fed from memory the way each queryset would hand them over, so the
+numbers exclude database time.
+
+Usage:
+    python -m benchmarks.serialization [--page-size 100] [--iterations 500]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import setup_django
+
+
+def make_rows(page_size):
+    """
+    Build database rows for every column of the products table.
+    """
+    created_at = datetime(2025, 3, 15, 7, 12, 0, 123456, tzinfo=timezone.utc)
+    return [
+        (i, f'Benchmark Product {i}', f'benchmarkproduct{i}', 1000 + i, i % 50, 1,
+         created_at, created_at + timedelta(days=1, seconds=i))
+        for i in range(1, page_size + 1)
+    ]
+
+
+def measure(label, encode, iterations, page_size):
+    """
+    Time iterations calls of encode, returning rows encoded per CPU second.
+    """
+    encode()  # warm up
+    start = time.process_time()
+    for _ in range(iterations):
+        encode()
+    rate = iterations * page_size / (time.process_time() - start)
+    print(f"{label:<32} {rate:12,.0f} rows/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from inventory.models import Product
+    from inventory.responses import render_json
+    from inventory.serializers import ProductSerializer
+    from inventory.utils.row_encoder import PRODUCT_FIELDS, encode_products
+
+    columns = [field.attname for field in Product._meta.concrete_fields]
+    rows = make_rows(args.page_size)
+    selected = [columns.index(name) for name in PRODUCT_FIELDS]
+
+    def serializer_path():
+        products = [Product.from_db('default', columns, row) for row in rows]
+        return render_json(ProductSerializer(products, many=True).data)
+
+    def fast_path():
+        values = [dict(zip(PRODUCT_FIELDS, (row[i] for i in selected))) for row in rows]
+        return render_json(list(encode_products(values)))
+
+    assert serializer_path() == fast_path()
+
+    print(f"page_size={args.page_size}, {args.iterations} iterations")
+    before = measure('ModelSerializer', serializer_path, args.iterations, args.page_size)
+    after = measure('values() + row encoder', fast_path, args.iterations, args.page_size)
+    print(f"{'speedup':<32} {after / before:12.1f}x")
+
+
+if __name__ == '__main__':
+    main()
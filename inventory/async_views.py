@@ -0,0 +1,226 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.paginator import InvalidPage
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import ForcedAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from .responses import PrerenderedJSONResponse, render_json
+from .utils.async_cache_utils import aget_cache_key, aget_or_rebuild
+from .utils.cache_utils import CACHE_MISS, make_etag
+from .utils.row_encoder import encode_products, product_rows
+import logging
+
+# Get regular logger for views
+logger = logging.getLogger('inventory')
+# Get specialized logger for cache operations
+cache_logger = logging.getLogger('inventory.cache')
+
+
+class SyncFallback(Exception):
+    """
+    Raised when a request can't be served by the async path, so the regular
+    ProductViewSet action handles it instead.
+    """
+
+
+async def authenticate(request):
+    """
+    Authenticate a DRF request without blocking the event loop.
+
+    Tokens are validated in place and JWT users loaded with the async ORM.
+    Failures fall back to the sync view, which reports them as usual.
+    """
+    for authenticator in request.authenticators:
+        try:
+            if isinstance(authenticator, ForcedAuthentication):
+                user_auth_tuple = authenticator.authenticate(request)
+            elif type(authenticator) is JWTAuthentication:
+                user_auth_tuple = await authenticate_jwt(authenticator, request)
+            else:
+                raise SyncFallback
+        except (exceptions.APIException, ObjectDoesNotExist, KeyError):
+            raise SyncFallback
+        if user_auth_tuple is not None:
+            request._authenticator = authenticator
+            request.user, request.auth = user_auth_tuple
+            return
+    raise SyncFallback
+
+
+async def authenticate_jwt(authenticator, request):
+    """
+    Async version of JWTAuthentication.authenticate().
+    """
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None
+    validated_token = authenticator.get_validated_token(raw_token)
+    if jwt_settings.CHECK_REVOKE_TOKEN:
+        raise SyncFallback
+    user = await get_user_model().objects.aget(
+        **{jwt_settings.USER_ID_FIELD: validated_token[jwt_settings.USER_ID_CLAIM]}
+    )
+    if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+        raise SyncFallback
+    return user, validated_token
+
+
+async def initial(view, request, args, kwargs):
+    """
+    Prepare the viewset like APIView.dispatch() and initial() do.
+
+    Returns:
+        Request: The DRF request
+
+    Raises:
+        SyncFallback: For anything but an authorized GET negotiating plain JSON
+    """
+    view.args, view.kwargs = args, kwargs
+    request = view.initialize_request(request, *args, **kwargs)
+    view.request = request
+    view.headers = view.default_response_headers
+    if request.method != 'GET' or view.throttle_classes:
+        raise SyncFallback
+
+    view.format_kwarg = view.get_format_suffix(**kwargs)
+    try:
+        renderer, media_type = view.perform_content_negotiation(request)
+    except exceptions.APIException:
+        raise SyncFallback
+    # Only plain JSON is served from the cached bytes as is
+    if type(renderer) is not JSONRenderer or 'indent' in media_type:
+        raise SyncFallback
+    request.accepted_renderer, request.accepted_media_type = renderer, media_type
+
+    await authenticate(request)
+    try:
+        view.check_permissions(request)
+    except exceptions.APIException:
+        raise SyncFallback
+    if not request.user.is_authenticated:
+        raise SyncFallback
+    return request
+
+
+async def list_products(view, request, **kwargs):
+    """
+    Async version of ProductViewSet.list().
+    """
+    user_id = request.user.id
+    try:
+        key_params = view.get_list_key_params(request)
+    except exceptions.ValidationError:
+        raise SyncFallback
+    page, page_size = key_params.get('page', key_params.get('cursor')), key_params['page_size']
+    cache_key = await aget_cache_key(user_id, **key_params)
+
+    etag = make_etag(cache_key, request.accepted_renderer.format)
+    response = view.not_modified(request, etag)
+    if response:
+        cache_logger.info(f"Not modified for list: user {user_id}, page {page}, page_size {page_size}")
+        return response
+
+    def render_page(queryset):
+        # Keyset pages are built by the regular paginator in a worker thread
+        return render_json(view.get_paginated_response(list(encode_products(view.paginate_queryset(queryset)))).data)
+
+    async def build():
+        cache_logger.info(f"Cache MISS for list: user {user_id}, page {page}, page_size {page_size}")
+        queryset = product_rows(view.filter_queryset(view.get_queryset()))
+        if view.use_cursor_pagination():
+            return await sync_to_async(render_page)(queryset)
+
+        paginator = view.paginator
+        size = paginator.get_page_size(request)
+        if not size:
+            return render_json(list(encode_products([row async for row in queryset])))
+        django_paginator = paginator.get_django_paginator(queryset, size, view)
+        number = paginator.get_page_number(request, django_paginator)
+        # Counting may read the inventory summary and checking the page may read
+        # its rows, so both run like any sync ORM call
+        try:
+            paginator.page = await sync_to_async(django_paginator.page)(number)
+        except InvalidPage:
+            # The regular paginator reports the 404
+            raise SyncFallback
+        paginator.request = request
+        rows = [row async for row in paginator.page.object_list]
+        return render_json(paginator.get_paginated_response(list(encode_products(rows))).data)
+
+    cached_data, outcome = await aget_or_rebuild(cache_key, build)
+    if outcome != CACHE_MISS:
+        cache_logger.info(f"Cache {outcome.upper()} for list: user {user_id}, page {page}, page_size {page_size}")
+
+    logger.info(f"Returning paginated response for page {page}")
+    return PrerenderedJSONResponse(cached_data, headers=view.get_cache_headers(etag))
+
+
+async def retrieve_product(view, request, pk=None, **kwargs):
+    """
+    Async version of ProductViewSet.retrieve().
+    """
+    user_id = request.user.id
+    cache_key = await aget_cache_key(user_id, pk)
+
+    async def build():
+        cache_logger.info(f"Cache MISS for product: {pk}")
+        try:
+            row = await product_rows(view.filter_queryset(view.get_queryset())).aget(pk=pk)
+        except (ObjectDoesNotExist, ValueError, TypeError):
+            # The regular view reports the 404
+            raise SyncFallback
+        cache_logger.info(f"Caching product: {pk}")
+        return render_json(next(encode_products([row])))
+
+    cached_data, outcome = await aget_or_rebuild(cache_key, build)
+    if outcome != CACHE_MISS:
+        cache_logger.info(f"Cache {outcome.upper()} for product: {pk}")
+
+    # Detail keys carry no generation, so tag the bytes actually served
+    etag = make_etag(cached_data, request.accepted_renderer.format)
+    response = view.not_modified(request, etag)
+    if response:
+        cache_logger.info(f"Not modified for product: {pk}")
+        return response
+
+    logger.info("Returning response after retrieving product")
+    return PrerenderedJSONResponse(cached_data, headers=view.get_cache_headers(etag))
+
+
+def async_read_view(sync_view, read):
+    """
+    Wrap a router view so its GET requests are served by an async handler.
+
+    Cache hits then cost no thread: Redis is read with redis.asyncio and
+    misses are rebuilt with the async ORM. Other methods and renderers, and
+    requests ending in an error, go to the regular sync view, so responses
+    are the same either way.
+
+    Args:
+        sync_view: A view returned by ProductViewSet.as_view()
+        read: An async handler like list_products, called with the viewset
+            instance, the DRF request and the URL kwargs
+
+    Returns:
+        An async view function
+    """
+    fallback = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        viewset = sync_view.cls(**sync_view.initkwargs)
+        viewset.action_map = sync_view.actions
+        for method, action in sync_view.actions.items():
+            setattr(viewset, method, getattr(viewset, action))
+        try:
+            drf_request = await initial(viewset, request, args, kwargs)
+            response = await read(viewset, drf_request, **kwargs)
+        except SyncFallback:
+            return await fallback(request, *args, **kwargs)
+        return viewset.finalize_response(drf_request, response, *args, **kwargs)
+
+    return csrf_exempt(view)
@@ -0,0 +1,105 @@
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+from .models import normalize_product_name
+
+# Range query parameters and the lookups they apply
+RANGE_FILTERS = {
+    'price_min': 'price__gte',
+    'price_max': 'price__lte',
+    'quantity_min': 'quantity__gte',
+    'quantity_max': 'quantity__lte',
+}
+SEARCH_PARAM = 'search'
+ORDERING_PARAM = 'ordering'
+# Fields clients may sort by; each is backed by a (user, field) index
+ORDERING_FIELDS = ('id', 'price', 'quantity', 'created_at', 'updated_at')
+
+
+def get_product_filters(query_params):
+    """
+    Validate and normalize the product filters in a request's query parameters.
+
+    Equivalent requests produce the same result, so it can be used in cache
+    keys: blank parameters are dropped, numbers are parsed and the search
+    term is normalized like product names.
+
+    Args:
+        query_params: The request's query parameters
+
+    Returns:
+        dict: The active filters, keyed by query parameter
+
+    Raises:
+        ValidationError: If a range bound is not an integer
+    """
+    filters = {}
+    errors = {}
+    for param in RANGE_FILTERS:
+        value = query_params.get(param, '').strip()
+        if not value:
+            continue
+        try:
+            filters[param] = int(value)
+        except ValueError:
+            errors[param] = ['A valid integer is required.']
+    if errors:
+        raise ValidationError(errors)
+
+    search = normalize_product_name(query_params.get(SEARCH_PARAM, ''))
+    if search:
+        filters[SEARCH_PARAM] = search
+
+    ordering = query_params.get(ORDERING_PARAM, '').replace(' ', '')
+    if ordering:
+        filters[ORDERING_PARAM] = ordering
+    return filters
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+    Filter products by ?search= on their name, ignoring case and whitespace.
+
+    Matches are substrings of the normalized name. On PostgreSQL, names
+    similar to the search term (pg_trgm's % operator) also match, so small
+    typos still find the product. Both use the trigram GIN index on
+    normalized_name.
+    """
+    def filter_queryset(self, request, queryset, view):
+        search = get_product_filters(request.query_params).get(SEARCH_PARAM)
+        if not search:
+            return queryset
+        condition = Q(normalized_name__contains=search)
+        if connection.vendor == 'postgresql':
+            condition |= Q(normalized_name__trigram_similar=search)
+        return queryset.filter(condition)
+
+
+class ProductRangeFilter(BaseFilterBackend):
+    """
+    Filter products by ?price_min=, ?price_max=, ?quantity_min= and ?quantity_max=.
+
+    Bounds are inclusive.
+    """
+    def filter_queryset(self, request, queryset, view):
+        filters = get_product_filters(request.query_params)
+        lookups = {RANGE_FILTERS[param]: filters[param] for param in RANGE_FILTERS if param in filters}
+        return queryset.filter(**lookups)
+
+
+class ProductOrderingFilter(OrderingFilter):
+    """
+    Sort products with ?ordering=, e.g. ?ordering=-price,quantity.
+
+    id is appended as a tiebreaker so pages stay stable when sort values repeat.
+    It follows the first field's direction, so single-field sorts are read off
+    the (user, field, id) index in either direction.
+    """
+    ordering_fields = ORDERING_FIELDS
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and not any(field.lstrip('-') == 'id' for field in ordering):
+            ordering = [*ordering, '-id' if ordering[0].startswith('-') else 'id']
+        return ordering
@@ -0,0 +1,69 @@
+import logging
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from inventory.models import ProductImport
+from inventory.utils.import_utils import DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE, ImportFormatError, get_import_summary, open_csv, run_import
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Imports products for a user from a CSV file with name, price and quantity columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the CSV file')
+        parser.add_argument('--user', required=True, help='Email of the user who will own the products')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows per batch')
+        parser.add_argument('--resume', type=int, help='ID of an interrupted import to resume')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(email=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist.")
+
+        if options['resume']:
+            try:
+                product_import = ProductImport.objects.get(id=options['resume'], user=user)
+            except ProductImport.DoesNotExist:
+                raise CommandError(f"Import {options['resume']} does not exist for {user.email}.")
+            if product_import.status == ProductImport.STATUS_COMPLETED:
+                raise CommandError(f"Import {product_import.id} has already completed.")
+        else:
+            if not 1 <= options['batch_size'] <= MAX_BATCH_SIZE:
+                raise CommandError(f"--batch-size must be between 1 and {MAX_BATCH_SIZE}.")
+            product_import = ProductImport.objects.create(
+                user=user,
+                file_name=options['path'][-255:],
+                batch_size=options['batch_size'],
+            )
+
+        with open(options['path'], newline='', encoding='utf-8-sig') as csv_file:
+            try:
+                reader = open_csv(csv_file)
+            except ImportFormatError as e:
+                raise CommandError(str(e))
+
+            self.stdout.write(f"Importing into import {product_import.id} "
+                              f"(resuming after batch {product_import.batches_completed})")
+            try:
+                for progress in run_import(product_import, reader):
+                    self.stdout.write(
+                        f"Batch {progress['batch']}: {progress['imported']} imported, "
+                        f"{progress['rejected']} rejected"
+                    )
+                    for error in progress['errors']:
+                        self.stdout.write(f"  line {error['line']}: {error['errors']}")
+            except Exception as e:
+                raise CommandError(
+                    f"Import {product_import.id} failed: {e}. "
+                    f"Resume with --resume {product_import.id}."
+                )
+
+        summary = get_import_summary(product_import)
+        logger.info(f"Import {product_import.id} completed")
+        self.stdout.write(
+            f"Import {summary['import_id']} completed: {summary['rows_imported']} rows imported, "
+            f"{summary['rows_rejected']} rejected."
+        )
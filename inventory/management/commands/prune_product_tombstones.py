@@ -0,0 +1,28 @@
+import logging
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from inventory.utils.sync_utils import prune_tombstones
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = (
+        'Deletes product tombstones older than PRODUCT_TOMBSTONE_RETENTION_DAYS; '
+        'run it daily, e.g. from cron'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Tombstones deleted per statement (default: 10000)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        deleted = prune_tombstones(options['batch_size'])
+
+        logger.info(f"Pruned {deleted} product tombstones")
+        self.stdout.write(self.style.SUCCESS(
+            f"Pruned {deleted} product tombstones older than {settings.PRODUCT_TOMBSTONE_RETENTION_DAYS} days."
+        ))
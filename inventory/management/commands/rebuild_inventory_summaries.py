@@ -0,0 +1,76 @@
+import logging
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import BigIntegerField, Count, F, Sum
+from inventory.models import InventorySummary, Product
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDS = ('sku_count', 'total_units', 'total_value')
+
+class Command(BaseCommand):
+    help = 'Rebuilds per-user inventory summaries from the products table, or verifies them with --verify'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Email of a single user to process')
+        parser.add_argument('--verify', action='store_true',
+                            help='Only report summaries that differ from the products table')
+
+    def get_expected(self, user_ids):
+        """
+        Aggregate the expected totals of every user in one grouped query.
+        """
+        rows = (
+            Product.objects.filter(user_id__in=user_ids).order_by().values('user_id')
+            .annotate(
+                sku_count=Count('id'),
+                total_units=Sum('quantity'),
+                total_value=Sum(F('price') * F('quantity'), output_field=BigIntegerField()),
+            )
+        )
+        expected = {user_id: dict.fromkeys(SUMMARY_FIELDS, 0) for user_id in user_ids}
+        for row in rows:
+            expected[row['user_id']] = {field: row[field] or 0 for field in SUMMARY_FIELDS}
+        return expected
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.order_by('id')
+        if options['user']:
+            users = users.filter(email=options['user'])
+            if not users.exists():
+                raise CommandError(f"User {options['user']} does not exist.")
+        user_ids = list(users.values_list('id', flat=True))
+
+        if not options['verify']:
+            # Rebuild each user in its own transaction, so live writes aren't blocked for long
+            for user_id in user_ids:
+                InventorySummary.objects.rebuild(user_id)
+            logger.info(f"Rebuilt {len(user_ids)} inventory summaries")
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(user_ids)} inventory summaries."))
+            return
+
+        expected = self.get_expected(user_ids)
+        stored = {
+            summary.user_id: summary
+            for summary in InventorySummary.objects.filter(user_id__in=user_ids)
+        }
+        mismatches = 0
+        for user_id in user_ids:
+            summary = stored.get(user_id)
+            if summary is None:
+                # Built from the products table on first read or write
+                continue
+            actual = {field: getattr(summary, field) for field in SUMMARY_FIELDS}
+            if actual != expected[user_id]:
+                mismatches += 1
+                self.stdout.write(f"User {user_id}: stored {actual}, expected {expected[user_id]}")
+
+        if mismatches:
+            logger.warning(f"{mismatches} inventory summaries differ from the products table")
+            raise CommandError(
+                f"{mismatches} of {len(user_ids)} summaries differ from the products table. "
+                "Run without --verify to rebuild them."
+            )
+        self.stdout.write(self.style.SUCCESS(f"Verified {len(user_ids)} inventory summaries."))
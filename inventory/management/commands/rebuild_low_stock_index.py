@@ -0,0 +1,30 @@
+import logging
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from inventory.utils.low_stock_utils import rebuild_low_stock_index
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Rebuilds the Redis low-stock indexes from the products table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Email of a single user to rebuild')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.order_by('id')
+        if options['user']:
+            users = users.filter(email=options['user'])
+            if not users.exists():
+                raise CommandError(f"User {options['user']} does not exist.")
+
+        rebuilt = 0
+        indexed = 0
+        for user_id in users.values_list('id', flat=True).iterator():
+            indexed += rebuild_low_stock_index(user_id)
+            rebuilt += 1
+
+        logger.info(f"Rebuilt {rebuilt} low-stock indexes")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} low-stock indexes ({indexed} products)."))
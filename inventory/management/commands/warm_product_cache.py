@@ -0,0 +1,157 @@
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from inventory.models import Product
+from inventory.views import ProductViewSet
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Space out calls from any number of threads to at most rate per second.
+    """
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next_call = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            call_at = max(self.next_call, now)
+            self.next_call = call_at + self.interval
+        if call_at > now:
+            time.sleep(call_at - now)
+
+
+class Command(BaseCommand):
+    help = (
+        'Pre-populates product_cache with the first list pages and the most recently updated '
+        'products of the most active users, e.g. after a deploy or a Redis flush'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Email of a single user to warm')
+        parser.add_argument('--users', type=int, default=100,
+                            help='Number of most recently signed-in users to warm (default: 100)')
+        parser.add_argument('--pages', type=int, default=3,
+                            help='List pages to warm per user, at the default page size (default: 3)')
+        parser.add_argument('--details', type=int, default=20,
+                            help='Most recently updated products to warm per user (default: 20)')
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help='Users warmed in parallel, each with its own connection (default: 4)')
+        parser.add_argument('--rate', type=float, default=50,
+                            help='Maximum requests per second across all workers, 0 for no limit (default: 50)')
+
+    def get_user_ids(self, options):
+        """
+        Return the IDs of the users to warm, most recently signed in first.
+
+        Every login issues a refresh token, and only users holding one that
+        hasn't expired can still call the API.
+        """
+        if options['user']:
+            user_ids = list(get_user_model().objects.filter(email=options['user']).values_list('id', flat=True))
+            if not user_ids:
+                raise CommandError(f"User {options['user']} does not exist.")
+            return user_ids
+        return list(
+            OutstandingToken.objects.filter(user__isnull=False, expires_at__gt=timezone.now())
+            .values('user_id').annotate(last_login=Max('created_at'))
+            .order_by('-last_login').values_list('user_id', flat=True)[:options['users']]
+        )
+
+    def warm_user(self, user, pages, details, limiter):
+        """
+        Request a user's first list pages and most recently updated products
+        through ProductViewSet, so entries are cached exactly as live
+        requests would cache them, under the same rebuild locks.
+
+        Returns:
+            tuple: (list pages, products) warmed
+        """
+        request_factory = APIRequestFactory()
+        list_view = ProductViewSet.as_view({'get': 'list'})
+        detail_view = ProductViewSet.as_view({'get': 'retrieve'})
+        try:
+            warmed_pages = 0
+            page_count = pages
+            for page in range(1, pages + 1):
+                if page > page_count:
+                    break
+                limiter.wait()
+                request = request_factory.get('/api/products/', {'page': page})
+                force_authenticate(request, user=user)
+                response = list_view(request)
+                if response.status_code != status.HTTP_200_OK:
+                    break
+                warmed_pages += 1
+                # Don't ask for pages past the end of short catalogs
+                page_count = math.ceil(response.data['count'] / response.data['page_size'])
+
+            product_ids = list(
+                Product.objects.filter(user=user).order_by('-updated_at', '-id')
+                .values_list('id', flat=True)[:details]
+            )
+            warmed_products = 0
+            for product_id in product_ids:
+                limiter.wait()
+                request = request_factory.get(f'/api/products/{product_id}/')
+                force_authenticate(request, user=user)
+                if detail_view(request, pk=product_id).status_code == status.HTTP_200_OK:
+                    warmed_products += 1
+            return warmed_pages, warmed_products
+        finally:
+            # Each worker thread has its own connection
+            connection.close()
+
+    def handle(self, *args, **options):
+        for option in ('users', 'pages', 'details', 'concurrency'):
+            if options[option] < (1 if option == 'concurrency' else 0):
+                raise CommandError(f"--{option} must be positive.")
+        if options['rate'] < 0:
+            raise CommandError("--rate must be positive, or 0 for no limit.")
+
+        user_ids = self.get_user_ids(options)
+        users = get_user_model().objects.in_bulk(user_ids)
+        limiter = RateLimiter(options['rate'])
+        started = time.monotonic()
+        warmed_pages = warmed_products = 0
+        failed = 0
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            futures = {
+                executor.submit(self.warm_user, users[user_id], options['pages'], options['details'], limiter): user_id
+                for user_id in user_ids if user_id in users
+            }
+            for future in as_completed(futures):
+                try:
+                    pages, products = future.result()
+                except Exception:
+                    failed += 1
+                    logger.exception(f"Failed to warm the product cache of user {futures[future]}")
+                    continue
+                warmed_pages += pages
+                warmed_products += products
+
+        elapsed = time.monotonic() - started
+        logger.info(f"Warmed {warmed_pages} list pages and {warmed_products} products for {len(futures)} users")
+        if failed:
+            raise CommandError(f"Failed to warm {failed} of {len(futures)} users; see the log for details.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed {warmed_pages} list pages and {warmed_products} products "
+            f"for {len(futures)} users in {elapsed:.1f}s."
+        ))
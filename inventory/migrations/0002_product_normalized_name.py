@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='normalized_name',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+    ]
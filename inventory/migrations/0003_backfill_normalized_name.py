@@ -0,0 +1,72 @@
+import re
+
+from django.db import migrations
+from django.db.models import Count
+
+BATCH_SIZE = 1000
+
+
+def backfill_normalized_name(apps, schema_editor):
+    """
+    Populate normalized_name for existing products in batches. Mirrors
+    inventory.models.normalize_product_name, which historical models can't use.
+    """
+    Product = apps.get_model('inventory', 'Product')
+    batch = []
+    for product in Product.objects.only('id', 'name').iterator(chunk_size=BATCH_SIZE):
+        product.normalized_name = re.sub(r'\s+', '', product.name.lower())
+        batch.append(product)
+        if len(batch) >= BATCH_SIZE:
+            Product.objects.bulk_update(batch, ['normalized_name'])
+            batch = []
+    if batch:
+        Product.objects.bulk_update(batch, ['normalized_name'])
+
+
+def rename_duplicates(apps, schema_editor):
+    """
+    Rename all but the oldest of each user's products sharing a normalized
+    name, e.g. "Widget" to "Widget (2)", so 0004's unique constraint can be
+    added. Nothing is deleted; users can merge the renamed products themselves.
+    """
+    Product = apps.get_model('inventory', 'Product')
+    max_length = Product._meta.get_field('name').max_length
+    duplicates = (
+        Product.objects.values('user_id', 'normalized_name')
+        .annotate(count=Count('id')).filter(count__gt=1).order_by('user_id')
+    )
+    taken = {}
+    for duplicate in duplicates:
+        user_id = duplicate['user_id']
+        if user_id not in taken:
+            taken[user_id] = set(Product.objects.filter(user_id=user_id).values_list('normalized_name', flat=True))
+        products = Product.objects.filter(
+            user_id=user_id, normalized_name=duplicate['normalized_name']
+        ).order_by('id')[1:]
+        renamed = []
+        copy = 2
+        for product in products:
+            while True:
+                suffix = f" ({copy})"
+                name = product.name[:max_length - len(suffix)] + suffix
+                normalized_name = re.sub(r'\s+', '', name.lower())
+                copy += 1
+                if normalized_name not in taken[user_id]:
+                    break
+            taken[user_id].add(normalized_name)
+            product.name = name
+            product.normalized_name = normalized_name
+            renamed.append(product)
+        Product.objects.bulk_update(renamed, ['name', 'normalized_name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_product_normalized_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_normalized_name, migrations.RunPython.noop),
+        migrations.RunPython(rename_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-17 03:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_product_unique_product_normalized_name_per_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['user', 'id'], name='product_user_id_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-17 03:49
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the index without blocking writes to products
+    atomic = False
+
+    dependencies = [
+        ('inventory', '0006_productimport'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='product_user_updated_idx'),
+        ),
+    ]
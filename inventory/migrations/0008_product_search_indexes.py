@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-17 03:52
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without blocking writes to products
+    atomic = False
+
+    dependencies = [
+        ('inventory', '0007_product_user_updated_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['user', 'price', 'id'], name='product_user_price_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['user', 'quantity', 'id'], name='product_user_quantity_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('normalized_name', name='gin_trgm_ops'), name='product_name_trgm_idx'),
+        ),
+    ]
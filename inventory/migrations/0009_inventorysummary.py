@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-17 03:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('inventory', '0008_product_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inventory_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('sku_count', models.PositiveIntegerField(default=0)),
+                ('total_units', models.BigIntegerField(default=0)),
+                ('total_value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-17 03:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_inventorysummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorysummary',
+            name='low_stock_threshold',
+            field=models.PositiveIntegerField(default=10),
+        ),
+    ]
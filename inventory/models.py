@@ -1,15 +1,229 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import models, transaction
+from django.db.models.functions import Cast
+from django.utils import timezone
 from accounts.models import User
+import re
 
 # Create your models here.
 
+# Largest quantity the products table's integer column can hold
+MAX_QUANTITY = 2147483647
+
+def normalize_product_name(name):
+    """
+    Normalize a product name for duplicate detection by:
+    1. Converting to lowercase
+    2. Removing all whitespace
+    """
+    return re.sub(r'\s+', '', name.lower())
+
+
+class ProductManager(models.Manager):
+    """Define a model manager for Product with atomic stock updates."""
+
+    def adjust_quantity(self, product_id, user_id, delta):
+        """
+        Add a signed delta to a product's quantity in a single UPDATE.
+
+        The change is applied with no read-modify-write, and only if the
+        resulting quantity stays between 0 and MAX_QUANTITY. The user's
+        inventory summary is updated in the same transaction.
+
+        Returns:
+            Product: The updated product, or None if no product with this id
+            belongs to the user or the stock would go out of range
+        """
+        table = self.model._meta.db_table
+        with transaction.atomic(using=self.db):
+            # The range is checked in bigint so the check itself can't overflow
+            products = list(self.raw(
+                f"UPDATE {table} SET quantity = quantity + %s, updated_at = %s "
+                "WHERE id = %s AND user_id = %s AND CAST(quantity AS BIGINT) + %s BETWEEN 0 AND %s "
+                "RETURNING id, name, normalized_name, price, quantity, user_id, created_at, updated_at",
+                [delta, timezone.now(), product_id, user_id, delta, MAX_QUANTITY],
+                using=self.db
+            ))
+            if products:
+                InventorySummary.objects.apply_delta(user_id, units=delta, value=products[0].price * delta)
+        return products[0] if products else None
+
+
 class Product(models.Model):  # Use singular 'Product' for the model
     name = models.CharField(max_length=255)
+    # Lowercased name with all whitespace removed, kept in sync on save so
+    # duplicate checks are a single indexed lookup instead of a table scan
+    normalized_name = models.CharField(max_length=255, editable=False)
     price = models.IntegerField()
     quantity = models.PositiveIntegerField(default=0)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='products')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
+
+    objects = ProductManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'normalized_name'],
+                name='unique_product_normalized_name_per_user',
+            ),
+        ]
+        # The unique constraint's index also serves (user, normalized_name) lookups
+        indexes = [
+            # Backs keyset pagination of a user's products ordered by id
+            models.Index(fields=['user', 'id'], name='product_user_id_idx'),
+            # Back per-user range filters and sorting, with id as the tiebreaker
+            models.Index(fields=['user', 'updated_at', 'id'], name='product_user_updated_idx'),
+            models.Index(fields=['user', 'price', 'id'], name='product_user_price_idx'),
+            models.Index(fields=['user', 'quantity', 'id'], name='product_user_quantity_idx'),
+            models.Index(fields=['user', 'created_at', 'id'], name='product_user_created_idx'),
+            # Backs ?search= substring and similarity matches on the name
+            GinIndex(
+                OpClass('normalized_name', name='gin_trgm_ops'),
+                name='product_name_trgm_idx',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_product_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'normalized_name'}
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
+class ProductImport(models.Model):
+    """
+    Progress of a CSV import, committed batch by batch so it can be resumed.
+    """
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='product_imports')
+    file_name = models.CharField(max_length=255, blank=True)
+    batch_size = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_RUNNING)
+    batches_completed = models.PositiveIntegerField(default=0)
+    rows_imported = models.PositiveIntegerField(default=0)
+    rows_rejected = models.PositiveIntegerField(default=0)
+    # First few rejected rows, as {"line": ..., "errors": ...}
+    errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Import {self.id} ({self.status})"
+
+
+class InventorySummaryManager(models.Manager):
+    """Define a model manager for InventorySummary kept in step with product writes."""
+
+    def compute(self, user_id):
+        """
+        Aggregate a user's totals from the products table.
+
+        Returns:
+            dict: sku_count, total_units and total_value
+        """
+        totals = Product.objects.filter(user_id=user_id).aggregate(
+            sku_count=models.Count('id'),
+            total_units=models.Sum('quantity'),
+            # Multiply as bigint; price * quantity of two integer columns overflows on PostgreSQL
+            total_value=models.Sum(Cast('price', models.BigIntegerField()) * models.F('quantity')),
+        )
+        return {field: value or 0 for field, value in totals.items()}
+
+    def rebuild(self, user_id):
+        """
+        Recompute a user's summary from the products table and store it.
+
+        The summary row is locked first, so writers that commit meanwhile are
+        either counted in the aggregate or apply their delta afterwards.
+
+        Returns:
+            InventorySummary: The rebuilt summary
+        """
+        with transaction.atomic(using=self.db):
+            self.bulk_create(
+                [self.model(user_id=user_id)],
+                update_conflicts=True,
+                unique_fields=['user'],
+                update_fields=['updated_at'],
+            )
+            summary = self.select_for_update().get(user_id=user_id)
+            for field, value in self.compute(user_id).items():
+                setattr(summary, field, value)
+            summary.save()
+        return summary
+
+    def apply_delta(self, user_id, skus=0, units=0, value=0):
+        """
+        Add the effect of a product write to a user's summary.
+
+        Call inside the transaction that writes the products, after the
+        write. A user without a summary row gets one built from the products
+        table, which already includes the write.
+        """
+        updated = self.filter(user_id=user_id).update(
+            sku_count=models.F('sku_count') + skus,
+            total_units=models.F('total_units') + units,
+            total_value=models.F('total_value') + value,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            self.rebuild(user_id)
+
+    def get_for_user(self, user_id):
+        """
+        Get a user's summary, building it on first use.
+        """
+        summary = self.filter(user_id=user_id).first()
+        return summary if summary is not None else self.rebuild(user_id)
+
+
+class InventorySummary(models.Model):
+    """
+    Running totals of a user's products, updated in the same transaction as
+    every product write so dashboards don't aggregate the products table,
+    together with the user's low-stock threshold.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='inventory_summary')
+    sku_count = models.PositiveIntegerField(default=0)
+    total_units = models.BigIntegerField(default=0)
+    # Sum of price * quantity over the user's products
+    total_value = models.BigIntegerField(default=0)
+    # Products with this quantity or less are reported as low stock
+    low_stock_threshold = models.PositiveIntegerField(default=10)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = InventorySummaryManager()
+
+    def __str__(self):
+        return f"Summary for user {self.user_id}"
+
+
+class ProductTombstone(models.Model):
+    """
+    Record of a deleted product, so clients syncing changes learn about deletes.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='product_tombstones')
+    product_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Backs the changes feed, read in (deleted_at, id) order per user
+            models.Index(fields=['user', 'deleted_at', 'id'], name='tombstone_user_deleted_idx'),
+        ]
+
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"Deleted product {self.product_id}"
@@ -1,22 +1,120 @@
-from rest_framework.pagination import PageNumberPagination
+from django.core.paginator import EmptyPage, Paginator
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 from rest_framework.response import Response
+from functools import partial
+
+class CountedPaginator(Paginator):
+    """
+    Django paginator taking its count from a counting function, which may
+    return an estimate instead of running COUNT(*).
+    
+    An estimate can be short of the real count, so pages past it are still
+    read instead of raising EmptyPage. A count reported as exact can still
+    drift from the table, e.g. the inventory summary's; when a page
+    disagrees with it, the rows are counted and the page validated again.
+    """
+    def __init__(self, object_list, per_page, counter, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.counter = counter
+        self.count_is_exact = True
+        self.count_is_verified = False
+    
+    @cached_property
+    def count(self):
+        count, self.count_is_exact = self.counter(self.object_list)
+        return count
+    
+    def verify_count(self):
+        """
+        Replace the supplied count with COUNT(*) on the rows.
+        """
+        self.__dict__['count'] = self.object_list.count()
+        self.__dict__.pop('num_pages', None)
+        self.count_is_exact = self.count_is_verified = True
+    
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if int(number) < 1 or self.count_is_verified:
+                raise
+            if self.count_is_exact:
+                # Past the counted end; the real end may be further
+                self.verify_count()
+                return super().validate_number(number)
+            return int(number)
+    
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.count_is_exact:
+            bottom = (number - 1) * self.per_page
+            return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+        page = super().page(number)
+        if self.count and not self.count_is_verified and len(page) < page.end_index() - page.start_index() + 1:
+            # Fewer rows than the count promised; the real end is before this page's
+            self.verify_count()
+            page = super().page(self.validate_number(number))
+        return page
 
 class CustomPageNumberPagination(PageNumberPagination):
     """
     Custom pagination class that allows client to specify page size.
+    
+    Views with a count_products(queryset) method returning (count, exact)
+    supply the count; the response's count_exact says if it's an estimate.
     """
     page_size = 10  # Default page size
     page_size_query_param = 'page_size'  # Allow client to override using this query parameter
     max_page_size = 100  # Maximum page size limit
     
+    def get_django_paginator(self, queryset, page_size, view=None):
+        """
+        Create the Django paginator, counting through the view when it can.
+        """
+        counter = getattr(view, 'count_products', None)
+        if counter is None:
+            return Paginator(queryset, page_size)
+        return CountedPaginator(queryset, page_size, counter)
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.django_paginator_class = partial(self.get_django_paginator, view=view)
+        return super().paginate_queryset(queryset, request, view)
+    
     def get_paginated_response(self, data):
         """
         Return a paginated response with additional metadata.
         """
+        paginator = self.page.paginator
+        return Response({
+            'count': paginator.count,
+            'count_exact': getattr(paginator, 'count_is_exact', True),
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'page_size': self.get_page_size(self.request),
+            'results': data
+        })
+
+
+class ProductCursorPagination(CursorPagination):
+    """
+    Opt-in keyset pagination for large catalogs.
+    
+    Pages are addressed by an opaque cursor on the (user_id, id) index, so
+    deep pages cost the same as the first one and no COUNT(*) is run.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = 'id'
+    
+    def get_paginated_response(self, data):
+        """
+        Return a paginated response without a total count.
+        """
         return Response({
-            'count': self.page.paginator.count,
             'next': self.get_next_link(),
             'previous': self.get_previous_link(),
             'page_size': self.get_page_size(self.request),
             'results': data
-        }) 
\ No newline at end of file
+        })
\ No newline at end of file
@@ -24,5 +24,6 @@ class IsOwner(permissions.BasePermission):
     so this permission never gets checked.
     """
     def has_object_permission(self, request, view, obj):
-        # Check if the user making the request is the owner of the object
-        return obj.user == request.user
+        # Check if the user making the request is the owner of the object,
+        # by id so the owner isn't loaded again
+        return obj.user_id == request.user.id
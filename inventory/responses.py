@@ -0,0 +1,47 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from stockease.metrics import time_serialization
+import json
+
+json_renderer = JSONRenderer()
+
+def render_json(data):
+    """
+    Render data to JSON bytes exactly as the API's JSONRenderer would.
+    """
+    with time_serialization():
+        return json_renderer.render(data)
+
+class PrerenderedJSONResponse(Response):
+    """
+    Response for JSON that was rendered ahead of time, e.g. cached bytes.
+    
+    When the client negotiated plain JSON the stored bytes are sent as is,
+    skipping the decode and re-encode a regular Response would need. Other
+    renderers (like the browsable API) and .data decode the bytes lazily.
+    """
+    def __init__(self, content, status=None, headers=None):
+        self.prerendered_content = content
+        self._data = None
+        super().__init__(status=status, headers=headers)
+    
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = json.loads(self.prerendered_content)
+        return self._data
+    
+    @data.setter
+    def data(self, value):
+        self._data = value
+    
+    @property
+    def rendered_content(self):
+        renderer = getattr(self, 'accepted_renderer', None)
+        accepted_media_type = getattr(self, 'accepted_media_type', None) or ''
+        # Only plain JSON matches the stored bytes; e.g. ?indent needs re-rendering
+        if type(renderer) is not JSONRenderer or 'indent' in accepted_media_type:
+            return super().rendered_content
+        
+        self['Content-Type'] = renderer.media_type
+        return self.prerendered_content
@@ -1,50 +1,43 @@
 from rest_framework import serializers
-from .models import Product
-from django.db import IntegrityError
+from .models import MAX_QUANTITY, InventorySummary, Product, normalize_product_name
+from django.db import IntegrityError, transaction
 import re
 
+DUPLICATE_NAME_MESSAGE = (
+    "You already have a product with this name or a similar name. "
+    "Product names must be unique (ignoring spaces and case)."
+)
+
+def clean_product_name(name):
+    """
+    Collapse runs of whitespace in a product name, keeping the original case.
+    """
+    return re.sub(r'\s+', ' ', name).strip()
+
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = ['id', 'name', 'price', 'quantity', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
     
-    def normalize_name(self, name):
-        """
-        Normalize a product name by:
-        1. Converting to lowercase
-        2. Removing extra spaces
-        3. Removing all spaces
-        """
-        # Convert to lowercase
-        name = name.lower()
-        # Remove extra spaces
-        name = re.sub(r'\s+', ' ', name).strip()
-        # Remove all spaces
-        name_without_spaces = name.replace(' ', '')
-        return name, name_without_spaces
-    
     def validate_name(self, value):
-        # Normalize the input name
-        normalized_name, name_without_spaces = self.normalize_name(value)
+        # Bulk writes check the whole batch at once with find_name_conflicts
+        if self.context.get('bulk'):
+            return value
+        
+        # Normalize the input name (lowercase, no whitespace)
+        normalized_name = normalize_product_name(value)
         
-        # Check if this name already exists for this user
+        # Check if this name already exists for this user with a single
+        # lookup on the (user, normalized_name) unique index
         user = self.context['request'].user
-        existing_products = Product.objects.filter(user=user)
+        existing_products = Product.objects.filter(user=user, normalized_name=normalized_name)
         
         if self.instance:  # Update operation
             existing_products = existing_products.exclude(pk=self.instance.pk)
         
-        for product in existing_products:
-            # Check both the normalized name and the name without spaces
-            existing_normalized, existing_without_spaces = self.normalize_name(product.name)
-            
-            if (normalized_name == existing_normalized or 
-                name_without_spaces == existing_without_spaces):
-                raise serializers.ValidationError(
-                    "You already have a product with this name or a similar name. "
-                    "Product names must be unique (ignoring spaces and case)."
-                )
+        if existing_products.exists():
+            raise serializers.ValidationError(DUPLICATE_NAME_MESSAGE)
         
         return value
     
@@ -67,10 +60,15 @@ class ProductSerializer(serializers.ModelSerializer):
         name = validated_data.get('name')
         if name:
             # Just normalize spaces, keep original case
-            validated_data['name'] = re.sub(r'\s+', ' ', name).strip()
+            validated_data['name'] = clean_product_name(name)
         
         try:
-            return super().create(validated_data)
+            with transaction.atomic():
+                product = super().create(validated_data)
+                InventorySummary.objects.apply_delta(
+                    user.id, skus=1, units=product.quantity, value=product.price * product.quantity
+                )
+                return product
         except IntegrityError:
             # This is a fallback in case the database constraint is hit
             raise serializers.ValidationError(
@@ -82,6 +80,76 @@ class ProductSerializer(serializers.ModelSerializer):
         name = validated_data.get('name')
         if name:
             # Just normalize spaces, keep original case
-            validated_data['name'] = re.sub(r'\s+', ' ', name).strip()
+            validated_data['name'] = clean_product_name(name)
         
-        return super().update(instance, validated_data)
\ No newline at end of file
+        try:
+            with transaction.atomic():
+                # Lock the row so the summary delta is taken from its current values
+                old_price, old_quantity = Product.objects.select_for_update().values_list(
+                    'price', 'quantity'
+                ).get(pk=instance.pk)
+                product = super().update(instance, validated_data)
+                InventorySummary.objects.apply_delta(
+                    product.user_id,
+                    units=product.quantity - old_quantity,
+                    value=product.price * product.quantity - old_price * old_quantity,
+                )
+                return product
+        except IntegrityError:
+            # This is a fallback in case the database constraint is hit
+            raise serializers.ValidationError(
+                {"name": "You already have a product with this name. Product names must be unique."}
+            )
+
+
+class InventorySummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = InventorySummary
+        fields = ['sku_count', 'total_units', 'total_value', 'updated_at']
+        read_only_fields = fields
+
+
+class LowStockThresholdSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = InventorySummary
+        fields = ['low_stock_threshold']
+
+
+class StockAdjustmentSerializer(serializers.Serializer):
+    # Signed change to apply to the product's quantity
+    delta = serializers.IntegerField(min_value=-MAX_QUANTITY, max_value=MAX_QUANTITY)
+
+
+def find_name_conflicts(user, entries):
+    """
+    Check a batch of names for duplicates with a single set-based query.
+    
+    Args:
+        user: The user who owns the products
+        entries: (index, name, product_id) tuples, where product_id is the
+            product being renamed or None for a new product
+        
+    Returns:
+        dict: Maps the index of each conflicting entry to an error message
+    """
+    conflicts = {}
+    seen = set()
+    names = {}
+    for index, name, product_id in entries:
+        normalized_name = normalize_product_name(name)
+        # Later occurrences of a name within the same batch are rejected
+        if normalized_name in seen:
+            conflicts[index] = DUPLICATE_NAME_MESSAGE
+        seen.add(normalized_name)
+        names[index] = (normalized_name, product_id)
+    
+    existing = dict(
+        Product.objects.filter(user=user, normalized_name__in=seen)
+        .values_list('normalized_name', 'id')
+    )
+    for index, (normalized_name, product_id) in names.items():
+        owner_id = existing.get(normalized_name)
+        if owner_id is not None and owner_id != product_id:
+            conflicts[index] = DUPLICATE_NAME_MESSAGE
+    
+    return conflicts
\ No newline at end of file
@@ -1,11 +1,47 @@
-from django.test import TestCase
-from django.urls import reverse
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, resolve, reverse
+from django.utils import timezone
 from rest_framework.test import APIClient
-from rest_framework import status
-from .models import Product
+from rest_framework import serializers, status
+from rest_framework_simplejwt.tokens import RefreshToken
+from .models import (
+    MAX_QUANTITY, InventorySummary, Product, ProductImport, ProductTombstone, normalize_product_name
+)
+from .filters import ORDERING_FIELDS
+from .serializers import ProductSerializer
+from .urls import router, with_async_reads
+from .views import ProductViewSet
 from accounts.models import User
-from .utils.cache_utils import product_cache, get_cache_key
+from .utils.cache_utils import (
+    CACHE_HIT, CACHE_MISS, CACHE_STALE, INVALIDATION_CHANNEL, product_cache, get_cache_key, get_cache_stats,
+    get_generation_key, get_list_generation, get_local_cache, get_lock_key, get_or_rebuild, invalidate_product_cache,
+    l2_stats, set_cache_entry
+)
+from .utils.local_cache import LocalCache
+from stockease.metrics import HISTOGRAMS, count_query, flush_metrics
+from stockease.testing import Budget, QueryBudgetMixin
+from stockease.logging_utils import JSONFormatter, LogQueueHandler, SamplingFilter, queue_handlers
+from .utils.low_stock_utils import get_low_stock_key
+from .utils.row_encoder import compile_row_encoder, encode_products, product_rows
+from .responses import render_json
+from django_redis import get_redis_connection
+from unittest.mock import patch
+from datetime import timedelta
+import csv
+import inspect
+import io
 import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import unittest
 
 class ProductAPITestCase(TestCase):
     """Test suite for the Product API with caching."""
@@ -84,9 +120,6 @@ class ProductAPITestCase(TestCase):
     
     def test_create_product(self):
         """Test creating a product."""
-        # If list was previously cached, check if new product is in updated cache
-        cache_key = get_cache_key(self.user.id, list_view=True, page='1', page_size='10')
-
         # First, manually cache the list
         self.client.get(reverse('product-list'))
 
@@ -107,7 +140,8 @@ class ProductAPITestCase(TestCase):
         # So we need to reload the cache by making another GET request
         self.client.get(reverse('product-list'))
 
-        # Now get the cached list
+        # Now get the cached list under the user's new list generation
+        cache_key = get_cache_key(self.user.id, list_view=True, page='1', page_size='10')
         cached_data = product_cache.get(cache_key)
         cached_response = json.loads(cached_data)
         cached_list = cached_response['results']
@@ -183,3 +217,1783 @@ class ProductAPITestCase(TestCase):
         # Try to access the other user's product
         response = self.client.get(reverse('product-detail', args=[other_product.id]))
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_duplicate_name_rejected(self):
+        """Test that names differing only in case or spacing are rejected."""
+        response = self.client.post(
+            reverse('product-list'),
+            {'name': '  test   PRODUCT1 ', 'price': 100, 'quantity': 1},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', response.data)
+        self.assertEqual(Product.objects.filter(user=self.user).count(), 2)
+    
+    def test_normalized_name_stored(self):
+        """Test that the normalized name column is kept in sync with the name."""
+        self.assertEqual(self.product1.normalized_name, 'testproduct1')
+        
+        response = self.client.patch(
+            reverse('product-detail', args=[self.product1.id]),
+            {'name': 'Renamed  Product'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.product1.refresh_from_db()
+        self.assertEqual(self.product1.normalized_name, 'renamedproduct')
+    
+    def test_update_keeps_own_name(self):
+        """Test that updating a product with its own name is not a duplicate."""
+        response = self.client.put(
+            reverse('product-detail', args=[self.product1.id]),
+            {'name': 'TEST product 1', 'price': 120, 'quantity': 12},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        # Renaming onto another product's name is still rejected
+        response = self.client.patch(
+            reverse('product-detail', args=[self.product1.id]),
+            {'name': 'Test Product 2'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_other_users_can_reuse_name(self):
+        """Test that name uniqueness is scoped per user."""
+        other_user = User.objects.create_user(
+            email='other@example.com',
+            password='otherpassword123'
+        )
+        Product.objects.create(name='Test Product 1', price=1, quantity=1, user=other_user)
+        self.assertEqual(Product.objects.filter(normalized_name='testproduct1').count(), 2)
+    
+    def test_list_products_cursor_pagination(self):
+        """Test the opt-in cursor pagination mode and its caching."""
+        response = self.client.get(reverse('product-list'), {'pagination': 'cursor', 'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        # Cursor pages skip the count and return opaque links
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        self.assertEqual(response.data['results'][0]['id'], self.product1.id)
+        self.assertIsNotNone(product_cache.get(
+            get_cache_key(self.user.id, list_view=True, page_size='1', cursor='')
+        ))
+        
+        # Following the next link returns the second product
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['id'], self.product2.id)
+        self.assertIsNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+        
+        # Cursor pages are invalidated along with the other list pages
+        self.client.delete(reverse('product-detail', args=[self.product2.id]))
+        self.assertIsNone(product_cache.get(
+            get_cache_key(self.user.id, list_view=True, page_size='1', cursor='')
+        ))
+
+
+    
+    def test_cache_hit_serves_prerendered_bytes(self):
+        """Test that cache hits send the stored JSON bytes unchanged."""
+        first = self.client.get(reverse('product-list'), {'page_size': 100})
+        cache_key = get_cache_key(self.user.id, list_view=True, page='1', page_size='100')
+        cached = product_cache.get(cache_key)
+        self.assertIsInstance(cached, bytes)
+        
+        second = self.client.get(reverse('product-list'), {'page_size': 100})
+        self.assertEqual(second['Content-Type'], 'application/json')
+        self.assertEqual(second.content, cached)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second.json()['count'], 2)
+    
+    def test_cache_hit_renders_browsable_api(self):
+        """Test that non-JSON renderers still work on cache hits."""
+        url = reverse('product-detail', args=[self.product1.id])
+        self.client.get(url)
+        
+        response = self.client.get(url, HTTP_ACCEPT='text/html')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('text/html', response['Content-Type'])
+        self.assertIn(b'Test Product 1', response.content)
+
+class ProductCacheInvalidationTestCase(TestCase):
+    """Test suite for generation-based list cache invalidation."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            email='cache@example.com',
+            password='testpassword123'
+        )
+        for i in range(3):
+            Product.objects.create(name=f'Cached Product {i}', price=10, quantity=i, user=self.user)
+        
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        
+        product_cache.clear()
+    
+    def list_names(self, **params):
+        response = self.client.get(reverse('product-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in response.data['results']]
+    
+    def test_cached_pages_not_served_after_create(self):
+        """Test that pages cached before a create are never served after it."""
+        first_page = self.list_names(page_size=2)
+        second_page = self.list_names(page_size=2, page=2)
+        self.assertEqual(len(first_page + second_page), 3)
+        
+        self.client.post(reverse('product-list'), {'name': 'New Product', 'price': 5, 'quantity': 1}, format='json')
+        
+        self.assertIn('New Product', self.list_names(page_size=2, page=2))
+    
+    def test_cached_pages_not_served_after_update(self):
+        """Test that pages cached before an update are never served after it."""
+        product = Product.objects.filter(user=self.user).order_by('id').first()
+        self.list_names()
+        
+        self.client.patch(reverse('product-detail', args=[product.id]), {'name': 'Renamed'}, format='json')
+        
+        self.assertIn('Renamed', self.list_names())
+    
+    def test_cached_pages_not_served_after_delete(self):
+        """Test that pages cached before a delete are never served after it."""
+        product = Product.objects.filter(user=self.user).order_by('id').first()
+        self.list_names(pagination='cursor')
+        
+        self.client.delete(reverse('product-detail', args=[product.id]))
+        
+        self.assertNotIn(product.name, self.list_names(pagination='cursor'))
+    
+    def test_invalidation_bumps_generation_without_scanning(self):
+        """Test that invalidation is an INCR of the user's generation, not a key scan."""
+        old_key = get_cache_key(self.user.id, list_view=True, page='1', page_size='10')
+        
+        with patch.object(product_cache, 'keys', side_effect=AssertionError('KEYS used')):
+            invalidate_product_cache(self.user.id)
+        
+        new_key = get_cache_key(self.user.id, list_view=True, page='1', page_size='10')
+        self.assertNotEqual(old_key, new_key)
+    
+    def test_evicted_generation_does_not_revive_old_pages(self):
+        """Test that a lost generation counter never maps back to old pages."""
+        old_key = get_cache_key(self.user.id, list_view=True, page='1', page_size='10')
+        invalidate_product_cache(self.user.id)
+        product_cache.delete(get_generation_key(self.user.id))
+        
+        self.assertNotEqual(old_key, get_cache_key(self.user.id, list_view=True, page='1', page_size='10'))
+
+
+@override_settings(PRODUCT_CACHE_WRITE_THROUGH=True)
+class ProductWriteThroughCacheTestCase(TestCase):
+    """Test suite for write-through product detail caching."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            email='writethrough@example.com',
+            password='testpassword123'
+        )
+        self.product = Product.objects.create(name='Cached Product', price=10, quantity=1, user=self.user)
+        
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('product-detail', args=[self.product.id])
+        
+        product_cache.clear()
+    
+    def test_update_writes_detail_entry(self):
+        """Test that an update stores the new representation in the detail cache."""
+        self.client.get(self.url)
+        response = self.client.patch(self.url, {'price': 25}, format='json')
+        
+        cached = json.loads(product_cache.get(get_cache_key(self.user.id, self.product.id)))
+        self.assertEqual(cached, response.data)
+        
+        # The next read is served from the cache
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['price'], 25)
+    
+    def test_create_writes_detail_entry(self):
+        """Test that a new product is cached as soon as it is created."""
+        response = self.client.post(reverse('product-list'), {'name': 'Fresh', 'price': 1}, format='json')
+        self.assertIsNotNone(product_cache.get(get_cache_key(self.user.id, response.data['id'])))
+    
+    def test_list_pages_still_invalidated(self):
+        """Test that list pages are invalidated in write-through mode."""
+        self.client.get(reverse('product-list'))
+        self.client.put(self.url, {'name': 'Renamed', 'price': 10, 'quantity': 1}, format='json')
+        
+        response = self.client.get(reverse('product-list'))
+        self.assertEqual(response.data['results'][0]['name'], 'Renamed')
+
+
+class ProductConditionalGetTestCase(TestCase):
+    """Test suite for ETag / If-None-Match on product reads."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            email='etag@example.com',
+            password='testpassword123'
+        )
+        self.product = Product.objects.create(name='Tagged Product', price=10, quantity=1, user=self.user)
+        
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        
+        product_cache.clear()
+    
+    def assert_revalidates(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        
+        # A matching tag is answered from Redis alone
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        
+        # Any write to the user's products changes the tag
+        self.client.patch(reverse('product-detail', args=[self.product.id]), {'price': 11}, format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_list_etag(self):
+        """Test conditional GETs on the products list."""
+        self.assert_revalidates(reverse('product-list'))
+    
+    def test_retrieve_etag(self):
+        """Test conditional GETs on a single product."""
+        self.assert_revalidates(reverse('product-detail', args=[self.product.id]))
+    
+    def test_weak_and_wildcard_match(self):
+        """Test that weak tags and * revalidate, but * doesn't hide a missing product."""
+        url = reverse('product-detail', args=[self.product.id])
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=f'"other", W/{etag}')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        for url in (url, reverse('product-list')):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(reverse('product-detail', args=[self.product.id + 1]), HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_retrieve_etag_follows_cached_entry(self):
+        """Test that a detail entry rewritten without a generation bump gets a new tag."""
+        url = reverse('product-detail', args=[self.product.id])
+        etag = self.client.get(url)['ETag']
+        # e.g. a rebuild that read the row before a concurrent write committed
+        set_cache_entry(get_cache_key(self.user.id, self.product.id), b'{"id": 0}')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_etag_differs_per_page(self):
+        """Test that each page and representation gets its own tag."""
+        first = self.client.get(reverse('product-list'))
+        second = self.client.get(reverse('product-list'), {'page_size': 5})
+        html = self.client.get(reverse('product-list'), HTTP_ACCEPT='text/html')
+        self.assertEqual(len({first['ETag'], second['ETag'], html['ETag']}), 3)
+
+class ProductBulkAPITestCase(TestCase):
+    """Test suite for the bulk product endpoint."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            email='bulk@example.com',
+            password='testpassword123'
+        )
+        self.product = Product.objects.create(name='Existing Product', price=10, quantity=1, user=self.user)
+        
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('product-bulk')
+        
+        product_cache.clear()
+    
+    def test_bulk_create(self):
+        """Test bulk create writes valid items and reports the rest by index."""
+        items = [
+            {'name': 'Bulk  One', 'price': 1, 'quantity': 1},
+            {'name': 'existing product', 'price': 2},
+            {'name': 'Bulk Two', 'price': -1},
+            {'name': 'bulkone', 'price': 3},
+            {'name': 'Bulk Three', 'price': 4, 'quantity': 4},
+        ]
+        response = self.client.post(self.url, items, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['name'] for item in response.data['created']], ['Bulk One', 'Bulk Three'])
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 3])
+        self.assertIn('price', response.data['errors'][1]['errors'])
+        self.assertTrue(Product.objects.filter(user=self.user, normalized_name='bulkone').exists())
+        self.assertEqual(Product.objects.filter(user=self.user).count(), 3)
+    
+    def test_bulk_create_uses_one_name_query(self):
+        """Test that duplicate-name validation does not scale with batch size."""
+        items = [{'name': f'Item {i}', 'price': i} for i in range(50)]
+        InventorySummary.objects.rebuild(self.user.id)
+        # One duplicate-name lookup, one INSERT and one summary UPDATE, wrapped in a savepoint
+        with self.assertNumQueries(5):
+            response = self.client.post(self.url, items, format='json')
+        self.assertEqual(len(response.data['created']), 50)
+    
+    def test_bulk_update(self):
+        """Test bulk update applies partial changes and rejects unknown ids."""
+        other = Product.objects.create(name='Other Product', price=5, quantity=5, user=self.user)
+        self.client.get(reverse('product-list'))
+        
+        items = [
+            {'id': self.product.id, 'quantity': 42},
+            {'id': other.id, 'name': 'EXISTING product'},
+            {'id': 999999, 'price': 1},
+        ]
+        response = self.client.patch(self.url, items, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'][0]['quantity'], 42)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 42)
+        
+        # The list cache was invalidated once for the whole batch
+        response = self.client.get(reverse('product-list'))
+        quantities = {item['id']: item['quantity'] for item in response.data['results']}
+        self.assertEqual(quantities[self.product.id], 42)
+    
+    def test_bulk_update_writes_only_supplied_fields(self):
+        """Test that each product is locked and only the fields its item sent are written."""
+        other = Product.objects.create(name='Other Product', price=5, quantity=5, user=self.user)
+        items = [{'id': self.product.id, 'quantity': 42}, {'id': other.id, 'price': 7}]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE "inventory_product"')]
+        self.assertEqual(len(updates), 2)
+        for sql in updates:
+            self.assertNotIn('"name"', sql)
+        self.assertEqual(sum('"price"' in sql for sql in updates), 1)
+        self.assertEqual(sum('"quantity"' in sql for sql in updates), 1)
+        
+        self.product.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.product.price, self.product.quantity), (10, 42))
+        self.assertEqual((other.price, other.quantity), (7, 5))
+    
+    def test_bulk_rejects_boolean_ids(self):
+        """Test that JSON true/false aren't taken as product ids."""
+        response = self.client.patch(self.url, [{'id': True, 'price': 1}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'], [{'index': 0, 'errors': {'id': ['Not found.']}}])
+        
+        response = self.client.delete(self.url, [True], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Product.objects.filter(id=self.product.id).exists())
+    
+    def test_bulk_destroy(self):
+        """Test bulk delete removes owned products and reports missing ids."""
+        other_user = User.objects.create_user(email='other@example.com', password='otherpassword123')
+        foreign = Product.objects.create(name='Foreign', price=1, quantity=1, user=other_user)
+        
+        response = self.client.delete(self.url, [self.product.id, foreign.id], format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted'], [self.product.id])
+        self.assertEqual(response.data['errors'], [{'index': 1, 'errors': {'id': ['Not found.']}}])
+        self.assertTrue(Product.objects.filter(id=foreign.id).exists())
+        self.assertFalse(Product.objects.filter(id=self.product.id).exists())
+    
+    def test_bulk_rejects_non_list(self):
+        """Test that bulk requests must be a non-empty list."""
+        response = self.client.post(self.url, {'name': 'Single'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProductExportTestCase(TestCase):
+    """Test suite for the streaming product export."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            email='export@example.com',
+            password='testpassword123'
+        )
+        for i in range(5):
+            Product.objects.create(name=f'Export, "Product" {i}', price=i, quantity=i * 2, user=self.user)
+        other_user = User.objects.create_user(email='other@example.com', password='otherpassword123')
+        Product.objects.create(name='Not Mine', price=1, quantity=1, user=other_user)
+        
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('product-export')
+    
+    def test_export_csv(self):
+        """Test that the CSV export streams the user's products."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], ['id', 'name', 'price', 'quantity', 'created_at', 'updated_at'])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][1], 'Export, "Product" 0')
+    
+    def test_export_ndjson_matches_serializer(self):
+        """Test that NDJSON rows match what the API returns for each product."""
+        response = self.client.get(self.url, {'export_format': 'ndjson'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        products = Product.objects.filter(user=self.user).order_by('id')
+        self.assertEqual([json.loads(line) for line in lines], ProductSerializer(products, many=True).data)
+    
+    def test_export_unknown_format(self):
+        """Test that an unknown export format is rejected."""
+        response = self.client.get(self.url, {'export_format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProductImportTestCase(TestCase):
+    """Test suite for the batched CSV import."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            email='import@example.com',
+            password='testpassword123'
+        )
+        self.existing = Product.objects.create(name='Existing Product', price=10, quantity=1, user=self.user)
+        
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('product-import')
+        
+        product_cache.clear()
+    
+    def upload(self, content, **data):
+        csv_file = SimpleUploadedFile('products.csv', content.encode(), content_type='text/csv')
+        response = self.client.post(self.url, {'file': csv_file, **data}, format='multipart')
+        if not response.streaming:
+            return response, []
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        return response, [json.loads(line) for line in lines]
+    
+    def test_import_reports_progress_per_batch(self):
+        """Test that rows are merged in batches with per-batch progress."""
+        content = (
+            'name,price,quantity\n'
+            'Imported One,10,1\n'
+            'Imported Two,-5,2\n'
+            'existing  PRODUCT,99,\n'
+            'Imported Three,30,3\n'
+            'Imported Four,abc,4\n'
+        )
+        response, lines = self.upload(content, batch_size=2)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([line['batch'] for line in lines[:-1]], [1, 2, 3])
+        self.assertEqual(lines[0]['errors'][0]['line'], 3)
+        self.assertEqual(lines[2]['errors'][0]['line'], 6)
+        self.assertEqual(lines[-1]['status'], ProductImport.STATUS_COMPLETED)
+        self.assertEqual(lines[-1]['rows_imported'], 3)
+        self.assertEqual(lines[-1]['rows_rejected'], 2)
+        
+        # Existing names are updated rather than duplicated
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.price, 99)
+        self.assertEqual(self.existing.quantity, 0)
+        self.assertEqual(Product.objects.filter(user=self.user).count(), 3)
+    
+    def test_import_updates_summary_incrementally(self):
+        """Test that each batch adds its delta to the summary instead of recounting."""
+        InventorySummary.objects.rebuild(self.user.id)
+        content = 'name,price,quantity\nExisting Product,20,3\nImported One,5,2\nImported One,7,4\n'
+        with CaptureQueriesContext(connection) as queries:
+            self.upload(content, batch_size=2)
+        self.assertFalse(any('SUM(' in query['sql'].upper() for query in queries.captured_queries))
+        
+        summary = InventorySummary.objects.get(user=self.user)
+        totals = {'sku_count': 2, 'total_units': 7, 'total_value': 88}
+        self.assertEqual(InventorySummary.objects.compute(self.user.id), totals)
+        self.assertEqual({field: getattr(summary, field) for field in totals}, totals)
+    
+    def test_import_rejects_invalid_import_id(self):
+        """Test that a non-numeric import_id is a client error."""
+        response, _ = self.upload('name,price\nAny,1\n', import_id='abc')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('import_id', response.data)
+    
+    def test_import_rejects_missing_columns(self):
+        """Test that a CSV without the required columns is rejected up front."""
+        response, _ = self.upload('name,quantity\nNo Price,1\n')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ProductImport.objects.exists())
+    
+    def test_import_resumes_after_last_batch(self):
+        """Test that resuming an import skips its completed batches."""
+        product_import = ProductImport.objects.create(
+            user=self.user, batch_size=1, batches_completed=1, status=ProductImport.STATUS_FAILED
+        )
+        content = 'name,price,quantity\nAlready Done,1,1\nStill To Do,2,2\n'
+        response, lines = self.upload(content, import_id=product_import.id)
+        
+        self.assertEqual([line.get('batch') for line in lines[:-1]], [2])
+        self.assertFalse(Product.objects.filter(user=self.user, name='Already Done').exists())
+        self.assertTrue(Product.objects.filter(user=self.user, name='Still To Do').exists())
+        product_import.refresh_from_db()
+        self.assertEqual(product_import.status, ProductImport.STATUS_COMPLETED)
+    
+    def test_import_command(self):
+        """Test the import_products management command."""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as csv_file:
+            csv_file.write('name,price,quantity\nCommand One,1,1\nCommand Two,2,2\n')
+        self.addCleanup(os.remove, csv_file.name)
+        
+        out = io.StringIO()
+        call_command('import_products', csv_file.name, user=self.user.email, batch_size=1, stdout=out)
+        
+        self.assertIn('Batch 2: 1 imported, 0 rejected', out.getvalue())
+        self.assertEqual(Product.objects.filter(user=self.user).count(), 3)
+
+
+class ProductStockAdjustmentTestCase(TestCase):
+    """Test suite for atomic stock adjustments."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            email='stock@example.com',
+            password='testpassword123'
+        )
+        self.product = Product.objects.create(name='Stocked Product', price=10, quantity=5, user=self.user)
+        
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('product-adjust', args=[self.product.id])
+        
+        product_cache.clear()
+    
+    def test_adjust_applies_delta(self):
+        """Test that positive and negative deltas are applied in place."""
+        response = self.client.post(self.url, {'delta': 7}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['quantity'], 12)
+        
+        response = self.client.post(self.url, {'delta': -12}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['quantity'], 0)
+        
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 0)
+        self.assertEqual(response.data['updated_at'], ProductSerializer(self.product).data['updated_at'])
+    
+    def test_adjust_rejects_negative_stock(self):
+        """Test that stock can't be adjusted below zero."""
+        response = self.client.post(self.url, {'delta': -6}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 5)
+    
+    def test_adjust_other_users_product(self):
+        """Test that another user's product can't be adjusted."""
+        other_user = User.objects.create_user(email='other@example.com', password='otherpassword123')
+        other_product = Product.objects.create(name='Not Mine', price=1, quantity=1, user=other_user)
+        
+        response = self.client.post(reverse('product-adjust', args=[other_product.id]), {'delta': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        other_product.refresh_from_db()
+        self.assertEqual(other_product.quantity, 1)
+    
+    def test_adjust_updates_cached_detail(self):
+        """Test that the cached detail entry is updated rather than dropped."""
+        self.client.get(reverse('product-detail', args=[self.product.id]))
+        self.client.post(self.url, {'delta': 3}, format='json')
+        
+        cached = json.loads(product_cache.get(get_cache_key(self.user.id, self.product.id)))
+        self.assertEqual(cached['quantity'], 8)
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('product-detail', args=[self.product.id]))
+        self.assertEqual(response.data['quantity'], 8)
+    
+    def test_adjust_requires_integer_delta(self):
+        """Test that the delta must be an integer."""
+        response = self.client.post(self.url, {'delta': 'lots'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_adjust_non_integer_id(self):
+        """Test that a non-numeric product id is not found rather than a server error."""
+        response = self.client.post('/api/products/abc/adjust/', {'delta': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_adjust_rejects_overflow(self):
+        """Test that stock can't be adjusted past the largest storable quantity."""
+        response = self.client.post(self.url, {'delta': MAX_QUANTITY}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {'delta': MAX_QUANTITY + 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 5)
+
+        response = self.client.post(self.url, {'delta': MAX_QUANTITY - 5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['quantity'], MAX_QUANTITY)
+
+
+class LowStockWatchlistTestCase(TestCase):
+    """Test suite for the low-stock watchlist and its sorted set index."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            email='lowstock@example.com',
+            password='testpassword123'
+        )
+        self.empty = Product.objects.create(name='Empty', price=1, quantity=0, user=self.user)
+        self.low = Product.objects.create(name='Low', price=1, quantity=8, user=self.user)
+        self.plenty = Product.objects.create(name='Plenty', price=1, quantity=50, user=self.user)
+        other_user = User.objects.create_user(email='other@example.com', password='otherpassword123')
+        Product.objects.create(name='Not Mine', price=1, quantity=0, user=other_user)
+        
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('product-low-stock')
+        product_cache.clear()
+    
+    def get_low_stock_names(self, params=None):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [product['name'] for product in response.json()['results']]
+    
+    def test_low_stock_uses_threshold(self):
+        """Test the default threshold, a per-request override and a saved threshold."""
+        self.assertEqual(self.get_low_stock_names(), ['Empty', 'Low'])
+        self.assertEqual(self.get_low_stock_names({'threshold': 0}), ['Empty'])
+        
+        response = self.client.put(self.url, {'low_stock_threshold': 50}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()['low_stock_threshold'], 50)
+        self.assertEqual(response.json()['count'], 3)
+    
+    def test_invalid_threshold(self):
+        """Test that a negative or non-integer threshold is rejected."""
+        self.assertEqual(self.client.get(self.url, {'threshold': 'low'}).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.put(self.url, {'low_stock_threshold': -1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_index_follows_writes(self):
+        """Test that every write touching quantity updates the index."""
+        self.get_low_stock_names()
+        self.client.post(reverse('product-adjust', args=[self.plenty.id]), {'delta': -45}, format='json')
+        self.client.patch(reverse('product-detail', args=[self.low.id]), {'quantity': 20}, format='json')
+        self.client.delete(reverse('product-detail', args=[self.empty.id]))
+        self.client.post(reverse('product-list'), {'name': 'New', 'price': 1, 'quantity': 1}, format='json')
+        self.client.post(reverse('product-bulk'), [{'name': 'Bulk', 'price': 1, 'quantity': 2}], format='json')
+        
+        self.assertEqual(self.get_low_stock_names(), ['New', 'Bulk', 'Plenty'])
+        # The index itself holds current quantities, not just the filtered response
+        indexed = get_redis_connection('product_cache').zrangebyscore(get_low_stock_key(self.user.id), '-inf', 10)
+        expected = Product.objects.filter(user=self.user, quantity__lte=10).values_list('id', flat=True)
+        self.assertEqual(sorted(int(member) for member in indexed), sorted(expected))
+    
+    def test_lookup_reads_sorted_set(self):
+        """Test that the query is a score range on the index, not a products scan."""
+        key = get_low_stock_key(self.user.id)
+        self.get_low_stock_names()
+        self.assertEqual(get_redis_connection('product_cache').zscore(key, self.low.id), 8)
+        
+        # An evicted index is rebuilt on the next read
+        get_redis_connection('product_cache').delete(key)
+        self.assertEqual(self.get_low_stock_names(), ['Empty', 'Low'])
+    
+    def test_rebuild_command_repairs_drift(self):
+        """Test that the rebuild command brings a drifted index back in line."""
+        self.get_low_stock_names()
+        Product.objects.filter(pk=self.plenty.pk).update(quantity=1)
+        Product.objects.filter(pk=self.empty.pk).update(quantity=99)
+        
+        out = io.StringIO()
+        call_command('rebuild_low_stock_index', user=self.user.email, stdout=out)
+        self.assertIn('Rebuilt 1 low-stock indexes (3 products)', out.getvalue())
+        self.assertEqual(self.get_low_stock_names(), ['Plenty', 'Low'])
+    
+    def test_read_reconciles_drift(self):
+        """Test that entries disagreeing with the table are corrected and kept out of the count."""
+        key = get_low_stock_key(self.user.id)
+        redis = get_redis_connection('product_cache')
+        self.get_low_stock_names()
+        # A quantity indexed out of order and a delete that missed the index
+        redis.zadd(key, {self.plenty.id: 3})
+        ghost = Product.objects.create(name='Ghost', price=1, quantity=2, user=self.user)
+        redis.zadd(key, {ghost.id: 2})
+        Product.objects.filter(pk=ghost.pk).delete()
+        
+        response = self.client.get(self.url)
+        self.assertEqual([product['name'] for product in response.json()['results']], ['Empty', 'Low'])
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(redis.zscore(key, self.plenty.id), 50)
+        self.assertIsNone(redis.zscore(key, ghost.id))
+
+
+class ProductChangesFeedTestCase(TestCase):
+    """Test suite for the delta sync changes feed."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            email='sync@example.com',
+            password='testpassword123'
+        )
+        self.products = [
+            Product.objects.create(name=f'Synced {i}', price=i, quantity=i, user=self.user) for i in range(3)
+        ]
+        other_user = User.objects.create_user(email='other@example.com', password='otherpassword123')
+        Product.objects.create(name='Not Mine', price=1, quantity=1, user=other_user)
+        # Existing rows were written well before the sync starts
+        Product.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('product-changes')
+        product_cache.clear()
+    
+    def sync(self, cursor=None, **params):
+        if cursor:
+            params['cursor'] = cursor
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+    
+    def test_full_sync_then_delta(self):
+        """Test that a sync after a few edits returns only those edits and deletes."""
+        page = self.sync()
+        self.assertEqual([p['name'] for p in page['updated']], ['Synced 0', 'Synced 1', 'Synced 2'])
+        self.assertEqual(page['deleted'], [])
+        self.assertFalse(page['has_more'])
+        
+        # Nothing changed: nothing to send
+        cursor = page['next_cursor']
+        self.assertEqual(self.sync(cursor)['updated'], [])
+        
+        self.client.patch(reverse('product-detail', args=[self.products[1].id]), {'quantity': 7}, format='json')
+        self.client.delete(reverse('product-detail', args=[self.products[2].id]))
+        page = self.sync(cursor)
+        self.assertEqual([(p['id'], p['quantity']) for p in page['updated']], [(self.products[1].id, 7)])
+        self.assertEqual(page['deleted'], [self.products[2].id])
+        
+        # Recent rows are re-sent until they settle, so none can be skipped
+        again = self.sync(page['next_cursor'])
+        self.assertEqual(again['updated'], page['updated'])
+        self.assertEqual(again['deleted'], page['deleted'])
+    
+    def test_pages_follow_cursor(self):
+        """Test that small pages return every product exactly once."""
+        self.client.delete(reverse('product-bulk'), [self.products[0].id], format='json')
+        cursor = None
+        seen = []
+        while True:
+            page = self.sync(cursor, limit=1)
+            seen.extend(p['id'] for p in page['updated'])
+            cursor = page['next_cursor']
+            if not page['has_more']:
+                break
+        self.assertEqual(seen, [self.products[1].id, self.products[2].id])
+        self.assertTrue(ProductTombstone.objects.filter(user=self.user, product_id=self.products[0].id).exists())
+    
+    def test_invalid_parameters(self):
+        """Test that malformed cursors and limits are rejected."""
+        self.assertEqual(self.client.get(self.url, {'cursor': 'not-a-cursor'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'limit': 0}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'limit': 'all'}).status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_expired_cursor(self):
+        """Test that a cursor older than the tombstone retention period must resync."""
+        cursor = self.sync()['next_cursor']
+        with override_settings(PRODUCT_TOMBSTONE_RETENTION_DAYS=0):
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_410_GONE)
+            self.assertIn('cursor', response.json())
+            # A full sync starts over
+            self.assertEqual(len(self.sync()['updated']), 3)
+    
+    def test_prune_tombstones(self):
+        """Test that the prune command deletes only tombstones past retention."""
+        old = ProductTombstone.objects.create(
+            user=self.user, product_id=1, deleted_at=timezone.now() - timedelta(days=31)
+        )
+        ProductTombstone.objects.create(user=self.user, product_id=2, deleted_at=timezone.now() - timedelta(days=29))
+        out = io.StringIO()
+        call_command('prune_product_tombstones', batch_size=1, stdout=out)
+        self.assertIn('Pruned 1 product tombstones', out.getvalue())
+        self.assertEqual(list(ProductTombstone.objects.values_list('product_id', flat=True)), [2])
+        self.assertFalse(ProductTombstone.objects.filter(pk=old.pk).exists())
+
+
+class ProductRowEncoderTestCase(TestCase):
+    """Test suite checking the fast read path against ProductSerializer."""
+
+    def setUp(self):
+        """Set up products covering the values each field can take."""
+        self.user = User.objects.create_user(
+            email='encoder@example.com',
+            password='testpassword123'
+        )
+        Product.objects.create(name='Plain', price=0, quantity=0, user=self.user)
+        Product.objects.create(name='Ünïcødé "quoted" \\ name', price=2147483647, quantity=2147483647, user=self.user)
+        product = Product.objects.create(name='Whole Seconds', price=-5, quantity=3, user=self.user)
+        # isoformat() drops the fraction when microseconds are zero
+        Product.objects.filter(pk=product.pk).update(
+            created_at=timezone.now().replace(microsecond=0), updated_at=timezone.now().replace(microsecond=0)
+        )
+        self.queryset = Product.objects.filter(user=self.user).order_by('id')
+        
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        product_cache.clear()
+    
+    def test_encoder_matches_serializer(self):
+        """Test that encoded rows render to the same bytes as the serializer's output."""
+        expected = render_json(ProductSerializer(self.queryset, many=True).data)
+        self.assertEqual(render_json(list(encode_products(product_rows(self.queryset)))), expected)
+    
+    def test_encoder_matches_serializer_in_other_time_zone(self):
+        """Test that datetimes follow the current time zone like DRF's."""
+        with timezone.override('Asia/Kolkata'):
+            expected = render_json(ProductSerializer(self.queryset, many=True).data)
+            self.assertEqual(render_json(list(encode_products(product_rows(self.queryset)))), expected)
+    
+    def test_views_match_serializer(self):
+        """Test that list and retrieve bodies are byte-identical to the serializer path."""
+        response = self.client.get(reverse('product-list'))
+        expected = render_json({
+            'count': 3,
+            'count_exact': True,
+            'next': None,
+            'previous': None,
+            'page_size': 10,
+            'results': ProductSerializer(self.queryset, many=True).data,
+        })
+        self.assertEqual(response.content, expected)
+        
+        product = self.queryset[1]
+        response = self.client.get(reverse('product-detail', args=[product.id]))
+        self.assertEqual(response.content, render_json(ProductSerializer(product).data))
+    
+    def test_retrieve_missing_product(self):
+        """Test that unknown and malformed ids still return 404."""
+        self.assertEqual(self.client.get(reverse('product-detail', args=[0])).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/api/products/abc/').status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_rejects_unsupported_fields(self):
+        """Test that serializers the encoder can't reproduce are refused."""
+        class DerivedSerializer(ProductSerializer):
+            value = serializers.SerializerMethodField()
+            
+            class Meta(ProductSerializer.Meta):
+                fields = ProductSerializer.Meta.fields + ['value']
+        
+        with self.assertRaises(ImproperlyConfigured):
+            compile_row_encoder(DerivedSerializer)
+
+
+class ProductCacheRebuildTestCase(TestCase):
+    """Test suite for single-flight rebuilds and stale-while-revalidate."""
+
+    def setUp(self):
+        """Set up test data."""
+        product_cache.clear()
+        self.key = 'user:0:products:test'
+        self.calls = 0
+    
+    def rebuild(self):
+        self.calls += 1
+        return f'value-{self.calls}'
+    
+    def test_fresh_entry_is_a_hit(self):
+        """Test that a fresh entry is served without rebuilding."""
+        set_cache_entry(self.key, 'cached')
+        self.assertEqual(get_or_rebuild(self.key, self.rebuild), ('cached', CACHE_HIT))
+        self.assertEqual(self.calls, 0)
+    
+    def test_missing_entry_is_rebuilt_and_cached(self):
+        """Test that a missing entry is rebuilt once and then served from cache."""
+        self.assertEqual(get_or_rebuild(self.key, self.rebuild), ('value-1', CACHE_MISS))
+        self.assertEqual(get_or_rebuild(self.key, self.rebuild), ('value-1', CACHE_HIT))
+        self.assertIsNone(product_cache.get(get_lock_key(self.key)))
+    
+    def test_stale_entry_served_while_rebuilding(self):
+        """Test that a stale entry is served while another worker rebuilds it."""
+        with override_settings(PRODUCT_CACHE_SOFT_TIMEOUT=-1):
+            set_cache_entry(self.key, 'stale')
+        product_cache.add(get_lock_key(self.key), 'other-worker')
+        
+        self.assertEqual(get_or_rebuild(self.key, self.rebuild), ('stale', CACHE_STALE))
+        self.assertEqual(self.calls, 0)
+    
+    def test_stale_entry_rebuilt_by_lock_holder(self):
+        """Test that the worker taking the lock refreshes a stale entry."""
+        with override_settings(PRODUCT_CACHE_SOFT_TIMEOUT=-1):
+            set_cache_entry(self.key, 'stale')
+        
+        self.assertEqual(get_or_rebuild(self.key, self.rebuild), ('value-1', CACHE_MISS))
+        self.assertEqual(get_or_rebuild(self.key, self.rebuild), ('value-1', CACHE_HIT))
+    
+    def test_failed_rebuild_releases_lock(self):
+        """Test that an exception during rebuild is raised and frees the lock."""
+        def fail():
+            raise ValueError('boom')
+        
+        with self.assertRaises(ValueError):
+            get_or_rebuild(self.key, fail)
+        self.assertIsNone(product_cache.get(get_lock_key(self.key)))
+        self.assertIsNone(product_cache.get(self.key))
+    
+    def test_expired_lock_taken_by_another_worker_is_kept(self):
+        """Test that a rebuild outliving its lock doesn't release the next holder's lock."""
+        def rebuild():
+            # The lock expired and another worker took it
+            product_cache.set(get_lock_key(self.key), 'other-worker')
+            return self.rebuild()
+        
+        self.assertEqual(get_or_rebuild(self.key, rebuild), ('value-1', CACHE_MISS))
+        self.assertEqual(product_cache.get(get_lock_key(self.key)), 'other-worker')
+    
+    def test_concurrent_misses_rebuild_once(self):
+        """Test that concurrent misses for the same key run a single rebuild."""
+        def slow_rebuild():
+            time.sleep(0.2)
+            return self.rebuild()
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_or_rebuild(self.key, slow_rebuild)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(self.calls, 1)
+        self.assertEqual({value for value, _ in results}, {'value-1'})
+
+
+# Warming threads read through their own connections, so test data must be committed
+class ProductCacheWarmingTestCase(TransactionTestCase):
+    """Test suite for the warm_product_cache command."""
+
+    def setUp(self):
+        """Set up a signed-in user, a user without a session and their products."""
+        self.user = User.objects.create_user(email='active@example.com', password='testpassword123')
+        self.idle_user = User.objects.create_user(email='idle@example.com', password='testpassword123')
+        for user in (self.user, self.idle_user):
+            Product.objects.bulk_create([
+                Product(user=user, name=f'Product {i}', normalized_name=normalize_product_name(f'Product {i}'),
+                        price=i, quantity=i)
+                for i in range(25)
+            ])
+        # Logging in issues the refresh token the command ranks users by
+        RefreshToken.for_user(self.user)
+        self.client = APIClient()
+        product_cache.clear()
+
+    def assertCached(self, user, url, data=None):
+        """Assert a product request is served from the cache."""
+        self.client.force_authenticate(user=user)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_warms_list_pages_and_recent_products(self):
+        """Test that signed-in users' first pages and latest products are cached."""
+        latest = Product.objects.filter(user=self.user).order_by('-id')[:3]
+        Product.objects.filter(pk__in=[product.pk for product in latest]).update(updated_at=timezone.now())
+
+        out = io.StringIO()
+        call_command('warm_product_cache', pages=5, details=3, concurrency=2, rate=0, stdout=out)
+        # 25 products make 3 pages of 10
+        self.assertIn('Warmed 3 list pages and 3 products for 1 users', out.getvalue())
+
+        for page in (1, 2, 3):
+            self.assertCached(self.user, reverse('product-list'), {'page': page})
+        for product in latest:
+            self.assertCached(self.user, reverse('product-detail', args=[product.id]))
+
+        self.client.force_authenticate(user=self.idle_user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('product-list'))
+        self.assertGreater(len(queries), 0)
+
+    def test_single_user(self):
+        """Test warming one user by email, signed in or not."""
+        out = io.StringIO()
+        call_command('warm_product_cache', user=self.idle_user.email, pages=1, details=1, rate=0, stdout=out)
+        self.assertIn('Warmed 1 list pages and 1 products for 1 users', out.getvalue())
+        self.assertCached(self.idle_user, reverse('product-list'))
+
+        with self.assertRaises(CommandError):
+            call_command('warm_product_cache', user='missing@example.com', stdout=io.StringIO())
+
+    def test_rate_limit(self):
+        """Test that --rate spaces out the warming requests."""
+        started = time.monotonic()
+        call_command('warm_product_cache', pages=3, details=2, rate=50, stdout=io.StringIO())
+        # Five requests, the first sent right away
+        self.assertGreaterEqual(time.monotonic() - started, 4 / 50)
+
+
+@override_settings(PRODUCT_CACHE_L1_ENABLED=True)
+class ProductTwoTierCacheTestCase(TestCase):
+    """Test suite for the in-process L1 tier in front of product_cache."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            email='tiered@example.com',
+            password='testpassword123'
+        )
+        self.product = Product.objects.create(name='Tiered Product', price=10, quantity=1, user=self.user)
+        
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        
+        product_cache.clear()
+        self.local_cache = get_local_cache()
+        self.local_cache.clear()
+        self.local_cache.stats.reset()
+        l2_stats.reset()
+    
+    def test_hits_served_from_l1(self):
+        """Test that repeated reads are served without a Redis round trip."""
+        url = reverse('product-detail', args=[self.product.id])
+        self.client.get(url)
+        
+        with patch.object(product_cache, 'get_many', side_effect=AssertionError('Redis read')):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['name'], 'Tiered Product')
+        
+        stats = get_cache_stats()
+        self.assertGreater(stats['l1']['hits'], 0)
+        self.assertGreater(stats['l2']['misses'], 0)
+    
+    def test_local_write_evicts_l1(self):
+        """Test that a write in this worker is visible to its next read."""
+        self.client.get(reverse('product-list'))
+        self.client.patch(reverse('product-detail', args=[self.product.id]), {'quantity': 9}, format='json')
+        
+        response = self.client.get(reverse('product-list'))
+        self.assertEqual(response.json()['results'][0]['quantity'], 9)
+    
+    def test_remote_invalidation_evicts_l1(self):
+        """Test that an invalidation published by another worker drops L1 entries."""
+        self.client.get(reverse('product-detail', args=[self.product.id]))
+        key = get_cache_key(self.user.id, self.product.id)
+        self.assertIn(key, self.local_cache.get_many([key]))
+        
+        get_redis_connection('product_cache').publish(INVALIDATION_CHANNEL, str(self.user.id))
+        
+        deadline = time.monotonic() + 2
+        while self.local_cache.get_many([key]) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.local_cache.get_many([key]), {})
+
+
+class LocalCacheTestCase(TestCase):
+    """Test suite for the bounded in-process LRU/TTL cache."""
+
+    def test_evicts_least_recently_used(self):
+        """Test that the cache never holds more than max_entries."""
+        local_cache = LocalCache(max_entries=2, timeout=60)
+        local_cache.set_many({'a': 1, 'b': 2})
+        local_cache.get_many(['a'])
+        local_cache.set_many({'c': 3})
+        
+        self.assertEqual(local_cache.get_many(['a', 'b', 'c']), {'a': 1, 'c': 3})
+        self.assertEqual(local_cache.stats.as_dict(), {'hits': 3, 'misses': 1})
+    
+    def test_entries_expire(self):
+        """Test that entries are dropped after the timeout."""
+        local_cache = LocalCache(max_entries=10, timeout=0)
+        local_cache.set_many({'a': 1})
+        self.assertEqual(local_cache.get_many(['a']), {})
+        self.assertEqual(len(local_cache), 0)
+    
+    def test_delete_prefix(self):
+        """Test that a user's entries can be dropped by key prefix."""
+        local_cache = LocalCache(max_entries=10, timeout=60)
+        local_cache.set_many({'user:1:a': 1, 'user:12:a': 2})
+        local_cache.delete_prefix('user:1:')
+        self.assertEqual(local_cache.get_many(['user:1:a', 'user:12:a']), {'user:12:a': 2})
+
+
+class LoggingPipelineTestCase(TestCase):
+    """Test suite for the queued, structured logging setup."""
+
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.handler = logging.StreamHandler(self.stream)
+        self.handler.setFormatter(JSONFormatter())
+        self.logger = logging.getLogger('inventory.tests.pipeline')
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        self.logger.handlers = [self.handler]
+        self.addCleanup(setattr, self.logger, 'handlers', [])
+    
+    def get_records(self):
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+    
+    def test_json_records(self):
+        """Test that records are formatted as JSON lines with their extra fields."""
+        self.logger.info('Cache %s for product: %s', 'HIT', 7, extra={'user_id': 3})
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            self.logger.exception('Failed')
+        first, second = self.get_records()
+        self.assertEqual(first['message'], 'Cache HIT for product: 7')
+        self.assertEqual((first['level'], first['logger'], first['user_id']), ('INFO', 'inventory.tests.pipeline', 3))
+        self.assertIn('ValueError: boom', second['exception'])
+    
+    def test_sampling_keeps_warnings(self):
+        """Test that sampled-out loggers still emit warnings and errors."""
+        self.logger.addFilter(SamplingFilter(rate=0))
+        self.addCleanup(self.logger.removeFilter, self.logger.filters[-1])
+        self.logger.info('Cache HIT for product: 1')
+        self.logger.warning('Gave up waiting')
+        self.assertEqual([record['message'] for record in self.get_records()], ['Gave up waiting'])
+    
+    def test_queued_handlers_write_on_listener_thread(self):
+        """Test that queued records are written by the listener, in order."""
+        listeners = queue_handlers([self.logger.name])
+        self.assertIsInstance(self.logger.handlers[0], LogQueueHandler)
+        for i in range(3):
+            self.logger.info('Record %d', i)
+        for listener in listeners:
+            listener.queue.join()
+        self.assertEqual([record['message'] for record in self.get_records()], ['Record 0', 'Record 1', 'Record 2'])
+
+
+class RequestMetricsTestCase(TestCase):
+    """Test suite for the Server-Timing header and Prometheus metrics."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='metrics@example.com', password='testpassword123')
+        self.product = Product.objects.create(name='Metered', price=10, quantity=1, user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        product_cache.clear()
+        for histogram in HISTOGRAMS:
+            histogram.clear()
+    
+    def get_timings(self, response):
+        return dict(entry.split(';', 1) for entry in response['Server-Timing'].split(', '))
+    
+    def test_server_timing(self):
+        """Test that DB, cache and serialization work is reported per request."""
+        url = reverse('product-detail', args=[self.product.id])
+        miss = self.get_timings(self.client.get(url))
+        hit = self.get_timings(self.client.get(url))
+        self.assertIn('desc="queries=1"', miss['db'])
+        self.assertIn('desc="queries=0"', hit['db'])
+        self.assertIn('misses=0', hit['cache-product_cache'])
+        self.assertEqual(set(hit), {'db', 'cache-product_cache', 'serialize', 'total'})
+    
+    @override_settings(DEBUG=True)
+    def test_metrics_endpoint(self):
+        """Test that requests are aggregated into histograms by route name."""
+        self.client.get(reverse('product-list'))
+        self.client.get(reverse('product-list'))
+        self.client.get(reverse('product-summary'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn('stockease_request_duration_seconds_count{route="product-list",method="GET"} 2', body)
+        self.assertIn('stockease_db_queries_count{route="product-summary"} 1', body)
+        self.assertIn('stockease_cache_hit_ratio_bucket{route="product-list",cache="product_cache",le="1"} 2', body)
+    
+    @override_settings(DEBUG=True)
+    def test_metrics_shared_across_workers(self):
+        """Test that a scrape reports requests flushed by other workers too."""
+        self.client.get(reverse('product-list'))
+        flush_metrics()
+        # A worker that hasn't handled those requests answers the scrape
+        for histogram in HISTOGRAMS:
+            histogram.clear()
+        self.client.get(reverse('product-list'))
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('stockease_request_duration_seconds_count{route="product-list",method="GET"} 2', body)
+    
+    def test_streaming_response_observed_when_closed(self):
+        """Test that a streamed export is observed once its body has been sent."""
+        response = self.client.get(reverse('product-export'))
+        self.assertEqual(HISTOGRAMS[0].drain(), {})
+        b''.join(response.streaming_content)
+        self.assertEqual(list(HISTOGRAMS[0].drain()), [('product-export', 'GET')])
+    
+    def test_metrics_denied_without_token(self):
+        """Test that metrics aren't public unless a token is set or DEBUG is on."""
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_new_connections_are_instrumented(self):
+        """Test that connections opened after startup count their queries too."""
+        execute_wrappers = []
+        
+        def connect():
+            # Each thread opens its own connection
+            new_connection = connections['default']
+            new_connection.ensure_connection()
+            execute_wrappers.extend(new_connection.execute_wrappers)
+            new_connection.close()
+        
+        thread = threading.Thread(target=connect)
+        thread.start()
+        thread.join()
+        self.assertIn(count_query, execute_wrappers)
+    
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_metrics_token(self):
+        """Test that a configured token is required to scrape metrics."""
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ProductFilterTestCase(TestCase):
+    """Test suite for searching, filtering and ordering the product list."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            email='filter@example.com',
+            password='testpassword123'
+        )
+        self.widget = Product.objects.create(name='Blue Widget', price=50, quantity=3, user=self.user)
+        self.gadget = Product.objects.create(name='Red Gadget', price=150, quantity=40, user=self.user)
+        self.gizmo = Product.objects.create(name='Widget Gizmo', price=100, quantity=0, user=self.user)
+        other_user = User.objects.create_user(email='other@example.com', password='otherpassword123')
+        Product.objects.create(name='Blue Widget', price=1, quantity=1, user=other_user)
+        
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('product-list')
+        product_cache.clear()
+    
+    def get_names(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [product['name'] for product in response.json()['results']]
+    
+    def test_search_ignores_case_and_whitespace(self):
+        """Test that ?search= matches names the way duplicates are detected."""
+        self.assertEqual(self.get_names({'search': 'WIDGET'}), ['Blue Widget', 'Widget Gizmo'])
+        self.assertEqual(self.get_names({'search': 'bluewid'}), ['Blue Widget'])
+        self.assertEqual(self.get_names({'search': 'sprocket'}), [])
+    
+    def test_range_filters(self):
+        """Test that price and quantity bounds are inclusive."""
+        self.assertEqual(self.get_names({'price_min': 50, 'price_max': 100}), ['Blue Widget', 'Widget Gizmo'])
+        self.assertEqual(self.get_names({'quantity_max': 3}), ['Blue Widget', 'Widget Gizmo'])
+        self.assertEqual(self.get_names({'quantity_min': 4, 'search': 'gadget'}), ['Red Gadget'])
+    
+    def test_invalid_range_filter(self):
+        """Test that a non-integer bound is rejected."""
+        response = self.client.get(self.url, {'price_min': 'cheap'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('price_min', response.json())
+    
+    def test_ordering(self):
+        """Test sorting by an allowed field and ignoring unknown ones."""
+        self.assertEqual(self.get_names({'ordering': '-price'}), ['Red Gadget', 'Widget Gizmo', 'Blue Widget'])
+        self.assertEqual(self.get_names({'ordering': 'quantity'}), ['Widget Gizmo', 'Blue Widget', 'Red Gadget'])
+        self.assertEqual(self.get_names({'ordering': 'user'}), ['Blue Widget', 'Red Gadget', 'Widget Gizmo'])
+    
+    def test_ordering_tiebreaker_follows_direction(self):
+        """Test that ties are broken by id in the direction of the first sort field."""
+        Product.objects.create(name='Green Widget', price=100, quantity=3, user=self.user)
+        self.assertEqual(
+            self.get_names({'ordering': 'price'}), ['Blue Widget', 'Widget Gizmo', 'Green Widget', 'Red Gadget']
+        )
+        self.assertEqual(
+            self.get_names({'ordering': '-price'}), ['Red Gadget', 'Green Widget', 'Widget Gizmo', 'Blue Widget']
+        )
+    
+    def test_cursor_pagination_with_ordering(self):
+        """Test that cursor pages follow the requested ordering."""
+        response = self.client.get(self.url, {'pagination': 'cursor', 'ordering': '-price', 'page_size': 2})
+        self.assertEqual([p['name'] for p in response.json()['results']], ['Red Gadget', 'Widget Gizmo'])
+        response = self.client.get(response.json()['next'])
+        self.assertEqual([p['name'] for p in response.json()['results']], ['Blue Widget'])
+    
+    def test_filtered_pages_cached_separately(self):
+        """Test that each normalized filter combination has its own cache entry."""
+        self.get_names({'search': 'widget'})
+        self.get_names({'search': 'gadget'})
+        key = get_cache_key(self.user.id, list_view=True, page='1', page_size='10', filters={'search': 'widget'})
+        self.assertIsNotNone(product_cache.get(key))
+        
+        # Equivalent queries are served from the same entry
+        with patch.object(ProductViewSet, 'paginate_queryset', side_effect=AssertionError('cache miss')):
+            self.assertEqual(self.get_names({'search': ' Wid get ', 'price_min': ''}), ['Blue Widget', 'Widget Gizmo'])
+    
+    def test_filtered_pages_invalidated_on_write(self):
+        """Test that writes invalidate filtered pages too."""
+        self.assertEqual(self.get_names({'search': 'widget'}), ['Blue Widget', 'Widget Gizmo'])
+        self.client.patch(reverse('product-detail', args=[self.gadget.id]), {'name': 'Red Widget'}, format='json')
+        self.assertEqual(self.get_names({'search': 'widget'}), ['Blue Widget', 'Red Widget', 'Widget Gizmo'])
+    
+    def test_unfiltered_count_read_from_summary(self):
+        """Test that the unfiltered list takes its count from the inventory summary."""
+        InventorySummary.objects.rebuild(self.user.id)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'ordering': '-price'})
+        self.assertEqual((response.json()['count'], response.json()['count_exact']), (3, True))
+        self.assertFalse([q['sql'] for q in queries if 'COUNT(' in q['sql'] and '"inventory_product"' in q['sql']])
+    
+    def test_drifted_summary_count_corrected(self):
+        """Test that pages disagreeing with a drifted summary count are validated against the rows."""
+        InventorySummary.objects.rebuild(self.user.id)
+        InventorySummary.objects.filter(user=self.user).update(sku_count=6)
+        self.assertEqual(self.client.get(self.url, {'page_size': 2, 'page': 3}).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(self.url, {'page_size': 2, 'page': 2})
+        self.assertEqual((response.json()['count'], response.json()['next']), (3, None))
+        self.assertEqual(len(response.json()['results']), 1)
+        
+        InventorySummary.objects.filter(user=self.user).update(sku_count=1)
+        product_cache.clear()
+        response = self.client.get(self.url, {'page_size': 2, 'page': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.json()['count'], len(response.json()['results'])), (3, 1))
+    
+    def test_filtered_count_is_exact_below_limit(self):
+        """Test that filtered lists are counted exactly up to PRODUCT_COUNT_EXACT_LIMIT."""
+        response = self.client.get(self.url, {'search': 'widget'})
+        self.assertEqual((response.json()['count'], response.json()['count_exact']), (2, True))
+    
+    @override_settings(PRODUCT_COUNT_EXACT_LIMIT=1)
+    def test_filtered_count_estimated_above_limit(self):
+        """Test that larger filtered lists report an estimate and still serve every page."""
+        response = self.client.get(self.url, {'search': 'widget', 'page_size': 1})
+        self.assertFalse(response.json()['count_exact'])
+        self.assertGreaterEqual(response.json()['count'], 2)
+        self.assertEqual(self.get_names({'search': 'widget', 'page_size': 1, 'page': 2}), ['Widget Gizmo'])
+
+
+class InventorySummaryTestCase(TestCase):
+    """Test suite for the incrementally maintained inventory summary."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            email='summary@example.com',
+            password='testpassword123'
+        )
+        self.product = Product.objects.create(name='Summary Product', price=10, quantity=5, user=self.user)
+        other_user = User.objects.create_user(email='other@example.com', password='otherpassword123')
+        Product.objects.create(name='Not Mine', price=1000, quantity=1000, user=other_user)
+        
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('product-summary')
+        product_cache.clear()
+    
+    def assertSummaryMatchesProducts(self):
+        """Check the stored summary against an aggregate of the products table."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        summary = {field: response.json()[field] for field in ('sku_count', 'total_units', 'total_value')}
+        self.assertEqual(summary, InventorySummary.objects.compute(self.user.id))
+        return summary
+    
+    def test_summary_built_on_first_read(self):
+        """Test that a user without a summary row gets one from the products table."""
+        self.assertEqual(
+            self.assertSummaryMatchesProducts(), {'sku_count': 1, 'total_units': 5, 'total_value': 50}
+        )
+        self.assertTrue(InventorySummary.objects.filter(user=self.user).exists())
+    
+    def test_single_product_writes(self):
+        """Test that create, update, adjust and delete keep the summary in step."""
+        self.assertSummaryMatchesProducts()
+        response = self.client.post(reverse('product-list'), {'name': 'Second', 'price': 7, 'quantity': 3}, format='json')
+        self.assertEqual(self.assertSummaryMatchesProducts()['total_value'], 71)
+        
+        self.client.patch(reverse('product-detail', args=[self.product.id]), {'price': 20}, format='json')
+        self.client.put(
+            reverse('product-detail', args=[response.data['id']]),
+            {'name': 'Second', 'price': 7, 'quantity': 1}, format='json'
+        )
+        self.client.post(reverse('product-adjust', args=[self.product.id]), {'delta': -2}, format='json')
+        self.assertEqual(
+            self.assertSummaryMatchesProducts(), {'sku_count': 2, 'total_units': 4, 'total_value': 67}
+        )
+        
+        self.client.delete(reverse('product-detail', args=[self.product.id]))
+        self.assertEqual(
+            self.assertSummaryMatchesProducts(), {'sku_count': 1, 'total_units': 1, 'total_value': 7}
+        )
+    
+    def test_bulk_writes_and_import(self):
+        """Test that bulk writes and CSV imports keep the summary in step."""
+        self.assertSummaryMatchesProducts()
+        url = reverse('product-bulk')
+        response = self.client.post(url, [{'name': 'Bulk A', 'price': 2, 'quantity': 2}, {'name': 'Bulk B', 'price': 3}], format='json')
+        ids = [product['id'] for product in response.data['created']]
+        self.assertSummaryMatchesProducts()
+        
+        self.client.patch(url, [{'id': ids[0], 'quantity': 10}, {'id': self.product.id, 'price': 1}], format='json')
+        self.assertSummaryMatchesProducts()
+        
+        self.client.delete(url, [ids[1]], format='json')
+        self.assertSummaryMatchesProducts()
+        
+        csv_file = SimpleUploadedFile(
+            'products.csv', b'name,price,quantity\nsummary product,4,4\nImported,5,5\n', content_type='text/csv'
+        )
+        response = self.client.post(reverse('product-import'), {'file': csv_file}, format='multipart')
+        b''.join(response.streaming_content)
+        self.assertEqual(
+            self.assertSummaryMatchesProducts(), {'sku_count': 3, 'total_units': 19, 'total_value': 61}
+        )
+    
+    def test_rebuild_command_verifies_and_repairs(self):
+        """Test that --verify reports drift and a rebuild repairs it."""
+        self.assertSummaryMatchesProducts()
+        InventorySummary.objects.filter(user=self.user).update(total_units=999)
+        
+        out = io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_inventory_summaries', verify=True, stdout=out)
+        self.assertIn(f'User {self.user.id}', out.getvalue())
+        
+        call_command('rebuild_inventory_summaries', stdout=io.StringIO())
+        call_command('rebuild_inventory_summaries', verify=True, stdout=io.StringIO())
+        self.assertSummaryMatchesProducts()
+        # Users without products get an empty summary
+        self.assertEqual(InventorySummary.objects.count(), 2)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Query plans are checked on PostgreSQL only')
+class ProductQueryPlanTestCase(TestCase):
+    """Test suite checking that product queries are served by indexes."""
+
+    # Seeded dataset: each user owns a small slice of the table, but enough
+    # products that sorting them all costs more than reading an index in order
+    TENANTS = 20
+    PRODUCTS_PER_TENANT = 3000
+
+    @classmethod
+    def setUpTestData(cls):
+        """Seed a large products table and refresh planner statistics."""
+        users = User.objects.bulk_create([
+            User(email=f'tenant{i}@example.com', password='!') for i in range(cls.TENANTS)
+        ])
+        for user in users:
+            Product.objects.bulk_create([
+                Product(user=user, name=f'Product {i}', normalized_name=normalize_product_name(f'Product {i}'),
+                        price=i, quantity=i)
+                for i in range(cls.PRODUCTS_PER_TENANT)
+            ])
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Product._meta.db_table}')
+        cls.user = users[cls.TENANTS // 2]
+        cls.product = Product.objects.filter(user=cls.user).order_by('id')[cls.PRODUCTS_PER_TENANT // 2]
+
+    def setUp(self):
+        """Set up the API client."""
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        product_cache.clear()
+
+    def get_plan_nodes(self, sql, params=None):
+        """
+        Return the node types of the plan PostgreSQL picks for a query.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        nodes = []
+        pending = [plan[0]['Plan']]
+        while pending:
+            node = pending.pop()
+            nodes.append(node['Node Type'])
+            pending.extend(node.get('Plans', []))
+        return nodes
+
+    def assertIndexedPlan(self, sql, params=None, forbidden=('Seq Scan', 'Sort', 'Incremental Sort')):
+        """
+        Fail if the query's plan scans the whole table or sorts rows in memory.
+        """
+        nodes = self.get_plan_nodes(sql, params)
+        for node in nodes:
+            self.assertNotIn(node, forbidden, f'{node} in plan of: {sql}')
+
+    def assertViewQueriesIndexed(self, method, url, data=None, **kwargs):
+        """
+        Run a request and check the plan of every products query it issued.
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertLess(response.status_code, 400)
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if f'"{Product._meta.db_table}"' in query['sql'] and query['sql'].lstrip().upper().startswith('SELECT')
+        ]
+        self.assertTrue(queries)
+        for sql in queries:
+            self.assertIndexedPlan(sql, **kwargs)
+
+    def test_list_queries(self):
+        """Test the page-number list, including its count and a deep page."""
+        self.assertViewQueriesIndexed('get', reverse('product-list'))
+        self.assertViewQueriesIndexed('get', reverse('product-list'), {'page': 5, 'page_size': 20})
+
+    def test_cursor_list_queries(self):
+        """Test the keyset-paginated list."""
+        self.assertViewQueriesIndexed('get', reverse('product-list'), {'pagination': 'cursor'})
+
+    def test_retrieve_queries(self):
+        """Test fetching a single product."""
+        self.assertViewQueriesIndexed('get', reverse('product-detail', args=[self.product.id]))
+
+    def test_duplicate_name_queries(self):
+        """Test the normalized-name lookup run when a product is created or renamed."""
+        self.assertViewQueriesIndexed('post', reverse('product-list'), {'name': 'New Product', 'price': 1})
+        self.assertViewQueriesIndexed(
+            'patch', reverse('product-detail', args=[self.product.id]), {'name': 'Renamed Product'}
+        )
+
+    def test_ordering_queries(self):
+        """Test that each supported ordering is read in order from an index, in both directions."""
+        for ordering in (f'{direction}{field}' for field in ORDERING_FIELDS for direction in ('', '-')):
+            with self.subTest(ordering=ordering):
+                product_cache.clear()
+                self.assertViewQueriesIndexed('get', reverse('product-list'), {'ordering': ordering})
+
+    def test_filter_queries(self):
+        """Test that search and range filters don't scan the whole table."""
+        for params in ({'search': 'product 12'}, {'price_min': 10, 'price_max': 20}, {'quantity_max': 5}):
+            with self.subTest(params=params):
+                product_cache.clear()
+                # Matches are few, so sorting them by id is cheap
+                self.assertViewQueriesIndexed('get', reverse('product-list'), params, forbidden=('Seq Scan',))
+
+    def test_changes_feed_queries(self):
+        """Test that the changes feed reads products from the cursor onwards in index order."""
+        response = self.client.get(reverse('product-changes'), {'limit': 50})
+        self.assertViewQueriesIndexed('get', reverse('product-changes'), {'cursor': response.data['next_cursor']})
+
+    def test_recently_updated_queries(self):
+        """Test that filtering and sorting a user's products by updated_at uses an index."""
+        queryset = Product.objects.filter(user=self.user, updated_at__gt=self.product.updated_at).order_by('updated_at')
+        sql, params = queryset[:10].query.sql_with_params()
+        self.assertIndexedPlan(sql, params)
+
+
+# Most queries and Redis commands each product endpoint may make, counting
+# the JWT user lookup. Writes include the SAVEPOINT and RELEASE around their
+# transaction, which TestCase nests in its own.
+PRODUCT_QUERY_BUDGETS = {
+    'product-list (uncached)': Budget(queries=3, redis_commands=7),
+    'product-list (cached)': Budget(queries=1, redis_commands=2),
+    'product-list filtered (uncached)': Budget(queries=3, redis_commands=7),
+    'product-detail (uncached)': Budget(queries=2, redis_commands=7),
+    'product-detail (cached)': Budget(queries=1, redis_commands=2),
+    'product-summary': Budget(queries=2, redis_commands=0),
+    'product-low-stock': Budget(queries=3, redis_commands=3),
+    'product-changes': Budget(queries=3, redis_commands=0),
+    'product-export': Budget(queries=2, redis_commands=0),
+    'product-create': Budget(queries=6, redis_commands=3),
+    'product-update': Budget(queries=8, redis_commands=3),
+    'product-partial-update': Budget(queries=7, redis_commands=3),
+    'product-adjust': Budget(queries=5, redis_commands=4),
+    'product-bulk-create': Budget(queries=6, redis_commands=2),
+    'product-destroy': Budget(queries=8, redis_commands=3),
+}
+
+
+class ProductQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    """Test suite holding each product endpoint to its query and Redis command budget."""
+
+    query_budgets = PRODUCT_QUERY_BUDGETS
+
+    def setUp(self):
+        """Set up test data and a client authenticated with a JWT."""
+        self.user = User.objects.create_user(email='budget@example.com', password='testpassword123')
+        Product.objects.bulk_create([
+            Product(user=self.user, name=f'Product {i}', normalized_name=normalize_product_name(f'Product {i}'),
+                    price=100 + i, quantity=i)
+            for i in range(20)
+        ])
+        InventorySummary.objects.rebuild(self.user.id)
+        self.product = Product.objects.filter(user=self.user).order_by('id').last()
+
+        # A real token, so the budgets include the authentication user lookup
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        product_cache.clear()
+        get_redis_connection('product_cache').delete(get_low_stock_key(self.user.id))
+        # Budgets are for a user who has used the API since the last flush
+        get_list_generation(self.user.id)
+
+    def request(self, name, method, url, data=None):
+        """
+        Make a request within the named budget, reading streamed responses
+        inside it too.
+        """
+        with self.assertWithinBudget(name):
+            response = getattr(self.client, method)(url, data, format='json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, name)
+        return response
+
+    def test_list_budget(self):
+        """Test product list pages, uncached, cached and filtered."""
+        url = reverse('product-list')
+        self.request('product-list (uncached)', 'get', url)
+        self.request('product-list (uncached)', 'get', url, {'page': 2})
+        self.request('product-list (cached)', 'get', url, {'page': 2})
+        self.request('product-list filtered (uncached)', 'get', url, {'search': 'product', 'price_min': 105})
+
+    def test_detail_budget(self):
+        """Test product detail, uncached and cached."""
+        url = reverse('product-detail', args=[self.product.id])
+        self.request('product-detail (uncached)', 'get', url)
+        self.request('product-detail (cached)', 'get', url)
+
+    def test_read_action_budgets(self):
+        """Test the summary, low-stock, changes and export endpoints."""
+        self.request('product-summary', 'get', reverse('product-summary'))
+        # The first call builds the user's low-stock index
+        self.client.get(reverse('product-low-stock'))
+        self.request('product-low-stock', 'get', reverse('product-low-stock'))
+        self.request('product-changes', 'get', reverse('product-changes'))
+        self.request('product-export', 'get', reverse('product-export'))
+
+    def test_write_budgets(self):
+        """Test creating, updating, adjusting and deleting products."""
+        url = reverse('product-detail', args=[self.product.id])
+        self.request('product-create', 'post', reverse('product-list'), {'name': 'New', 'price': 5, 'quantity': 1})
+        self.request('product-update', 'put', url, {'name': 'Updated', 'price': 5, 'quantity': 1})
+        self.request('product-partial-update', 'patch', url, {'quantity': 3})
+        self.request('product-adjust', 'post', reverse('product-adjust', args=[self.product.id]), {'delta': 1})
+        self.request('product-bulk-create', 'post', reverse('product-bulk'), [
+            {'name': f'Bulk {i}', 'price': 1, 'quantity': 1} for i in range(10)
+        ])
+        self.request('product-destroy', 'delete', url)
+
+    def test_over_budget_fails_with_queries(self):
+        """Test exceeding a budget fails and lists the queries made."""
+        self.query_budgets = {'no queries': Budget(queries=0, redis_commands=0)}
+        with self.assertRaises(AssertionError) as context:
+            with self.assertWithinBudget('no queries'):
+                list(Product.objects.filter(user=self.user))
+        self.assertIn('1 queries, budget 0', str(context.exception))
+        self.assertIn('inventory_product', str(context.exception))
+
+        with self.assertRaises(AssertionError) as context:
+            with self.assertWithinBudget('no queries'):
+                product_cache.get('missing')
+        self.assertIn('1 Redis commands, budget 0', str(context.exception))
+        self.assertIn('GET', str(context.exception))
+
+
+# URLconf serving the product reads from the async views, for the tests below
+urlpatterns = [
+    path('api/products/', include(with_async_reads(router.urls))),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncProductAPITestCase(ProductAPITestCase):
+    """Run the Product API suite against the async list and retrieve views."""
+
+    def test_reads_are_async(self):
+        """Test the list and detail routes resolve to async views."""
+        for url in (reverse('product-list'), reverse('product-detail', args=[self.product1.id])):
+            self.assertTrue(inspect.iscoroutinefunction(resolve(url).func))
+
+    def test_cached_read_runs_no_queries(self):
+        """Test a cache hit is served from Redis alone."""
+        url = reverse('product-detail', args=[self.product1.id])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['name'], 'Test Product 1')
+
+    def test_server_timing(self):
+        """Test that async cache reads are counted in Server-Timing."""
+        url = reverse('product-detail', args=[self.product1.id])
+        self.client.get(url)
+        timing = self.client.get(url)['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertRegex(timing, r'cache-product_cache;dur=[0-9.]+;desc="ops=\d+ hits=[1-9]\d* misses=0"')
+
+    def test_jwt_authentication(self):
+        """Test bearer tokens are accepted, and bad ones rejected like the sync views do."""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        response = client.get(reverse('product-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+
+        client.credentials(HTTP_AUTHORIZATION='Bearer invalid')
+        response = client.get(reverse('product-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_writes_fall_back_to_sync_view(self):
+        """Test non-GET requests on the async routes still reach the viewset."""
+        response = self.client.post(
+            reverse('product-list'), {'name': 'Async Product', 'price': 5, 'quantity': 1}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.get(reverse('product-detail', args=[response.data['id']]))
+        self.assertEqual(response.data['name'], 'Async Product')
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncProductCacheInvalidationTestCase(ProductCacheInvalidationTestCase):
+    """Run the cache invalidation suite against the async read views."""
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncProductConditionalGetTestCase(ProductConditionalGetTestCase):
+    """Run the conditional GET suite against the async read views."""
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncProductTwoTierCacheTestCase(ProductTwoTierCacheTestCase):
+    """Run the two-tier cache suite against the async read views."""
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncProductFilterTestCase(ProductFilterTestCase):
+    """Run the search and filtering suite against the async list view."""
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncProductRowEncoderTestCase(ProductRowEncoderTestCase):
+    """Run the row encoder suite against the async read views."""
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncProductQueryBudgetTestCase(ProductQueryBudgetTestCase):
+    """Hold the async list and retrieve views to the same budgets."""
@@ -1,10 +1,32 @@
+from django.conf import settings
 from django.urls import path, include
+from django.urls.resolvers import URLPattern
 from rest_framework.routers import DefaultRouter
+from .async_views import async_read_view, list_products, retrieve_product
 from .views import ProductViewSet
 
 router = DefaultRouter()
 router.register(r'', ProductViewSet, basename='product')
 
+# Async handlers for the product read routes, by URL name
+ASYNC_READS = {
+    'product-list': list_products,
+    'product-detail': retrieve_product,
+}
+
+def with_async_reads(urls):
+    """
+    Serve GET requests on the product list and detail routes (including
+    their format suffix variants) from async handlers, for ASGI servers.
+    """
+    return [
+        URLPattern(url.pattern, async_read_view(url.callback, ASYNC_READS[url.name]), url.default_args, url.name)
+        if url.name in ASYNC_READS else url
+        for url in urls
+    ]
+
+router_urls = with_async_reads(router.urls) if settings.PRODUCT_ASYNC_READS else router.urls
+
 urlpatterns = [
-    path('', include(router.urls)),
-]
\ No newline at end of file
+    path('', include(router_urls)),
+]
@@ -0,0 +1,174 @@
+from django.conf import settings
+from stockease.metrics import record_cache_operation
+from .cache_utils import (
+    CACHE_HIT, CACHE_MISS, CACHE_STALE, LOCK_POLL_INTERVAL, RELEASE_LOCK, cache_logger, format_list_key,
+    format_product_key, get_fresh_key, get_generation_key, get_local_cache, get_lock_key, l2_stats, product_cache
+)
+import asyncio
+import redis.asyncio
+import time
+import uuid
+import weakref
+
+# Async counterparts of the product cache functions in cache_utils. They use
+# django-redis' key and value encoding, so entries are shared with the sync code.
+
+# Cache alias the operations are reported under in request metrics
+METRICS_LABEL = 'product_cache'
+
+# One client per event loop: redis.asyncio connections can't be shared across loops
+_async_clients = weakref.WeakKeyDictionary()
+
+def get_async_redis():
+    """
+    Get an async Redis client for the product cache in the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = redis.asyncio.Redis.from_url(settings.CACHES['product_cache']['LOCATION'])
+        _async_clients[loop] = client
+    return client
+
+async def acache_get_many(keys):
+    """
+    Get several keys from L1, falling back to Redis for the ones it lacks.
+
+    Returns:
+        dict: The keys that were found, with their values
+    """
+    local_cache = get_local_cache()
+    found = local_cache.get_many(keys) if local_cache is not None else {}
+    missing = [key for key in keys if key not in found]
+    if missing:
+        client = product_cache.client
+        started = time.perf_counter()
+        values = await get_async_redis().mget([client.make_key(key) for key in missing])
+        fetched = {key: client.decode(value) for key, value in zip(missing, values) if value is not None}
+        record_cache_operation(
+            METRICS_LABEL, time.perf_counter() - started, hits=len(fetched), misses=len(missing) - len(fetched)
+        )
+        l2_stats.record(hits=len(fetched), misses=len(missing) - len(fetched))
+        if local_cache is not None and fetched:
+            local_cache.set_many(fetched)
+        found.update(fetched)
+    return found
+
+async def acache_get(key):
+    """
+    Get one key through both cache tiers.
+    """
+    return (await acache_get_many([key])).get(key)
+
+async def acache_add(key, value, timeout):
+    """
+    Store a value only if the key doesn't exist, like product_cache.add().
+
+    Returns:
+        bool: Whether the value was stored
+    """
+    client = product_cache.client
+    px = int(timeout * 1000) if timeout is not None else None
+    started = time.perf_counter()
+    added = await get_async_redis().set(client.make_key(key), client.encode(value), nx=True, px=px)
+    record_cache_operation(METRICS_LABEL, time.perf_counter() - started)
+    return bool(added)
+
+async def aset_cache_entry(cache_key, value):
+    """
+    Store a value together with its soft expiry, like set_cache_entry().
+    """
+    client = product_cache.client
+    timeout = product_cache.default_timeout
+    px = int(timeout * 1000) if timeout is not None else None
+    mapping = {
+        cache_key: value,
+        get_fresh_key(cache_key): time.time() + settings.PRODUCT_CACHE_SOFT_TIMEOUT,
+    }
+    started = time.perf_counter()
+    async with get_async_redis().pipeline(transaction=False) as pipe:
+        for key, item in mapping.items():
+            pipe.set(client.make_key(key), client.encode(item), px=px)
+        await pipe.execute()
+    record_cache_operation(METRICS_LABEL, time.perf_counter() - started)
+    local_cache = get_local_cache()
+    if local_cache is not None:
+        local_cache.set_many(mapping)
+
+async def aget_list_generation(user_id):
+    """
+    Get the current list cache generation for a user, like get_list_generation().
+    """
+    key = get_generation_key(user_id)
+    generation = await acache_get(key)
+    if generation is None:
+        await acache_add(key, int(time.time() * 1_000_000), timeout=None)
+        generation = await acache_get(key)
+    return generation
+
+async def aget_cache_key(user_id, product_id=None, list_view=False, page=None, page_size=None, cursor=None,
+                         filters=None):
+    """
+    Generate a cache key for a product or list of products, like get_cache_key().
+    """
+    if product_id:
+        return format_product_key(user_id, product_id)
+    generation = await aget_list_generation(user_id)
+    return format_list_key(user_id, generation, list_view, page, page_size, cursor, filters)
+
+async def arebuild_entry(cache_key, rebuild, lock_key, token):
+    """
+    Await rebuild, cache its result and release the rebuild lock.
+    """
+    try:
+        value = await rebuild()
+        await aset_cache_entry(cache_key, value)
+        return value
+    finally:
+        # Only release the lock if it still belongs to this worker
+        client = product_cache.client
+        started = time.perf_counter()
+        await get_async_redis().eval(RELEASE_LOCK, 1, client.make_key(lock_key), client.encode(token))
+        record_cache_operation(METRICS_LABEL, time.perf_counter() - started)
+
+async def aget_or_rebuild(cache_key, rebuild):
+    """
+    Get a cached value, rebuilding it in at most one worker at a time.
+
+    Follows the same protocol as get_or_rebuild(), sharing its locks, but
+    waits for another worker's rebuild without blocking the event loop.
+
+    Args:
+        cache_key: The key of the cache entry
+        rebuild: Coroutine function returning the value to cache
+
+    Returns:
+        tuple: (value, outcome) where outcome is CACHE_HIT, CACHE_STALE or CACHE_MISS
+    """
+    fresh_key = get_fresh_key(cache_key)
+    entry = await acache_get_many([cache_key, fresh_key])
+    value = entry.get(cache_key)
+    if value is not None and entry.get(fresh_key, 0) > time.time():
+        return value, CACHE_HIT
+
+    lock_key = get_lock_key(cache_key)
+    token = uuid.uuid4().hex
+    if await acache_add(lock_key, token, timeout=settings.PRODUCT_CACHE_LOCK_TIMEOUT):
+        return await arebuild_entry(cache_key, rebuild, lock_key, token), CACHE_MISS
+
+    if value is not None:
+        # Another worker is already rebuilding this entry
+        cache_logger.debug(f"Serving stale value for {cache_key} while it is rebuilt")
+        return value, CACHE_STALE
+
+    deadline = time.monotonic() + settings.PRODUCT_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+        value = await acache_get(cache_key)
+        if value is not None:
+            return value, CACHE_HIT
+
+    cache_logger.warning(f"Gave up waiting for the rebuild of {cache_key}")
+    value = await rebuild()
+    await aset_cache_entry(cache_key, value)
+    return value, CACHE_MISS
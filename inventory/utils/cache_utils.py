@@ -1,49 +1,410 @@
+from django.conf import settings
 from django.core.cache import caches
-import json
+from django_redis import get_redis_connection
+from urllib.parse import urlencode
+from ..responses import render_json
+from .local_cache import CacheStats, LocalCache
+import hashlib
+import logging
+import threading
+import time
+import uuid
 
 # Get the product cache
 product_cache = caches['product_cache']
 
-def get_cache_key(user_id, product_id=None, list_view=False, page=None, page_size=None):
+cache_logger = logging.getLogger('inventory.cache')
+
+# Pub/sub channel telling every worker which user's L1 entries to drop
+INVALIDATION_CHANNEL = 'product_cache:invalidate'
+
+# Hit/miss counters for the Redis tier; the L1 tier keeps its own
+l2_stats = CacheStats()
+
+_local_cache = None
+_local_cache_lock = threading.Lock()
+
+# How often a worker waiting for another worker's rebuild re-checks the cache
+LOCK_POLL_INTERVAL = 0.05
+
+# Delete a rebuild lock only if it still holds this worker's token, in one step
+# so a lock that expired and was taken by another worker is left alone
+RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Outcomes reported by get_or_rebuild
+CACHE_HIT = 'hit'
+CACHE_STALE = 'stale'
+CACHE_MISS = 'miss'
+
+def get_local_cache():
+    """
+    Get this worker's in-process (L1) product cache.
+
+    It is created on first use, after the server has forked its workers,
+    together with the pub/sub listener that applies other workers'
+    invalidations.
+
+    Returns:
+        LocalCache: The L1 cache, or None when PRODUCT_CACHE_L1_ENABLED is off
+    """
+    global _local_cache
+    if not settings.PRODUCT_CACHE_L1_ENABLED:
+        return None
+    if _local_cache is None:
+        with _local_cache_lock:
+            if _local_cache is None:
+                local_cache = LocalCache(
+                    settings.PRODUCT_CACHE_L1_MAX_ENTRIES, settings.PRODUCT_CACHE_L1_TIMEOUT
+                )
+                start_invalidation_listener(local_cache)
+                _local_cache = local_cache
+    return _local_cache
+
+def start_invalidation_listener(local_cache):
+    """
+    Subscribe to INVALIDATION_CHANNEL on a background thread, dropping the
+    L1 entries of each user whose products another worker wrote.
+    """
+    def handle_invalidation(message):
+        user_id = message['data']
+        if isinstance(user_id, bytes):
+            user_id = user_id.decode()
+        local_cache.delete_prefix(f"user:{user_id}:")
+
+    def handle_error(error, pubsub, thread):
+        # Keep listening; missed messages are bounded by the L1 TTL
+        cache_logger.warning(f"Product cache invalidation listener error: {error}")
+        time.sleep(1)
+
+    pubsub = get_redis_connection('product_cache').pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(**{INVALIDATION_CHANNEL: handle_invalidation})
+    pubsub.run_in_thread(sleep_time=1, daemon=True, exception_handler=handle_error)
+
+def get_cache_stats():
+    """
+    Get hit/miss counters for each cache tier in this worker.
+
+    Returns:
+        dict: {'l1': {'hits': ..., 'misses': ...}, 'l2': {...}}
+    """
+    local_cache = get_local_cache()
+    l1_stats = local_cache.stats.as_dict() if local_cache is not None else {'hits': 0, 'misses': 0}
+    return {'l1': l1_stats, 'l2': l2_stats.as_dict()}
+
+def cache_get_many(keys):
+    """
+    Get several keys from L1, falling back to Redis for the ones it lacks.
+
+    Values found in Redis are copied into L1.
+
+    Returns:
+        dict: The keys that were found, with their values
+    """
+    local_cache = get_local_cache()
+    found = local_cache.get_many(keys) if local_cache is not None else {}
+    missing = [key for key in keys if key not in found]
+    if missing:
+        fetched = product_cache.get_many(missing)
+        l2_stats.record(hits=len(fetched), misses=len(missing) - len(fetched))
+        if local_cache is not None and fetched:
+            local_cache.set_many(fetched)
+        found.update(fetched)
+    return found
+
+def cache_get(key):
+    """
+    Get one key through both cache tiers.
+    """
+    return cache_get_many([key]).get(key)
+
+def cache_set_many(mapping):
+    """
+    Store values in Redis and in this worker's L1.
+    """
+    product_cache.set_many(mapping)
+    local_cache = get_local_cache()
+    if local_cache is not None:
+        local_cache.set_many(mapping)
+
+def evict_local_user(user_id):
+    """
+    Drop a user's entries from this worker's L1 and tell the other workers
+    to do the same.
+    """
+    local_cache = get_local_cache()
+    if local_cache is not None:
+        local_cache.delete_prefix(f"user:{user_id}:")
+        get_redis_connection('product_cache').publish(INVALIDATION_CHANNEL, str(user_id))
+
+def get_generation_key(user_id):
+    """
+    Generate the cache key holding a user's list cache generation counter.
+    """
+    return f"user:{user_id}:products:generation"
+
+def get_list_generation(user_id):
+    """
+    Get the current list cache generation for a user.
+
+    The counter is seeded from the clock (in microseconds) the first time it
+    is read, so a counter that was evicted from Redis never restarts at a
+    value that older, still-cached pages were stored under, unless the user
+    wrote faster than once per microsecond.
+
+    Args:
+        user_id: The ID of the user who owns the products
+
+    Returns:
+        int: The current generation
+    """
+    key = get_generation_key(user_id)
+    generation = cache_get(key)
+    if generation is None:
+        product_cache.add(key, int(time.time() * 1_000_000), timeout=None)
+        generation = cache_get(key)
+    return generation
+
+def bump_list_generation(user_id):
+    """
+    Atomically move a user's list caches to a new generation.
+
+    Args:
+        user_id: The ID of the user who owns the products
+
+    Returns:
+        int: The new generation
+    """
+    key = get_generation_key(user_id)
+    try:
+        return product_cache.incr(key)
+    except ValueError:
+        # Counter is missing (never read or evicted); seed it, then move past it
+        get_list_generation(user_id)
+        return product_cache.incr(key)
+
+def get_cache_key(user_id, product_id=None, list_view=False, page=None, page_size=None, cursor=None,
+                  filters=None):
     """
     Generate a cache key for a product or list of products.
-    
+
+    List keys are namespaced by the user's current generation, so bumping the
+    generation makes every previously cached list page unreachable.
+
     Args:
         user_id: The ID of the user who owns the product(s)
         product_id: The ID of the specific product, or None for all user products
         list_view: Whether this is for a list view (with pagination)
         page: The page number for pagination
         page_size: The page size for pagination
-        
+        cursor: The opaque cursor for cursor pagination ('' for the first page)
+        filters: Normalized search, filter and ordering parameters of a list view
+
     Returns:
         str: A cache key string
     """
     if product_id:
-        return f"user:{user_id}:product:{product_id}"
+        return format_product_key(user_id, product_id)
+    return format_list_key(
+        user_id, get_list_generation(user_id), list_view, page, page_size, cursor, filters
+    )
+
+def format_product_key(user_id, product_id):
+    """
+    Generate the cache key of a product's detail entry.
+    """
+    return f"user:{user_id}:product:{product_id}"
+
+def format_list_key(user_id, generation, list_view=False, page=None, page_size=None, cursor=None, filters=None):
+    """
+    Generate the cache key of a list page under a given generation.
+
+    See get_cache_key for the arguments.
+    """
+    # Hash the filters so arbitrary search terms keep keys short and safe
+    suffix = f":filters:{get_filters_digest(filters)}" if filters else ''
+    if list_view and cursor is not None and page_size:
+        return f"user:{user_id}:products:v{generation}:cursor:{cursor}:size:{page_size}{suffix}"
     if list_view and page and page_size:
-        return f"user:{user_id}:products:page:{page}:size:{page_size}"
-    return f"user:{user_id}:products"
+        return f"user:{user_id}:products:v{generation}:page:{page}:size:{page_size}{suffix}"
+    return f"user:{user_id}:products:v{generation}{suffix}"
+
+def get_filters_digest(filters):
+    """
+    Hash normalized list filters into a short, order-independent token.
+    """
+    query = urlencode(sorted(filters.items()))
+    return hashlib.blake2b(query.encode(), digest_size=8).hexdigest()
+
+def make_etag(*parts):
+    """
+    Build a strong ETag from values that identify one version of a response.
+
+    Callers pass either a generation-bearing cache key, so the tag changes
+    whenever the user's products do without the response having to be
+    rendered, or the cached bytes themselves; plus anything else the
+    representation depends on.
+
+    Returns:
+        str: A quoted ETag
+    """
+    encoded = (part if isinstance(part, bytes) else str(part).encode() for part in parts)
+    digest = hashlib.blake2b(b':'.join(encoded), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+def get_fresh_key(cache_key):
+    """
+    Generate the key holding the soft expiry timestamp of a cache entry.
+    """
+    return f"{cache_key}:fresh"
+
+def get_lock_key(cache_key):
+    """
+    Generate the key of the lock taken while a cache entry is rebuilt.
+    """
+    return f"{cache_key}:lock"
+
+def set_cache_entry(cache_key, value):
+    """
+    Store a value together with its soft expiry in one round trip.
+
+    The value stays in Redis for the cache's TIMEOUT, but is considered
+    fresh only for PRODUCT_CACHE_SOFT_TIMEOUT seconds; after that it is
+    rebuilt by one worker while the others keep serving it.
+
+    Args:
+        cache_key: The key to store the value under
+        value: The value to cache
+    """
+    cache_set_many({
+        cache_key: value,
+        get_fresh_key(cache_key): time.time() + settings.PRODUCT_CACHE_SOFT_TIMEOUT,
+    })
+
+def rebuild_entry(cache_key, rebuild, lock_key, token):
+    """
+    Run rebuild, cache its result and release the rebuild lock.
+    """
+    try:
+        value = rebuild()
+        set_cache_entry(cache_key, value)
+        return value
+    finally:
+        release_lock(lock_key, token)
+
+def release_lock(lock_key, token):
+    """
+    Release a rebuild lock if it still belongs to this worker.
+    """
+    client = product_cache.client
+    get_redis_connection('product_cache').eval(RELEASE_LOCK, 1, client.make_key(lock_key), client.encode(token))
 
-def invalidate_product_cache(user_id, product_id=None):
+def get_or_rebuild(cache_key, rebuild):
+    """
+    Get a cached value, rebuilding it in at most one worker at a time.
+
+    - Fresh entries are returned as is.
+    - Entries past their soft expiry are rebuilt by the worker that takes the
+      rebuild lock; everyone else keeps serving the stale value meanwhile.
+    - Missing entries are rebuilt by the lock holder while the other workers
+      wait up to PRODUCT_CACHE_LOCK_WAIT seconds for the result, then fall
+      back to rebuilding themselves.
+
+    Invalidation moves list keys to a new generation, so values cached
+    before a write are never served as stale after it.
+
+    Args:
+        cache_key: The key of the cache entry
+        rebuild: Callable returning the value to cache; exceptions propagate
+            and nothing is cached
+
+    Returns:
+        tuple: (value, outcome) where outcome is CACHE_HIT, CACHE_STALE or CACHE_MISS
+    """
+    fresh_key = get_fresh_key(cache_key)
+    entry = cache_get_many([cache_key, fresh_key])
+    value = entry.get(cache_key)
+    if value is not None and entry.get(fresh_key, 0) > time.time():
+        return value, CACHE_HIT
+
+    lock_key = get_lock_key(cache_key)
+    token = uuid.uuid4().hex
+    if product_cache.add(lock_key, token, timeout=settings.PRODUCT_CACHE_LOCK_TIMEOUT):
+        return rebuild_entry(cache_key, rebuild, lock_key, token), CACHE_MISS
+
+    if value is not None:
+        # Another worker is already rebuilding this entry
+        cache_logger.debug(f"Serving stale value for {cache_key} while it is rebuilt")
+        return value, CACHE_STALE
+
+    deadline = time.monotonic() + settings.PRODUCT_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = cache_get(cache_key)
+        if value is not None:
+            return value, CACHE_HIT
+
+    cache_logger.warning(f"Gave up waiting for the rebuild of {cache_key}")
+    value = rebuild()
+    set_cache_entry(cache_key, value)
+    return value, CACHE_MISS
+
+def set_cached_product(user_id, product_id, data):
+    """
+    Store a product's serialized representation in its detail cache entry.
+
+    Args:
+        user_id: The ID of the user who owns the product
+        product_id: The ID of the product
+        data: The serialized product, stored as rendered JSON bytes
+    """
+    set_cache_entry(get_cache_key(user_id, product_id), render_json(data))
+
+def invalidate_product_cache(user_id, product_id=None, product_ids=None):
     """
     Invalidate cache for a specific product and/or the user's product list.
-    
+
+    List pages are not deleted: the user's generation is incremented with a
+    single INCR and the old pages age out through their TTL. When the L1
+    tier is enabled, the user's L1 entries are dropped here and in the other
+    workers through pub/sub.
+
     Args:
         user_id: The ID of the user who owns the product
         product_id: The ID of the specific product, or None to only invalidate list caches
+        product_ids: IDs of several products whose detail caches should be dropped
     """
     # Delete product detail cache if product_id is provided
     if product_id:
         product_cache.delete(get_cache_key(user_id, product_id))
-    
-    # Delete the main list cache
-    product_cache.delete(get_cache_key(user_id))
-    
-    # For django-redis backend
-    try:
-        client = product_cache._client
-        keys = client.keys(f"user:{user_id}:products:page:*")
-        if keys:
-            client.delete(*keys)
-    except:
-        pass
\ No newline at end of file
+    if product_ids:
+        product_cache.delete_many([get_cache_key(user_id, pid) for pid in product_ids])
+
+    # Move all list caches to a new generation
+    bump_list_generation(user_id)
+
+    # Drop the user's L1 entries in every worker
+    evict_local_user(user_id)
+
+def refresh_product_cache(user_id, product_id, data):
+    """
+    Update caches after a product was written.
+
+    With PRODUCT_CACHE_WRITE_THROUGH enabled the new representation replaces
+    the detail entry, so the next read is a hit; otherwise the detail entry
+    is deleted. List pages are invalidated either way.
+
+    Args:
+        user_id: The ID of the user who owns the product
+        product_id: The ID of the product that was written
+        data: The product's new serialized representation
+    """
+    if settings.PRODUCT_CACHE_WRITE_THROUGH:
+        set_cached_product(user_id, product_id, data)
+        invalidate_product_cache(user_id, None)
+    else:
+        invalidate_product_cache(user_id, product_id)
\ No newline at end of file
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db import connections
+from ..models import InventorySummary
+import json
+
+
+def estimate_count(queryset):
+    """
+    Get the query planner's estimate of the rows in queryset.
+
+    Returns:
+        int: The estimated row count, or None if the database can't estimate
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def get_product_count(user_id, queryset, filtered):
+    """
+    Count the products a list page is taken from, without a full COUNT(*).
+
+    An unfiltered list is all of the user's products, which the inventory
+    summary already counts exactly. Filtered lists are counted up to
+    PRODUCT_COUNT_EXACT_LIMIT rows; past that, the planner's estimate is
+    used (on PostgreSQL), so the cost of a count stays bounded.
+
+    Args:
+        user_id: The ID of the user who owns the products
+        queryset: The user's products, with any filters applied
+        filtered: Whether filters narrowed the queryset
+
+    Returns:
+        tuple: (count, exact) where exact is False for an estimate
+    """
+    if not filtered:
+        return InventorySummary.objects.get_for_user(user_id).sku_count, True
+    limit = settings.PRODUCT_COUNT_EXACT_LIMIT
+    count = queryset.order_by()[:limit + 1].count()
+    if count <= limit:
+        return count, True
+    # There are more than limit rows, so the estimate can't be lower
+    return max(estimate_count(queryset) or 0, count), False
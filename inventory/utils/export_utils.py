@@ -0,0 +1,51 @@
+import csv
+import json
+
+from .row_encoder import PRODUCT_FIELDS, encode_products, product_rows
+
+# Export the same fields the API returns, in the same order
+EXPORT_FIELDS = PRODUCT_FIELDS
+# Rows fetched per round trip from the server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """
+    Pseudo-buffer for csv.writer that hands each written line straight back.
+    """
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset):
+    """
+    Yield product rows encoded like ProductSerializer without building model
+    instances, reading through a server-side cursor so memory stays flat.
+    """
+    rows = product_rows(queryset.order_by('id')).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return encode_products(rows)
+
+
+def stream_csv(queryset):
+    """
+    Yield a CSV export of the queryset, one line at a time.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in export_rows(queryset):
+        yield writer.writerow(row.values())
+
+
+def stream_ndjson(queryset):
+    """
+    Yield a newline-delimited JSON export of the queryset, one object per line.
+    """
+    for row in export_rows(queryset):
+        yield json.dumps(row) + '\n'
+
+
+# Supported export formats: content type, file extension and row generator
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv', stream_csv),
+    'ndjson': ('application/x-ndjson', 'ndjson', stream_ndjson),
+}
\ No newline at end of file
@@ -0,0 +1,235 @@
+import csv
+import io
+import itertools
+import logging
+
+from django.db import connection, transaction
+
+from ..models import InventorySummary, Product, ProductImport, normalize_product_name
+from ..serializers import ProductSerializer, clean_product_name
+from .cache_utils import invalidate_product_cache
+from .low_stock_utils import index_quantities
+
+logger = logging.getLogger('inventory')
+
+# Columns read from the CSV; name and price are required
+IMPORT_FIELDS = ('name', 'price', 'quantity')
+REQUIRED_FIELDS = ('name', 'price')
+DEFAULT_BATCH_SIZE = 5000
+MAX_BATCH_SIZE = 50000
+# Cap on rejected rows kept on the ProductImport record
+MAX_RECORDED_ERRORS = 100
+
+STAGING_TABLE = 'inventory_product_staging'
+
+
+class ImportFormatError(ValueError):
+    """
+    Raised when the CSV can't be imported at all, e.g. a missing column.
+    """
+
+
+def open_csv(text_stream):
+    """
+    Start reading a CSV file, checking its header for the required columns.
+
+    Args:
+        text_stream: A text file object positioned at the header row
+
+    Returns:
+        csv.DictReader: A reader over the data rows
+
+    Raises:
+        ImportFormatError: If a required column is missing
+    """
+    reader = csv.DictReader(text_stream)
+    missing = [field for field in REQUIRED_FIELDS if field not in (reader.fieldnames or [])]
+    if missing:
+        raise ImportFormatError(f"CSV is missing required column(s): {', '.join(missing)}.")
+    return reader
+
+
+def read_batches(reader, batch_size):
+    """
+    Stream-parse CSV rows into batches of (line_number, row) pairs.
+
+    Args:
+        reader: A csv.DictReader from open_csv
+        batch_size: Number of data rows per batch
+
+    Yields:
+        tuple: (batch_number, rows), numbering batches from 1
+    """
+    numbered = ((reader.line_num, row) for row in reader)
+    for batch_number in itertools.count(1):
+        rows = list(itertools.islice(numbered, batch_size))
+        if not rows:
+            return
+        yield batch_number, rows
+
+
+def validate_batch(rows):
+    """
+    Validate a batch of CSV rows with the same field rules as the API.
+
+    Rows sharing a normalized name are collapsed so the last one wins, which
+    matches how the merge treats names that already exist.
+
+    Returns:
+        tuple: (valid, errors) where valid is a list of
+        (name, normalized_name, price, quantity) tuples and errors is a list
+        of {"line": ..., "errors": ...} dicts
+    """
+    valid = {}
+    errors = []
+    for line, row in rows:
+        # Blank cells are treated as missing so optional columns use their defaults
+        data = {field: row[field].strip() for field in IMPORT_FIELDS if (row.get(field) or '').strip()}
+        # Existing names are merged rather than rejected, so skip that check
+        serializer = ProductSerializer(data=data, context={'bulk': True})
+        if not serializer.is_valid():
+            errors.append({'line': line, 'errors': serializer.errors})
+            continue
+        name = clean_product_name(serializer.validated_data['name'])
+        normalized_name = normalize_product_name(name)
+        valid[normalized_name] = (
+            name,
+            normalized_name,
+            serializer.validated_data['price'],
+            serializer.validated_data.get('quantity', 0),
+        )
+    return list(valid.values()), errors
+
+
+def copy_batch(user_id, rows):
+    """
+    Load rows into a temporary staging table with COPY and merge them into
+    the products table, updating products whose normalized name exists.
+
+    Must run inside a transaction. The staging table is dropped before
+    returning, since a savepoint inside a caller's transaction doesn't
+    commit and ON COMMIT DROP alone would leave it for the next batch.
+
+    Returns:
+        tuple: (product_ids, old_values) with the IDs of the inserted or
+        updated products and the (price, quantity) the updated ones had
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+
+    table = Product._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE {STAGING_TABLE} ("
+            "name varchar(255), normalized_name varchar(255), price integer, quantity integer"
+            ") ON COMMIT DROP"
+        )
+        cursor.copy_expert(
+            f"COPY {STAGING_TABLE} (name, normalized_name, price, quantity) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+        # Lock the products about to be overwritten and read what they held
+        cursor.execute(
+            f"SELECT p.price, p.quantity FROM {table} p JOIN {STAGING_TABLE} s USING (normalized_name) "
+            "WHERE p.user_id = %s FOR UPDATE OF p",
+            [user_id]
+        )
+        old_values = cursor.fetchall()
+        cursor.execute(
+            f"INSERT INTO {table} (user_id, name, normalized_name, price, quantity, created_at, updated_at) "
+            # clock_timestamp(), not the transaction's start time, so rows aren't stamped
+            # earlier than the changes feed's settle window allows for
+            f"SELECT %s, name, normalized_name, price, quantity, clock_timestamp(), clock_timestamp() "
+            f"FROM {STAGING_TABLE} "
+            "ON CONFLICT (user_id, normalized_name) DO UPDATE SET "
+            "name = EXCLUDED.name, price = EXCLUDED.price, quantity = EXCLUDED.quantity, "
+            "updated_at = EXCLUDED.updated_at "
+            "RETURNING id",
+            [user_id]
+        )
+        product_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute(f"DROP TABLE {STAGING_TABLE}")
+        return product_ids, old_values
+
+
+def run_import(product_import, reader):
+    """
+    Import a CSV file batch by batch, yielding a progress report per batch.
+
+    Each batch is merged and recorded on product_import in one transaction,
+    so an interrupted import resumes after its last completed batch when run
+    again with the same ProductImport and file.
+
+    Args:
+        product_import: The ProductImport tracking this file
+        reader: A csv.DictReader from open_csv
+
+    Yields:
+        dict: Progress for each batch merged during this run
+    """
+    user_id = product_import.user_id
+    product_import.status = ProductImport.STATUS_RUNNING
+    product_import.save(update_fields=['status', 'updated_at'])
+
+    try:
+        for batch_number, rows in read_batches(reader, product_import.batch_size):
+            if batch_number <= product_import.batches_completed:
+                continue
+
+            valid, errors = validate_batch(rows)
+            with transaction.atomic():
+                product_ids, old_values = copy_batch(user_id, valid) if valid else ([], [])
+                if product_ids:
+                    # Rows with an existing name replace that product rather than add one
+                    InventorySummary.objects.apply_delta(
+                        user_id,
+                        skus=len(valid) - len(old_values),
+                        units=sum(quantity for _, _, _, quantity in valid)
+                        - sum(quantity for _, quantity in old_values),
+                        value=sum(price * quantity for _, _, price, quantity in valid)
+                        - sum(price * quantity for price, quantity in old_values),
+                    )
+                product_import.batches_completed = batch_number
+                product_import.rows_imported += len(rows) - len(errors)
+                product_import.rows_rejected += len(errors)
+                room = MAX_RECORDED_ERRORS - len(product_import.errors)
+                if room > 0:
+                    product_import.errors = product_import.errors + errors[:room]
+                product_import.save()
+
+            if product_ids:
+                invalidate_product_cache(user_id, product_ids=product_ids)
+                index_quantities(user_id, dict(
+                    Product.objects.filter(id__in=product_ids).values_list('id', 'quantity')
+                ))
+            logger.info(f"Import {product_import.id}: batch {batch_number} merged {len(valid)} rows")
+            yield {
+                'import_id': product_import.id,
+                'batch': batch_number,
+                'rows': len(rows),
+                'imported': len(rows) - len(errors),
+                'rejected': len(errors),
+                'errors': errors,
+            }
+    except Exception:
+        product_import.status = ProductImport.STATUS_FAILED
+        product_import.save(update_fields=['status', 'updated_at'])
+        logger.exception(f"Import {product_import.id} failed after batch {product_import.batches_completed}")
+        raise
+
+    product_import.status = ProductImport.STATUS_COMPLETED
+    product_import.save(update_fields=['status', 'updated_at'])
+
+
+def get_import_summary(product_import):
+    """
+    Summarize a ProductImport for progress reports.
+    """
+    return {
+        'import_id': product_import.id,
+        'status': product_import.status,
+        'batches_completed': product_import.batches_completed,
+        'rows_imported': product_import.rows_imported,
+        'rows_rejected': product_import.rows_rejected,
+    }
\ No newline at end of file
@@ -0,0 +1,95 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+class CacheStats:
+    """
+    Thread-safe hit/miss counters for one cache tier.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hits=0, misses=0):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def as_dict(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache whose entries expire after a short TTL.
+
+    Used as the first tier in front of the Redis product cache. The TTL
+    bounds how long an entry can outlive a write if an invalidation message
+    from another worker is missed.
+    """
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        """
+        Return a dict of the keys found and not yet expired.
+        """
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                value, expires = entry
+                if expires <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = value
+        self.stats.record(hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def set_many(self, mapping):
+        """
+        Store values, evicting the least recently used entries when full.
+        """
+        expires = time.monotonic() + self.timeout
+        with self._lock:
+            for key, value in mapping.items():
+                self._entries[key] = (value, expires)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        """
+        Drop every entry whose key starts with prefix.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
\ No newline at end of file
@@ -0,0 +1,133 @@
+from django_redis import get_redis_connection
+from ..models import Product
+import logging
+
+cache_logger = logging.getLogger('inventory.cache')
+
+# Member kept at +inf score so a built index with no products still exists
+INDEX_SENTINEL = '_built'
+# Members written per ZADD while rebuilding an index
+REBUILD_CHUNK_SIZE = 5000
+
+# Update an index only if it has been built; otherwise the next read builds it
+ZADD_IF_BUILT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('ZADD', KEYS[1], unpack(ARGV))
+end
+return 0
+"""
+
+def get_redis():
+    """
+    Get the raw Redis client of the product cache, which holds the indexes.
+    """
+    return get_redis_connection('product_cache')
+
+def get_low_stock_key(user_id):
+    """
+    Generate the key of the sorted set indexing a user's products by quantity.
+    """
+    return f"user:{user_id}:low_stock"
+
+def index_quantities(user_id, quantities):
+    """
+    Record the current quantity of products in a user's low-stock index.
+
+    Does nothing until the index has been built.
+
+    Args:
+        user_id: The ID of the user who owns the products
+        quantities: Dict mapping product IDs to their new quantity
+    """
+    if not quantities:
+        return
+    args = []
+    for product_id, quantity in quantities.items():
+        args.extend([quantity, product_id])
+    get_redis().eval(ZADD_IF_BUILT, 1, get_low_stock_key(user_id), *args)
+
+def unindex_products(user_id, product_ids):
+    """
+    Remove deleted products from a user's low-stock index.
+    """
+    product_ids = list(product_ids)
+    if product_ids:
+        get_redis().zrem(get_low_stock_key(user_id), *product_ids)
+
+def reconcile_low_stock(user_id, product_ids, quantities):
+    """
+    Correct low-stock index entries that disagree with the products table.
+
+    Entries drift when quantities are indexed out of order or a write skips
+    the index; each product is reset to its current quantity, or removed
+    if it no longer exists.
+
+    Args:
+        user_id: The ID of the user who owns the products
+        product_ids: IDs of the products whose entries to correct
+        quantities: Dict mapping the IDs that still exist to their current quantity
+    """
+    key = get_low_stock_key(user_id)
+    missing = [product_id for product_id in product_ids if product_id not in quantities]
+    pipe = get_redis().pipeline(transaction=False)
+    if quantities:
+        pipe.zadd(key, quantities)
+    if missing:
+        pipe.zrem(key, *missing)
+    pipe.execute()
+    cache_logger.info(f"Reconciled {len(product_ids)} low-stock index entries for user {user_id}")
+
+def rebuild_low_stock_index(user_id):
+    """
+    Rebuild a user's low-stock index from the products table.
+
+    The old index is replaced atomically, so readers never see a partial one.
+
+    Returns:
+        int: Number of products indexed
+    """
+    key = get_low_stock_key(user_id)
+    rows = Product.objects.filter(user_id=user_id).order_by().values_list('id', 'quantity')
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.delete(key)
+    pipe.zadd(key, {INDEX_SENTINEL: float('inf')})
+    count = 0
+    chunk = {}
+    for product_id, quantity in rows.iterator(chunk_size=REBUILD_CHUNK_SIZE):
+        chunk[product_id] = quantity
+        if len(chunk) == REBUILD_CHUNK_SIZE:
+            pipe.zadd(key, chunk)
+            count += len(chunk)
+            chunk = {}
+    if chunk:
+        pipe.zadd(key, chunk)
+        count += len(chunk)
+    pipe.execute()
+    cache_logger.info(f"Rebuilt low-stock index for user {user_id} with {count} products")
+    return count
+
+def get_low_stock(user_id, threshold, limit):
+    """
+    Find a user's products whose quantity is at or below threshold.
+
+    Served by ZRANGEBYSCORE in O(log n + k); an index that is missing,
+    e.g. after a Redis eviction, is rebuilt first.
+
+    Args:
+        user_id: The ID of the user who owns the products
+        threshold: The highest quantity counted as low stock
+        limit: The maximum number of product IDs to return
+
+    Returns:
+        tuple: (product_ids, count) where product_ids are ordered by quantity
+        and count is the total number of low-stock products
+    """
+    redis = get_redis()
+    key = get_low_stock_key(user_id)
+    if not redis.exists(key):
+        rebuild_low_stock_index(user_id)
+    pipe = redis.pipeline(transaction=False)
+    pipe.zrangebyscore(key, '-inf', threshold, start=0, num=limit)
+    pipe.zcount(key, '-inf', threshold)
+    members, count = pipe.execute()
+    return [int(member) for member in members], count
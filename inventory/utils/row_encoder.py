@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from ..serializers import ProductSerializer
+
+# Serializer fields whose representation of a database value is the value itself
+PASSTHROUGH_FIELDS = (serializers.IntegerField, serializers.CharField)
+
+
+def compile_row_encoder(serializer_class):
+    """
+    Build a read-only encoder producing what serializer_class(many=True).data
+    would, from values() dicts instead of model instances.
+
+    The serializer's fields are inspected once: integer and char fields are
+    passed through and datetimes are formatted like DRF's DateTimeField, so
+    no per-row field machinery runs. Serializers with any other field type
+    are rejected rather than encoded differently.
+
+    Args:
+        serializer_class: A ModelSerializer class with Meta.fields
+
+    Returns:
+        tuple: (fields, encode) where fields are the names to pass to
+        values() and encode is a generator function over such rows
+
+    Raises:
+        ImproperlyConfigured: If a field can't be encoded exactly
+    """
+    fields = tuple(serializer_class.Meta.fields)
+    datetime_fields = []
+    for name, field in serializer_class().fields.items():
+        if field.source != name:
+            raise ImproperlyConfigured(f"Can't encode {name}: its source is {field.source}.")
+        if isinstance(field, serializers.DateTimeField):
+            if not settings.USE_TZ or hasattr(field, 'timezone'):
+                raise ImproperlyConfigured(f"Can't encode {name}: only the current time zone is supported.")
+            if (getattr(field, 'format', api_settings.DATETIME_FORMAT) or '').lower() != ISO_8601:
+                raise ImproperlyConfigured(f"Can't encode {name}: only ISO 8601 datetimes are supported.")
+            datetime_fields.append(name)
+        elif not isinstance(field, PASSTHROUGH_FIELDS):
+            raise ImproperlyConfigured(f"Can't encode {name}: {type(field).__name__} is not supported.")
+    datetime_fields = tuple(datetime_fields)
+
+    def encode(rows):
+        # Resolved once per batch, as DRF does per value
+        current_timezone = timezone.get_current_timezone()
+        for row in rows:
+            for name in datetime_fields:
+                value = row[name]
+                if value:
+                    value = value.astimezone(current_timezone).isoformat()
+                    if value.endswith('+00:00'):
+                        value = value[:-6] + 'Z'
+                    row[name] = value
+                else:
+                    row[name] = None
+            yield row
+
+    return fields, encode
+
+
+# Fields and encoder matching ProductSerializer's output
+PRODUCT_FIELDS, encode_products = compile_row_encoder(ProductSerializer)
+
+
+def product_rows(queryset):
+    """
+    Restrict a product queryset to the serialized fields, as values() dicts.
+    """
+    return queryset.values(*PRODUCT_FIELDS)
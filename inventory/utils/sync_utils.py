@@ -0,0 +1,171 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from ..models import Product, ProductTombstone
+
+DEFAULT_CHANGES_LIMIT = 100
+MAX_CHANGES_LIMIT = 1000
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised when a changes cursor can't be decoded.
+    """
+
+
+class CursorExpired(InvalidCursor):
+    """
+    Raised when a cursor is older than the tombstone retention period, so
+    deletes it hasn't seen may have been pruned.
+    """
+
+
+def get_settle_window():
+    """
+    Rows stamped this recently may still be committing out of order, so a
+    caught-up stream's cursor is held back to re-send them on the next sync.
+    It must be longer than the longest product write transaction.
+    """
+    return timedelta(seconds=settings.PRODUCT_CHANGES_SETTLE_SECONDS)
+
+
+def encode_cursor(products_position, tombstones_position):
+    """
+    Encode the (timestamp, id) positions of both streams as an opaque cursor.
+    """
+    data = {
+        'p': [products_position[0].isoformat(), products_position[1]],
+        't': [tombstones_position[0].isoformat(), tombstones_position[1]],
+    }
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor from encode_cursor.
+
+    Returns:
+        tuple: ((timestamp, id), (timestamp, id)) for products and tombstones
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        positions = tuple(
+            (datetime.fromisoformat(data[stream][0]), int(data[stream][1]))
+            for stream in ('p', 't')
+        )
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError, IndexError):
+        raise InvalidCursor('Invalid cursor.')
+    if any(timestamp.tzinfo is None for timestamp, _ in positions):
+        raise InvalidCursor('Invalid cursor.')
+    return positions
+
+
+def read_after(queryset, field, position, limit):
+    """
+    Read up to limit rows ordered by (field, id) strictly after position.
+
+    The range condition on field lets the (user, field, id) index start the
+    scan at the cursor, so earlier rows are never read.
+
+    Returns:
+        tuple: (rows, has_more)
+    """
+    timestamp, last_id = position
+    rows = list(
+        queryset.filter(**{f'{field}__gte': timestamp})
+        .filter(Q(**{f'{field}__gt': timestamp}) | Q(id__gt=last_id))
+        .order_by(field, 'id')[:limit + 1]
+    )
+    return rows[:limit], len(rows) > limit
+
+
+def hold_back(position, has_more, now):
+    """
+    Move a caught-up stream's cursor to the start of the settle window.
+
+    Every row committed before the window was just read, so the cursor can
+    skip ahead to it even if the stream's last row is older; rows inside it
+    are sent again next time in case earlier ones are still committing.
+    """
+    if has_more:
+        return position
+    return (now - get_settle_window(), 0)
+
+
+def get_changes(user_id, cursor=None, limit=DEFAULT_CHANGES_LIMIT):
+    """
+    Get a page of products changed and deleted since cursor.
+
+    Products are read in (updated_at, id) order and tombstones in
+    (deleted_at, id) order, each up to limit rows, so memory use is bounded
+    by the page size. Without a cursor every product is returned, but no
+    tombstones, since the client has nothing to delete yet.
+
+    Args:
+        user_id: The ID of the user who owns the products
+        cursor: The next_cursor of the previous page, or None for a full sync
+        limit: Maximum rows read from each stream
+
+    Returns:
+        dict: updated (products), deleted (product IDs), next_cursor and
+        has_more, which is True until the client has caught up
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+        CursorExpired: If the cursor predates the tombstone retention period;
+            the client must start over with a full sync
+    """
+    now = timezone.now()
+    if cursor:
+        products_position, tombstones_position = decode_cursor(cursor)
+        if tombstones_position[0] < now - timedelta(days=settings.PRODUCT_TOMBSTONE_RETENTION_DAYS):
+            raise CursorExpired('Cursor has expired; sync again without a cursor.')
+    else:
+        products_position = (datetime.min.replace(tzinfo=dt_timezone.utc), 0)
+        tombstones_position = (now, 0)
+
+    products, more_products = read_after(
+        Product.objects.filter(user_id=user_id), 'updated_at', products_position, limit
+    )
+    tombstones, more_tombstones = read_after(
+        ProductTombstone.objects.filter(user_id=user_id), 'deleted_at', tombstones_position, limit
+    )
+
+    if products:
+        products_position = (products[-1].updated_at, products[-1].id)
+    if tombstones:
+        tombstones_position = (tombstones[-1].deleted_at, tombstones[-1].id)
+    next_cursor = encode_cursor(
+        hold_back(products_position, more_products, now),
+        hold_back(tombstones_position, more_tombstones, now),
+    )
+    return {
+        'updated': products,
+        'deleted': [tombstone.product_id for tombstone in tombstones],
+        'next_cursor': next_cursor,
+        'has_more': more_products or more_tombstones,
+    }
+
+
+def prune_tombstones(batch_size=10000):
+    """
+    Delete tombstones older than PRODUCT_TOMBSTONE_RETENTION_DAYS, in batches
+    so no single statement holds locks for long.
+
+    Returns:
+        int: The number of tombstones deleted
+    """
+    cutoff = timezone.now() - timedelta(days=settings.PRODUCT_TOMBSTONE_RETENTION_DAYS)
+    deleted = 0
+    while True:
+        ids = list(ProductTombstone.objects.filter(deleted_at__lt=cutoff).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += ProductTombstone.objects.filter(id__in=ids).delete()[0]
@@ -1,11 +1,36 @@
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from .models import Product
-from .serializers import ProductSerializer
-from .utils.cache_utils import get_cache_key, invalidate_product_cache, product_cache
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.utils import timezone
+from .models import MAX_QUANTITY, InventorySummary, Product, ProductImport, ProductTombstone, normalize_product_name
+from .serializers import (
+    InventorySummarySerializer, LowStockThresholdSerializer, ProductSerializer, StockAdjustmentSerializer,
+    clean_product_name, find_name_conflicts
+)
+from .utils.cache_utils import (
+    CACHE_MISS, get_cache_key, get_or_rebuild, invalidate_product_cache, make_etag, refresh_product_cache,
+    set_cached_product
+)
 import json
 import logging
+from .filters import (
+    ORDERING_PARAM, ProductOrderingFilter, ProductRangeFilter, ProductSearchFilter, get_product_filters
+)
 from .permissions import IsOwner
+from .pagination import ProductCursorPagination
+from .responses import PrerenderedJSONResponse, render_json
+from .utils.count_utils import get_product_count
+from .utils.export_utils import EXPORT_FORMATS
+from .utils.row_encoder import encode_products, product_rows
+from .utils.sync_utils import DEFAULT_CHANGES_LIMIT, MAX_CHANGES_LIMIT, CursorExpired, InvalidCursor, get_changes
+from .utils.low_stock_utils import get_low_stock, index_quantities, reconcile_low_stock, unindex_products
+from .utils.import_utils import DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE, ImportFormatError, get_import_summary, open_csv, run_import
+import io
 
 # Get regular logger for views
 logger = logging.getLogger('inventory')
@@ -14,12 +39,26 @@ cache_logger = logging.getLogger('inventory.cache')
 
 # Create your views here.
 
+def is_product_id(value):
+    """
+    Whether a bulk item's id is an integer; JSON true/false are bools, not ids.
+    """
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
 class ProductViewSet(viewsets.ModelViewSet):
     """
     ViewSet for viewing and editing products with caching.
     """
     serializer_class = ProductSerializer
     permission_classes = [IsOwner]
+    filter_backends = [ProductSearchFilter, ProductRangeFilter, ProductOrderingFilter]
+    # Maximum number of items accepted by a single bulk request
+    bulk_max_items = 1000
+    # Maximum number of products returned by the low-stock watchlist
+    low_stock_max_items = 1000
+    # Times the low-stock index is corrected and re-read before answering
+    low_stock_reconcile_attempts = 3
     
     def get_queryset(self):
         """
@@ -27,45 +66,110 @@ class ProductViewSet(viewsets.ModelViewSet):
         for the currently authenticated user.
         """
         logger.info(f"Getting queryset for user: {self.request.user.id}")
-        return Product.objects.filter(user=self.request.user)
+        # Ordered by id so pages are stable and read straight off the (user, id) index
+        return Product.objects.filter(user=self.request.user).order_by('id')
+    
+    def use_cursor_pagination(self):
+        """
+        Whether the client opted into keyset pagination with ?pagination=cursor.
+        """
+        return self.action == 'list' and self.request.query_params.get('pagination') == 'cursor'
+    
+    @property
+    def paginator(self):
+        """
+        Return the cursor paginator for opted-in list requests, otherwise the default.
+        """
+        if not hasattr(self, '_paginator') and self.use_cursor_pagination():
+            self._paginator = ProductCursorPagination()
+        return super().paginator
+    
+    def count_products(self, queryset):
+        """
+        Count the products a list page is taken from, for the paginator.
+        
+        Returns:
+            tuple: (count, exact) from get_product_count
+        """
+        filters = get_product_filters(self.request.query_params)
+        filtered = any(param != ORDERING_PARAM for param in filters)
+        return get_product_count(self.request.user.id, queryset, filtered)
+    
+    def not_modified(self, request, etag):
+        """
+        Return a 304 response if the client's If-None-Match matches etag.
+
+        Tags are compared weakly, so W/"x" matches "x", and "*" matches any
+        representation; call it only once the resource is known to exist.
+        """
+        etags = parse_etags(request.headers.get('If-None-Match', ''))
+        if any(tag.removeprefix('W/') == etag or tag == '*' for tag in etags):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=self.get_cache_headers(etag))
+        return None
+    
+    def get_cache_headers(self, etag):
+        """
+        Headers letting clients revalidate cached product responses with their ETag.
+        """
+        return {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    
+    def get_list_key_params(self, request):
+        """
+        Return the get_cache_key() arguments identifying the requested list page.
+        """
+        # Include pagination and normalized filter parameters in cache key
+        params = {
+            'list_view': True,
+            'page_size': request.query_params.get('page_size', str(getattr(self.paginator, 'page_size', 10))),
+            'filters': get_product_filters(request.query_params),
+        }
+        if self.use_cursor_pagination():
+            params['cursor'] = request.query_params.get('cursor', '')
+        else:
+            params['page'] = request.query_params.get('page', '1')
+        return params
     
     def list(self, request, *args, **kwargs):
         """
         List all products with caching and pagination.
+        
+        Supports ?search=, price/quantity range filters and ?ordering=; each
+        filtered page is cached under its own key.
         """
         user_id = request.user.id
-        # Include pagination parameters in cache key
-        page = request.query_params.get('page', '1')
-        page_size = request.query_params.get('page_size', str(getattr(self.paginator, 'page_size', 10)))
-        cache_key = get_cache_key(user_id, list_view=True, page=page, page_size=page_size)
-        
-        # Try to get from cache
-        cached_data = product_cache.get(cache_key)
-        
-        if cached_data:
-            # Return cached data
-            cache_logger.info(f"Cache HIT for list: useddr {user_id}, page {page}, page_size {page_size}")
-            return Response(json.loads(cached_data))
-        
-        # If not in cache, get from database with pagination
-        cache_logger.info(f"Cache MISS for list: user {user_id}, page {page}, page_size {page_size}")
-        queryset = self.filter_queryset(self.get_queryset())
-        
-        # Apply pagination
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            response_data = self.get_paginated_response(serializer.data).data
+        key_params = self.get_list_key_params(request)
+        page, page_size = key_params.get('page', key_params.get('cursor')), key_params['page_size']
+        cache_key = get_cache_key(user_id, **key_params)
+        
+        # The key carries the user's generation, so it identifies this version of the page
+        etag = make_etag(cache_key, request.accepted_renderer.format)
+        response = self.not_modified(request, etag)
+        if response:
+            cache_logger.info(f"Not modified for list: user {user_id}, page {page}, page_size {page_size}")
+            return response
+        
+        def build():
+            # If not in cache, get from database with pagination
+            cache_logger.info(f"Cache MISS for list: user {user_id}, page {page}, page_size {page_size}")
+            # Read values() rows and encode them like ProductSerializer, without model instances
+            queryset = product_rows(self.filter_queryset(self.get_queryset()))
             
-            # Cache the paginated result
-            product_cache.set(cache_key, json.dumps(response_data))
-            logger.info(f"Returning paginated response for page {page}")
-            return Response(response_data)
+            # Apply pagination
+            page_items = self.paginate_queryset(queryset)
+            if page_items is not None:
+                return render_json(self.get_paginated_response(list(encode_products(page_items))).data)
             
-        # If pagination is disabled
-        serializer = self.get_serializer(queryset, many=True)
-        logger.info("Returning response after retrieving list")
-        return Response(serializer.data)
+            # If pagination is disabled
+            return render_json(list(encode_products(queryset)))
+        
+        # Get from cache, letting only one worker rebuild a missing or stale page
+        cached_data, outcome = get_or_rebuild(cache_key, build)
+        if outcome != CACHE_MISS:
+            cache_logger.info(f"Cache {outcome.upper()} for list: user {user_id}, page {page}, page_size {page_size}")
+        
+        logger.info(f"Returning paginated response for page {page}")
+        # Cached entries are rendered JSON bytes, sent without re-encoding
+        return PrerenderedJSONResponse(cached_data, headers=self.get_cache_headers(etag))
     
     def retrieve(self, request, *args, **kwargs):
         """
@@ -75,25 +179,28 @@ class ProductViewSet(viewsets.ModelViewSet):
         product_id = kwargs.get('pk')
         cache_key = get_cache_key(user_id, product_id)
         
-        # Try to get from cache
-        cached_data = product_cache.get(cache_key)
-        
-        if cached_data:
-            cache_logger.info(f"Cache HIT for product: {product_id}")
-            # Return cached data
-            return Response(json.loads(cached_data))
+        def build():
+            # If not in cache, get from database; a 404 raises and isn't cached
+            cache_logger.info(f"Cache MISS for product: {product_id}")
+            # The queryset only holds the user's products, so this also checks ownership
+            row = get_object_or_404(product_rows(self.filter_queryset(self.get_queryset())), pk=product_id)
+            cache_logger.info(f"Caching product: {product_id}")
+            return render_json(next(encode_products([row])))
         
-        # If not in cache, get from database
-        cache_logger.info(f"Cache MISS for product: {product_id}")
-        response = super().retrieve(request, *args, **kwargs)
+        # Get from cache, letting only one worker rebuild a missing or stale entry
+        cached_data, outcome = get_or_rebuild(cache_key, build)
+        if outcome != CACHE_MISS:
+            cache_logger.info(f"Cache {outcome.upper()} for product: {product_id}")
         
-        # Cache the result if successful
-        if response.status_code == status.HTTP_200_OK:
-            cache_logger.info(f"Caching product: {product_id}")
-            product_cache.set(cache_key, json.dumps(response.data))
+        # Detail keys carry no generation, so tag the bytes actually served
+        etag = make_etag(cached_data, request.accepted_renderer.format)
+        response = self.not_modified(request, etag)
+        if response:
+            cache_logger.info(f"Not modified for product: {product_id}")
+            return response
         
         logger.info("Returning response after retrieving product")
-        return response
+        return PrerenderedJSONResponse(cached_data, headers=self.get_cache_headers(etag))
     
     def create(self, request, *args, **kwargs):
         """
@@ -105,7 +212,8 @@ class ProductViewSet(viewsets.ModelViewSet):
             user_id = request.user.id
             # Simply invalidate all list caches for this user
             # This is simpler than trying to update all paginated caches
-            invalidate_product_cache(user_id, None)
+            refresh_product_cache(user_id, response.data['id'], response.data)
+            index_quantities(user_id, {response.data['id']: response.data['quantity']})
             logger.info(f"Invalidated list caches for user {user_id}")
         
         logger.info("Returning response after creating product")
@@ -122,43 +230,486 @@ class ProductViewSet(viewsets.ModelViewSet):
         
         if response.status_code == status.HTTP_200_OK:
             cache_logger.info(f"Invalidating caches for user {user_id}")
-            print("Invalidating caches")
-            # Invalidate both the list cache and the individual product cache
-            invalidate_product_cache(user_id, product_id)
+            # Refresh the individual product cache and invalidate the list cache
+            refresh_product_cache(user_id, product_id, response.data)
+            index_quantities(user_id, {response.data['id']: response.data['quantity']})
         
         logger.info("Returning response after updating product")
         return response
     
-    def partial_update(self, request, *args, **kwargs):
+    def destroy(self, request, *args, **kwargs):
         """
-        Partially update a product and invalidate caches.
+        Delete a product and invalidate caches.
         """
         user_id = request.user.id
         product_id = kwargs.get('pk')
         
-        response = super().partial_update(request, *args, **kwargs)
+        response = super().destroy(request, *args, **kwargs)
         
-        if response.status_code == status.HTTP_200_OK:
+        if response.status_code == status.HTTP_204_NO_CONTENT:
             cache_logger.info(f"Invalidating caches for user {user_id}")
             # Invalidate both the list cache and the individual product cache
             invalidate_product_cache(user_id, product_id)
+            unindex_products(user_id, [product_id])
         
-        logger.info("Returning response after partial updating product")
+        logger.info("Returning response after deleting product")
         return response
     
-    def destroy(self, request, *args, **kwargs):
+    def perform_destroy(self, instance):
         """
-        Delete a product and invalidate caches.
+        Delete a product, take it out of the user's inventory summary and
+        leave a tombstone for the changes feed.
+        """
+        with transaction.atomic():
+            # Lock the row so the summary delta is taken from its current values
+            current = Product.objects.select_for_update().filter(pk=instance.pk).values_list('price', 'quantity').first()
+            product_id = instance.pk
+            instance.delete()
+            if current is not None:
+                ProductTombstone.objects.create(user_id=instance.user_id, product_id=product_id)
+                price, quantity = current
+                InventorySummary.objects.apply_delta(
+                    instance.user_id, skus=-1, units=-quantity, value=-price * quantity
+                )
+    
+    @action(detail=False, methods=['get'])
+    def summary(self, request, *args, **kwargs):
+        """
+        Return the user's SKU count, total units and total stock value.
+        
+        The totals are read from a summary row maintained alongside every
+        product write, not aggregated over the products table.
+        """
+        summary = InventorySummary.objects.get_for_user(request.user.id)
+        return Response(InventorySummarySerializer(summary).data)
+    
+    @action(detail=False, methods=['get'])
+    def changes(self, request, *args, **kwargs):
+        """
+        Return products created or updated, and ids of products deleted, since a cursor.
+        
+        Start without a cursor for a full sync, then follow next_cursor while
+        has_more is true and keep the last one for the next sync. Rows near
+        the head of the feed may be sent twice, so apply them idempotently.
+        A cursor older than the tombstone retention period gets 410 Gone:
+        start over with a full sync.
+        """
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_CHANGES_LIMIT))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= MAX_CHANGES_LIMIT:
+            return Response(
+                {"limit": f"Limit must be between 1 and {MAX_CHANGES_LIMIT}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            changes = get_changes(request.user.id, request.query_params.get('cursor'), limit)
+        except CursorExpired as e:
+            return Response({"cursor": str(e)}, status=status.HTTP_410_GONE)
+        except InvalidCursor as e:
+            return Response({"cursor": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        logger.info(
+            f"Returning {len(changes['updated'])} changed and {len(changes['deleted'])} deleted products "
+            f"for user {request.user.id}"
+        )
+        return Response({**changes, 'updated': ProductSerializer(changes['updated'], many=True).data})
+    
+    @action(detail=False, methods=['get'], url_path='low-stock', url_name='low-stock')
+    def low_stock(self, request, *args, **kwargs):
+        """
+        List products whose quantity is at or below the user's low-stock threshold.
+        
+        Served from a per-user Redis sorted set of quantities, so the cost
+        grows with the number of matches rather than the catalog. Entries
+        that disagree with the table are corrected before the count is
+        taken. Pass ?threshold= to use a different level for one request.
         """
         user_id = request.user.id
-        product_id = kwargs.get('pk')
+        threshold = request.query_params.get('threshold')
+        if threshold is None:
+            threshold = InventorySummary.objects.get_for_user(user_id).low_stock_threshold
+        else:
+            try:
+                threshold = int(threshold)
+            except ValueError:
+                return Response({"threshold": "A valid integer is required."}, status=status.HTTP_400_BAD_REQUEST)
         
-        response = super().destroy(request, *args, **kwargs)
+        for attempt in range(self.low_stock_reconcile_attempts):
+            product_ids, count = get_low_stock(user_id, threshold, self.low_stock_max_items)
+            products = list(self.get_queryset().filter(id__in=product_ids).order_by('quantity', 'id'))
+            stale = [product for product in products if product.quantity > threshold]
+            if not stale and len(products) == len(product_ids):
+                break
+            # The index disagrees with the table; correct the entries it returned and read it again
+            reconcile_low_stock(
+                user_id,
+                product_ids,
+                {product.id: product.quantity for product in products}
+            )
+        # Drift that outlasted the attempts is left out of both results and count
+        products = [product for product in products if product.quantity <= threshold]
+        count = max(count - len(product_ids) + len(products), len(products))
+        return Response({
+            'low_stock_threshold': threshold,
+            'count': count,
+            'results': ProductSerializer(products, many=True).data,
+        })
+    
+    @low_stock.mapping.put
+    def set_low_stock_threshold(self, request, *args, **kwargs):
+        """
+        Set the quantity at or below which the user's products count as low stock.
+        """
+        summary = InventorySummary.objects.get_for_user(request.user.id)
+        serializer = LowStockThresholdSerializer(summary, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        logger.info(f"Set low-stock threshold of user {request.user.id} to {summary.low_stock_threshold}")
+        return Response(serializer.data)
+    
+    @action(detail=True, methods=['post'])
+    def adjust(self, request, *args, **kwargs):
+        """
+        Atomically add a signed delta to a product's quantity.
         
-        if response.status_code == status.HTTP_204_NO_CONTENT:
-            cache_logger.info(f"Invalidating caches for user {user_id}")
-            # Invalidate both the list cache and the individual product cache
-            invalidate_product_cache(user_id, product_id)
+        The update is a single conditional UPDATE ... RETURNING, so concurrent
+        adjustments never lose each other's changes and stock can't go below
+        zero. The cached detail entry is overwritten with the new state.
+        """
+        serializer = StockAdjustmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        delta = serializer.validated_data['delta']
         
-        logger.info("Returning response after deleting product")
-        return response
\ No newline at end of file
+        user_id = request.user.id
+        # The id goes into raw SQL, so anything but an integer is simply not found
+        try:
+            product_id = int(kwargs.get('pk'))
+        except (TypeError, ValueError):
+            return Response({"detail": "No Product matches the given query."}, status=status.HTTP_404_NOT_FOUND)
+        product = Product.objects.adjust_quantity(product_id, user_id, delta)
+        
+        if product is None:
+            if not self.get_queryset().filter(pk=product_id).exists():
+                return Response({"detail": "No Product matches the given query."}, status=status.HTTP_404_NOT_FOUND)
+            if delta > 0:
+                return Response(
+                    {"delta": f"Quantity cannot exceed {MAX_QUANTITY}."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response(
+                {"delta": "Insufficient stock: quantity cannot go below zero."},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        data = ProductSerializer(product).data
+        set_cached_product(user_id, product.id, data)
+        # List pages include quantities, so move them to a new generation
+        invalidate_product_cache(user_id, None)
+        index_quantities(user_id, {product.id: product.quantity})
+        logger.info(f"Adjusted quantity of product {product.id} by {delta} for user {user_id}")
+        return Response(data)
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request, *args, **kwargs):
+        """
+        Stream every product the user owns as CSV (default) or NDJSON.
+        
+        The format is chosen with ?export_format=csv|ndjson. Rows are read
+        through a server-side cursor and written as they arrive, bypassing
+        the serializer, so memory use doesn't grow with catalog size.
+        """
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"export_format": f"Unsupported format. Choose one of: {', '.join(EXPORT_FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        content_type, extension, stream = EXPORT_FORMATS[export_format]
+        logger.info(f"Streaming {export_format} export for user {request.user.id}")
+        response = StreamingHttpResponse(stream(self.get_queryset()), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="products.{extension}"'
+        return response
+    
+    @action(detail=False, methods=['post'], url_path='import', url_name='import', parser_classes=[MultiPartParser])
+    def import_csv(self, request, *args, **kwargs):
+        """
+        Import products from an uploaded CSV with name, price and quantity columns.
+        
+        Rows are validated and merged in batches (existing names are updated),
+        and an NDJSON progress line is streamed per batch. Pass the import_id
+        of an interrupted import, with the same file, to resume it.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"file": "A CSV file is required."}, status=status.HTTP_400_BAD_REQUEST)
+        
+        import_id = request.data.get('import_id')
+        if import_id:
+            try:
+                import_id = int(import_id)
+            except (TypeError, ValueError):
+                return Response({"import_id": "A valid integer is required."}, status=status.HTTP_400_BAD_REQUEST)
+            product_import = ProductImport.objects.filter(id=import_id, user=request.user).first()
+            if product_import is None or product_import.status == ProductImport.STATUS_COMPLETED:
+                return Response(
+                    {"import_id": "No resumable import found with this id."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            try:
+                batch_size = int(request.data.get('batch_size', DEFAULT_BATCH_SIZE))
+            except (TypeError, ValueError):
+                batch_size = 0
+            if not 1 <= batch_size <= MAX_BATCH_SIZE:
+                return Response(
+                    {"batch_size": f"Batch size must be between 1 and {MAX_BATCH_SIZE}."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            product_import = None
+        
+        try:
+            reader = open_csv(io.TextIOWrapper(upload, encoding='utf-8-sig', newline=''))
+        except (ImportFormatError, UnicodeDecodeError) as e:
+            return Response({"file": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if product_import is None:
+            product_import = ProductImport.objects.create(
+                user=request.user,
+                file_name=upload.name[-255:],
+                batch_size=batch_size,
+            )
+        logger.info(f"Starting import {product_import.id} for user {request.user.id}")
+        
+        def stream():
+            try:
+                for progress in run_import(product_import, reader):
+                    yield json.dumps(progress) + '\n'
+            except Exception as e:
+                yield json.dumps({**get_import_summary(product_import), 'error': str(e)}) + '\n'
+                return
+            yield json.dumps(get_import_summary(product_import)) + '\n'
+        
+        return StreamingHttpResponse(stream(), content_type='application/x-ndjson')
+    
+    def get_bulk_items(self, request):
+        """
+        Return the request body as a list of bulk items, or an error response.
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return None, Response(
+                {"error": "Expected a non-empty list of items."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > self.bulk_max_items:
+            return None, Response(
+                {"error": f"A bulk request accepts at most {self.bulk_max_items} items."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return items, None
+    
+    def get_bulk_response(self, key, results, errors, success_status=status.HTTP_200_OK):
+        """
+        Build a bulk response reporting the written items and per-item errors.
+        """
+        response_status = success_status if results or not errors else status.HTTP_400_BAD_REQUEST
+        return Response({
+            key: results,
+            'errors': [{'index': index, 'errors': errors[index]} for index in sorted(errors)]
+        }, status=response_status)
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request, *args, **kwargs):
+        """
+        Create many products in one transaction.
+        
+        Valid items are written with a single bulk_create; invalid items are
+        reported by index and skipped.
+        """
+        items, error_response = self.get_bulk_items(request)
+        if error_response:
+            return error_response
+        
+        user = request.user
+        context = {**self.get_serializer_context(), 'bulk': True}
+        errors = {}
+        validated = {}
+        for index, item in enumerate(items):
+            serializer = ProductSerializer(data=item, context=context)
+            if serializer.is_valid():
+                validated[index] = serializer.validated_data
+            else:
+                errors[index] = serializer.errors
+        
+        conflicts = find_name_conflicts(
+            user, [(index, data['name'], None) for index, data in validated.items()]
+        )
+        products = []
+        for index, data in validated.items():
+            if index in conflicts:
+                errors[index] = {'name': [conflicts[index]]}
+                continue
+            name = clean_product_name(data['name'])
+            products.append(Product(
+                user=user,
+                name=name,
+                normalized_name=normalize_product_name(name),
+                price=data['price'],
+                quantity=data.get('quantity', 0),
+            ))
+        
+        if products:
+            try:
+                with transaction.atomic():
+                    products = Product.objects.bulk_create(products)
+                    InventorySummary.objects.apply_delta(
+                        user.id,
+                        skus=len(products),
+                        units=sum(product.quantity for product in products),
+                        value=sum(product.price * product.quantity for product in products),
+                    )
+            except IntegrityError:
+                # A concurrent write claimed one of the names after validation
+                return Response(
+                    {"error": "One or more product names are already in use. No products were created."},
+                    status=status.HTTP_409_CONFLICT
+                )
+            invalidate_product_cache(user.id, None)
+            index_quantities(user.id, {product.id: product.quantity for product in products})
+            logger.info(f"Bulk created {len(products)} products for user {user.id}")
+        
+        results = ProductSerializer(products, many=True).data
+        return self.get_bulk_response('created', results, errors, status.HTTP_201_CREATED)
+    
+    @bulk.mapping.patch
+    def bulk_update(self, request, *args, **kwargs):
+        """
+        Partially update many products, given with their ids, in one transaction.
+        """
+        items, error_response = self.get_bulk_items(request)
+        if error_response:
+            return error_response
+        
+        user = request.user
+        ids = [item.get('id') for item in items if isinstance(item, dict)]
+        context = {**self.get_serializer_context(), 'bulk': True}
+        errors = {}
+        products = []
+        try:
+            with transaction.atomic():
+                # Lock the rows before reading them, so concurrent writes are applied
+                # on top of rather than overwritten with the values read here
+                instances = self.get_queryset().select_for_update().in_bulk([pk for pk in ids if is_product_id(pk)])
+                validated = {}
+                seen_ids = set()
+                for index, item in enumerate(items):
+                    product_id = item.get('id') if isinstance(item, dict) else None
+                    instance = instances.get(product_id) if is_product_id(product_id) else None
+                    if instance is None:
+                        errors[index] = {'id': ['Not found.']}
+                        continue
+                    if product_id in seen_ids:
+                        errors[index] = {'id': ['Duplicate id in request.']}
+                        continue
+                    seen_ids.add(product_id)
+                    serializer = ProductSerializer(instance, data=item, partial=True, context=context)
+                    if serializer.is_valid():
+                        validated[index] = (instance, serializer.validated_data)
+                    else:
+                        errors[index] = serializer.errors
+                
+                conflicts = find_name_conflicts(user, [
+                    (index, data['name'], instance.id)
+                    for index, (instance, data) in validated.items() if 'name' in data
+                ])
+                old_units = old_value = 0
+                # Products by the fields their item supplied, so no other field is written back
+                by_fields = {}
+                now = timezone.now()
+                for index, (instance, data) in validated.items():
+                    if index in conflicts:
+                        errors[index] = {'name': [conflicts[index]]}
+                        continue
+                    old_units += instance.quantity
+                    old_value += instance.price * instance.quantity
+                    fields = ['updated_at']
+                    if 'name' in data:
+                        instance.name = clean_product_name(data['name'])
+                        instance.normalized_name = normalize_product_name(instance.name)
+                        fields += ['name', 'normalized_name']
+                    for field in ('price', 'quantity'):
+                        if field in data:
+                            setattr(instance, field, data[field])
+                            fields.append(field)
+                    # bulk_update() doesn't run auto_now, so stamp the time ourselves
+                    instance.updated_at = now
+                    by_fields.setdefault(tuple(fields), []).append(instance)
+                    products.append(instance)
+                
+                for fields, group in by_fields.items():
+                    Product.objects.bulk_update(group, fields)
+                if products:
+                    InventorySummary.objects.apply_delta(
+                        user.id,
+                        units=sum(product.quantity for product in products) - old_units,
+                        value=sum(product.price * product.quantity for product in products) - old_value,
+                    )
+        except IntegrityError:
+            return Response(
+                {"error": "One or more product names are already in use. No products were updated."},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        if products:
+            invalidate_product_cache(user.id, product_ids=[product.id for product in products])
+            index_quantities(user.id, {product.id: product.quantity for product in products})
+            logger.info(f"Bulk updated {len(products)} products for user {user.id}")
+        
+        results = ProductSerializer(products, many=True).data
+        return self.get_bulk_response('updated', results, errors)
+    
+    @bulk.mapping.delete
+    def bulk_destroy(self, request, *args, **kwargs):
+        """
+        Delete many products, given as a list of ids, in one query.
+        """
+        ids, error_response = self.get_bulk_items(request)
+        if error_response:
+            return error_response
+        
+        user = request.user
+        with transaction.atomic():
+            rows = list(
+                self.get_queryset().filter(id__in=[pk for pk in ids if is_product_id(pk)])
+                .select_for_update().values_list('id', 'price', 'quantity')
+            )
+            existing = {pk for pk, _, _ in rows}
+            if existing:
+                self.get_queryset().filter(id__in=existing).delete()
+                ProductTombstone.objects.bulk_create([
+                    ProductTombstone(user=user, product_id=pk) for pk in sorted(existing)
+                ])
+                InventorySummary.objects.apply_delta(
+                    user.id,
+                    skus=-len(rows),
+                    units=-sum(quantity for _, _, quantity in rows),
+                    value=-sum(price * quantity for _, price, quantity in rows),
+                )
+        
+        errors = {}
+        deleted = []
+        for index, pk in enumerate(ids):
+            if not is_product_id(pk) or pk not in existing:
+                errors[index] = {'id': ['Not found.']}
+            elif pk not in deleted:
+                deleted.append(pk)
+        if existing:
+            invalidate_product_cache(user.id, product_ids=existing)
+            unindex_products(user.id, existing)
+            logger.info(f"Bulk deleted {len(existing)} products for user {user.id}")
+        
+        return self.get_bulk_response('deleted', deleted, errors)
\ No newline at end of file
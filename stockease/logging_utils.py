@@ -0,0 +1,124 @@
+"""
+Logging setup that keeps log I/O off the request path.
+
+With LOG_QUEUE on, the handlers of the configured loggers are moved behind
+queues: request threads only enqueue records, and a QueueListener thread
+per handler formats and writes them. Records can be formatted as JSON, and
+chatty loggers sampled before they are queued.
+"""
+from django.conf import settings
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import copy
+import json
+import logging
+import logging.config
+import queue
+import random
+
+# LogRecord attributes that aren't passed with extra=
+RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line.
+
+    Fields passed with extra= are included as they are, or as strings if
+    they aren't JSON serializable.
+    """
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        data.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES)
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+    def formatTime(self, record, datefmt=None):
+        return super().formatTime(record, datefmt or '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}'
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Let through a fraction of a logger's records below WARNING.
+
+    Warnings and errors are always kept.
+    """
+    def __init__(self, rate=1.0, name=''):
+        super().__init__(name)
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class LogQueueHandler(QueueHandler):
+    """
+    Queue handler for a listener thread in the same process.
+
+    Only the message is resolved when a record is queued, in case its
+    arguments change later; formatting is left to the listener's handler.
+    """
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Drop the record rather than block the request behind a slow handler
+            pass
+
+
+def queue_handlers(logger_names, maxsize=10000):
+    """
+    Move the handlers of the named loggers behind queues.
+
+    Each distinct handler gets one LogQueueHandler and a QueueListener
+    thread writing to it; loggers sharing a handler share its queue.
+
+    Args:
+        logger_names: Names of the loggers to rewire ('' for the root logger)
+        maxsize: Maximum records waiting in each queue
+
+    Returns:
+        list: The started QueueListeners; they are stopped, writing out
+        queued records, at exit
+    """
+    wrapped = {}
+    listeners = []
+    for name in logger_names:
+        logger = logging.getLogger(name or None)
+        for index, handler in enumerate(logger.handlers):
+            if isinstance(handler, QueueHandler):
+                continue
+            if handler not in wrapped:
+                records = queue.Queue(maxsize)
+                wrapped[handler] = LogQueueHandler(records)
+                listener = QueueListener(records, handler, respect_handler_level=True)
+                listener.start()
+                atexit.register(listener.stop)
+                listeners.append(listener)
+            logger.handlers[index] = wrapped[handler]
+    return listeners
+
+
+def configure_logging(logging_settings):
+    """
+    LOGGING_CONFIG callable: apply LOGGING, then queue its handlers when
+    LOG_QUEUE is on.
+    """
+    logging.config.dictConfig(logging_settings)
+    if settings.LOG_QUEUE:
+        logger_names = list(logging_settings.get('loggers', {}))
+        if 'root' in logging_settings:
+            logger_names.append('')
+        queue_handlers(logger_names)
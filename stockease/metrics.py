@@ -0,0 +1,464 @@
+"""
+Per-request performance metrics.
+
+PerformanceMetricsMiddleware collects, for each request, the database
+queries and their time, cache operations and hits per cache alias, and the
+time spent serializing responses. It reports them in a Server-Timing header
+and aggregates them into histograms labelled by route name, served in
+Prometheus text format by metrics_view.
+
+Each worker buffers its observations and a background thread adds them to
+totals shared in Redis every METRICS_FLUSH_INTERVAL seconds, so whichever
+worker answers a scrape reports every worker's requests.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django_redis import get_redis_connection
+from django_redis.cache import RedisCache
+import bisect
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Metrics of the request being handled in the current context
+_current = ContextVar('request_metrics', default=None)
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Route label for requests that didn't resolve to a URL pattern
+UNMATCHED_ROUTE = 'unmatched'
+# Method label values; others are reported as 'other' to bound the number of series
+HTTP_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+# Cache whose Redis holds the totals shared by every worker
+METRICS_CACHE = 'product_cache'
+
+
+class RequestMetrics:
+    """
+    Timings and counts of one request.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+        # alias -> [operations, hits, misses, seconds]
+        self.caches = {}
+
+    def record_cache(self, alias, duration, hits=0, misses=0):
+        stats = self.caches.setdefault(alias, [0, 0, 0, 0.0])
+        stats[0] += 1
+        stats[1] += hits
+        stats[2] += misses
+        stats[3] += duration
+
+    def server_timing(self, total):
+        """
+        Format the metrics as a Server-Timing header value, durations in ms.
+        """
+        entries = [f'db;dur={self.db_time * 1000:.2f};desc="queries={self.db_queries}"']
+        for alias, (operations, hits, misses, duration) in sorted(self.caches.items()):
+            entries.append(
+                f'cache-{alias};dur={duration * 1000:.2f};desc="ops={operations} hits={hits} misses={misses}"'
+            )
+        entries.append(f'serialize;dur={self.serialization_time * 1000:.2f}')
+        entries.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(entries)
+
+
+def record_cache_operation(alias, duration, hits=0, misses=0):
+    """
+    Count a cache operation made outside the cache API (e.g. redis.asyncio).
+    """
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.record_cache(alias, duration, hits, misses)
+
+
+@contextmanager
+def time_serialization():
+    """
+    Add the time spent in the block to the request's serialization time.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serialization_time += time.perf_counter() - started
+
+
+def count_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper timing each query of the current request.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def instrument_connection(connection, **kwargs):
+    """
+    Install count_query on a database connection, once.
+    """
+    if count_query not in connection.execute_wrappers:
+        # First, so execute_wrapper() blocks popping the last wrapper don't remove it
+        connection.execute_wrappers.insert(0, count_query)
+
+
+def instrument_new_connection(sender, connection, **kwargs):
+    instrument_connection(connection)
+
+
+# A module-level receiver, as signals only hold weak references to receivers
+connection_created.connect(instrument_new_connection)
+
+
+class InstrumentedRedisCache(RedisCache):
+    """
+    django-redis cache backend counting operations and hits per request.
+
+    The label used in metrics is the cache's METRICS_LABEL setting, e.g.
+    'product_cache', falling back to its location.
+    """
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        self.metrics_label = params.get('METRICS_LABEL', server)
+
+    def _record(self, started, hits=0, misses=0):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.record_cache(self.metrics_label, time.perf_counter() - started, hits, misses)
+
+    def get(self, key, default=None, *args, **kwargs):
+        started = time.perf_counter()
+        value = super().get(key, default, *args, **kwargs)
+        found = value is not default
+        self._record(started, hits=int(found), misses=int(not found))
+        return value
+
+    def get_many(self, keys, *args, **kwargs):
+        started = time.perf_counter()
+        values = super().get_many(keys, *args, **kwargs)
+        self._record(started, hits=len(values), misses=len(keys) - len(values))
+        return values
+
+
+def _instrument_operation(name):
+    def operation(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return getattr(RedisCache, name)(self, *args, **kwargs)
+        finally:
+            self._record(started)
+    operation.__name__ = name
+    return operation
+
+
+for _name in ('set', 'set_many', 'add', 'delete', 'delete_many', 'delete_pattern', 'incr', 'decr', 'touch',
+              'has_key', 'ttl', 'expire', 'persist', 'clear'):
+    if hasattr(RedisCache, _name):
+        setattr(InstrumentedRedisCache, _name, _instrument_operation(_name))
+
+
+class Histogram:
+    """
+    Thread-safe Prometheus histogram with labels.
+
+    Observations are buffered in the process until drained by
+    flush_metrics(), which adds them to the totals in Redis.
+    """
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # labels -> [bucket counts..., sum, count] observed since the last flush
+        self._series = {}
+
+    @property
+    def key(self):
+        """
+        The Redis hash holding the histogram's totals.
+        """
+        return f'metrics:{self.name}'
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.setdefault(labels, [0] * len(self.buckets) + [0.0, 0])
+            # Buckets are stored non-cumulatively and summed when rendered
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def drain(self):
+        """
+        Take the observations buffered since the last call.
+        """
+        with self._lock:
+            series, self._series = self._series, {}
+        return series
+
+    def restore(self, series):
+        """
+        Put drained observations back, e.g. after a failed flush.
+        """
+        with self._lock:
+            for labels, values in series.items():
+                current = self._series.setdefault(labels, [0] * len(self.buckets) + [0.0, 0])
+                for index, value in enumerate(values):
+                    current[index] += value
+
+    def collect(self, totals):
+        """
+        Render the histogram's totals, read from its Redis hash, in Prometheus
+        text format.
+        """
+        series = {}
+        for field, value in totals.items():
+            index, _, labels = field.decode().partition(':')
+            values = series.setdefault(tuple(json.loads(labels)), [0] * len(self.buckets) + [0.0, 0])
+            values[int(index)] = float(value)
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, values in sorted(series.items()):
+            label_text = ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += int(count)
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {int(values[-1])}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {values[-2]}')
+            lines.append(f'{self.name}_count{{{label_text}}} {int(values[-1])}')
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_DURATION = Histogram(
+    'stockease_request_duration_seconds', 'Time to handle a request.', ('route', 'method'), DURATION_BUCKETS
+)
+DB_QUERIES = Histogram(
+    'stockease_db_queries', 'Database queries per request.', ('route',), COUNT_BUCKETS
+)
+DB_DURATION = Histogram(
+    'stockease_db_duration_seconds', 'Time spent in database queries per request.', ('route',), DURATION_BUCKETS
+)
+CACHE_OPERATIONS = Histogram(
+    'stockease_cache_operations', 'Cache operations per request, by cache alias.', ('route', 'cache'), COUNT_BUCKETS
+)
+CACHE_HIT_RATIO = Histogram(
+    'stockease_cache_hit_ratio', 'Share of cache reads per request that were hits, by cache alias.',
+    ('route', 'cache'), (0, 0.25, 0.5, 0.75, 0.9, 1)
+)
+CACHE_DURATION = Histogram(
+    'stockease_cache_duration_seconds', 'Time spent in cache operations per request, by cache alias.',
+    ('route', 'cache'), DURATION_BUCKETS
+)
+SERIALIZATION_DURATION = Histogram(
+    'stockease_serialization_duration_seconds', 'Time spent serializing responses per request.', ('route',),
+    DURATION_BUCKETS
+)
+HISTOGRAMS = (
+    REQUEST_DURATION, DB_QUERIES, DB_DURATION, CACHE_OPERATIONS, CACHE_HIT_RATIO, CACHE_DURATION,
+    SERIALIZATION_DURATION,
+)
+
+
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def flush_metrics():
+    """
+    Add this worker's buffered observations to the totals in Redis, in one
+    round trip. Observations are kept for the next flush if Redis fails.
+    """
+    drained = [(histogram, histogram.drain()) for histogram in HISTOGRAMS]
+    pipeline = get_redis_connection(METRICS_CACHE).pipeline(transaction=False)
+    for histogram, series in drained:
+        for labels, values in series.items():
+            field_labels = json.dumps(labels)
+            for index, value in enumerate(values):
+                if value:
+                    pipeline.hincrbyfloat(histogram.key, f'{index}:{field_labels}', value)
+    if not len(pipeline):
+        return
+    try:
+        pipeline.execute()
+    except Exception as error:
+        logger.warning(f"Failed to flush request metrics: {error}")
+        for histogram, series in drained:
+            histogram.restore(series)
+
+
+def start_flusher():
+    """
+    Flush this worker's metrics every METRICS_FLUSH_INTERVAL seconds on a
+    background thread, started on first use so it runs in each forked worker.
+    """
+    global _flusher
+    if _flusher is not None:
+        return
+    with _flusher_lock:
+        if _flusher is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(settings.METRICS_FLUSH_INTERVAL)
+                flush_metrics()
+
+        _flusher = threading.Thread(target=run, name='metrics-flusher', daemon=True)
+        _flusher.start()
+
+
+def observe_request(route, method, metrics, total):
+    """
+    Add one request's metrics to the histograms.
+    """
+    start_flusher()
+    REQUEST_DURATION.observe((route, method), total)
+    DB_QUERIES.observe((route,), metrics.db_queries)
+    DB_DURATION.observe((route,), metrics.db_time)
+    for alias, (operations, hits, misses, duration) in metrics.caches.items():
+        CACHE_OPERATIONS.observe((route, alias), operations)
+        CACHE_DURATION.observe((route, alias), duration)
+        if hits + misses:
+            CACHE_HIT_RATIO.observe((route, alias), hits / (hits + misses))
+    SERIALIZATION_DURATION.observe((route,), metrics.serialization_time)
+
+
+def get_route(request):
+    """
+    Get the URL pattern name a request resolved to, e.g. 'product-list'.
+    """
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else UNMATCHED_ROUTE
+
+
+def metrics_view(request):
+    """
+    Serve every worker's request histograms in Prometheus text format.
+
+    Scrapers must send METRICS_TOKEN as a bearer token. Without a token the
+    endpoint is only served when DEBUG is on.
+    """
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponse(status=403)
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    # Include this worker's latest requests, which the flusher may not have sent yet
+    flush_metrics()
+    pipeline = get_redis_connection(METRICS_CACHE).pipeline(transaction=False)
+    for histogram in HISTOGRAMS:
+        pipeline.hgetall(histogram.key)
+    totals = pipeline.execute()
+    lines = [line for histogram, values in zip(HISTOGRAMS, totals) for line in histogram.collect(values)]
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class PerformanceMetricsMiddleware:
+    """
+    Measure each request and report it in Server-Timing and the histograms.
+
+    Works in both sync (WSGI) and async (ASGI) stacks. Place it first in
+    MIDDLEWARE so the total covers the other middleware too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics, token = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics, token = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def start(self):
+        # Connections opened before the signal was connected aren't wrapped yet
+        for connection in connections.all(initialized_only=True):
+            instrument_connection(connection)
+        metrics = RequestMetrics()
+        return metrics, _current.set(metrics)
+
+    def process_template_response(self, request, response):
+        """
+        Time the rendering of DRF responses, which happens after the view returns.
+        """
+        metrics = _current.get()
+        if metrics is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                metrics.serialization_time += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+        response['Server-Timing'] = metrics.server_timing(total)
+        route = get_route(request)
+        method = request.method if request.method in HTTP_METHODS else 'other'
+        if not response.streaming:
+            observe_request(route, method, metrics, total)
+            return response
+
+        # A streaming body is produced while it is sent, so the request is
+        # observed when the server closes the response; Server-Timing can
+        # only cover the time to the headers
+        close = response.close
+
+        def close_and_observe():
+            try:
+                close()
+            finally:
+                observe_request(route, method, metrics, time.perf_counter() - metrics.started)
+
+        response.close = close_and_observe
+        return response
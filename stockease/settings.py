@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
@@ -50,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [  
+    'stockease.metrics.PerformanceMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -145,23 +147,48 @@ CACHES = {
         'LOCATION': 'unique-snowflake',
     },
     'otp_cache': { 
-        'BACKEND': 'django_redis.cache.RedisCache',
+        'BACKEND': 'stockease.metrics.InstrumentedRedisCache',
         'LOCATION': REDIS_URL,
         'TIMEOUT': 300,
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
-        }
+        },
+        'METRICS_LABEL': 'otp_cache',
     },
     'product_cache': {
-        'BACKEND': 'django_redis.cache.RedisCache',
+        'BACKEND': 'stockease.metrics.InstrumentedRedisCache',
         'LOCATION': f'{REDIS_URL}/1',
         'TIMEOUT': 3600,  # 1 hour cache timeout
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
-        }
+        },
+        'METRICS_LABEL': 'product_cache',
     }
 }
 
+# Write updated products into their detail cache entries instead of deleting them
+PRODUCT_CACHE_WRITE_THROUGH = os.getenv('PRODUCT_CACHE_WRITE_THROUGH', 'False').lower() in ('true', '1')
+# Seconds a product cache entry is served before one worker rebuilds it
+PRODUCT_CACHE_SOFT_TIMEOUT = int(os.getenv('PRODUCT_CACHE_SOFT_TIMEOUT', 300))
+# Seconds a worker may hold the lock while rebuilding a cache entry
+PRODUCT_CACHE_LOCK_TIMEOUT = 10
+# Seconds other workers wait for that rebuild before doing it themselves
+PRODUCT_CACHE_LOCK_WAIT = 2
+# Optional per-worker in-process cache in front of the Redis product cache
+PRODUCT_CACHE_L1_ENABLED = os.getenv('PRODUCT_CACHE_L1_ENABLED', 'False').lower() in ('true', '1')
+PRODUCT_CACHE_L1_MAX_ENTRIES = int(os.getenv('PRODUCT_CACHE_L1_MAX_ENTRIES', 1024))
+# Seconds an L1 entry lives; bounds staleness if an invalidation message is missed
+PRODUCT_CACHE_L1_TIMEOUT = int(os.getenv('PRODUCT_CACHE_L1_TIMEOUT', 5))
+# Filtered product lists are counted exactly up to this many rows, then estimated
+PRODUCT_COUNT_EXACT_LIMIT = int(os.getenv('PRODUCT_COUNT_EXACT_LIMIT', 10000))
+# Serve product list/retrieve GETs from async views; only useful under an ASGI server
+PRODUCT_ASYNC_READS = os.getenv('PRODUCT_ASYNC_READS', 'False').lower() in ('true', '1')
+# Seconds the changes feed re-sends recent rows for, in case they were still
+# committing; must exceed the longest product write transaction (an import batch)
+PRODUCT_CHANGES_SETTLE_SECONDS = int(os.getenv('PRODUCT_CHANGES_SETTLE_SECONDS', 5))
+# Days deleted products are kept for the changes feed; older sync cursors must resync
+PRODUCT_TOMBSTONE_RETENTION_DAYS = int(os.getenv('PRODUCT_TOMBSTONE_RETENTION_DAYS', 30))
+
 EMAIL_BACKEND = os.getenv('EMAIL_BACKEND')
 EMAIL_HOST = os.getenv('EMAIL_HOST')
 EMAIL_PORT = os.getenv('EMAIL_PORT')
@@ -206,7 +233,22 @@ SIMPLE_JWT = {
     'JTI_CLAIM': 'jti',
 }
 
+# Metrics Configuration
+# Bearer token required to scrape /metrics. When unset, /metrics is only
+# served with DEBUG on
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+# Seconds between each worker's flushes of its request metrics to Redis
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+
 # Logging Configuration
+# Write logs from a background thread, so requests only queue their records
+LOG_QUEUE = os.getenv('LOG_QUEUE', 'False').lower() in ('true', '1')
+# 'simple' for plain text, 'json' for one structured record per line
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'simple')
+# Fraction of inventory.cache hit/miss lines (below WARNING) that are logged
+LOG_CACHE_SAMPLE_RATE = float(os.getenv('LOG_CACHE_SAMPLE_RATE', 1.0))
+
+LOGGING_CONFIG = 'stockease.logging_utils.configure_logging'
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -215,12 +257,21 @@ LOGGING = {
             'format': '{levelname} {asctime} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'stockease.logging_utils.JSONFormatter',
+        },
+    },
+    'filters': {
+        'cache_sampling': {
+            '()': 'stockease.logging_utils.SamplingFilter',
+            'rate': LOG_CACHE_SAMPLE_RATE,
+        },
     },
     'handlers': {
         'console': {
             'level': 'DEBUG',
             'class': 'logging.StreamHandler',
-            'formatter': 'simple',
+            'formatter': LOG_FORMAT,
         },
     },
     'loggers': {
@@ -237,6 +288,7 @@ LOGGING = {
         'inventory.cache': {
             'handlers': ['console'],
             'level': 'DEBUG',
+            'filters': ['cache_sampling'],
             'propagate': False,
         },
         'accounts': {
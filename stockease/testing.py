@@ -0,0 +1,122 @@
+"""
+Test helpers for holding endpoints to a query and Redis command budget.
+
+QueryBudgetMixin.assertWithinBudget() runs a block, typically one API
+request, and fails when it made more database queries or Redis commands
+than the budget named in the test case's query_budgets table allows. The
+failure lists every query and command made, so N+1 queries and extra
+COUNTs show up with their SQL.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from typing import NamedTuple
+from unittest.mock import patch
+import redis.asyncio.client
+import redis.client
+
+# Commands sent by the Redis clients in the current context, while counting
+_commands = ContextVar('redis_commands', default=None)
+
+
+class Budget(NamedTuple):
+    """
+    Most database queries and Redis commands an endpoint may make.
+    """
+    queries: int
+    redis_commands: int
+
+
+def _record(commands):
+    recorded = _commands.get()
+    if recorded is not None:
+        recorded.extend(' '.join(_text(arg) for arg in command[:2]) for command in commands)
+
+
+def _text(arg):
+    text = arg.decode(errors='replace') if isinstance(arg, bytes) else str(arg)
+    # Scripts sent with EVAL are shown by their first line
+    return text.strip().partition('\n')[0]
+
+
+class RedisCommandCounter:
+    """
+    Context manager recording the commands sent by every Redis client,
+    sync and async, pipelines included, from the current context.
+
+    Clients in other threads' contexts, such as the L1 invalidation
+    listener, aren't counted. Each command is recorded as its name and
+    first argument, e.g. 'GET :1:product:1:2'.
+    """
+    def __init__(self):
+        self.commands = []
+
+    def __len__(self):
+        return len(self.commands)
+
+    def __enter__(self):
+        def execute_command(client, *args, **options):
+            _record([args])
+            return original_execute_command(client, *args, **options)
+
+        def execute_pipeline(pipeline, *args, **kwargs):
+            _record(command for command, _ in pipeline.command_stack)
+            return original_execute_pipeline(pipeline, *args, **kwargs)
+
+        async def aexecute_command(client, *args, **options):
+            _record([args])
+            return await original_aexecute_command(client, *args, **options)
+
+        async def aexecute_pipeline(pipeline, *args, **kwargs):
+            _record(command for command, _ in pipeline.command_stack)
+            return await original_aexecute_pipeline(pipeline, *args, **kwargs)
+
+        original_execute_command = redis.client.Redis.execute_command
+        original_execute_pipeline = redis.client.Pipeline.execute
+        original_aexecute_command = redis.asyncio.client.Redis.execute_command
+        original_aexecute_pipeline = redis.asyncio.client.Pipeline.execute
+        self._patches = [
+            patch.object(redis.client.Redis, 'execute_command', execute_command),
+            patch.object(redis.client.Pipeline, 'execute', execute_pipeline),
+            patch.object(redis.asyncio.client.Redis, 'execute_command', aexecute_command),
+            patch.object(redis.asyncio.client.Pipeline, 'execute', aexecute_pipeline),
+        ]
+        for redis_patch in self._patches:
+            redis_patch.start()
+        self._token = _commands.set(self.commands)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _commands.reset(self._token)
+        for redis_patch in reversed(self._patches):
+            redis_patch.stop()
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin checking blocks against a table of named budgets.
+
+    Example:
+        query_budgets = {'product-list (cached)': Budget(queries=1, redis_commands=2)}
+
+        with self.assertWithinBudget('product-list (cached)'):
+            self.client.get(reverse('product-list'))
+    """
+    query_budgets = {}
+
+    @contextmanager
+    def assertWithinBudget(self, name, using='default'):
+        budget = self.query_budgets[name]
+        with CaptureQueriesContext(connections[using]) as queries, RedisCommandCounter() as commands:
+            yield
+        if len(queries) > budget.queries:
+            self.fail(
+                f"{name}: {len(queries)} queries, budget {budget.queries}:\n"
+                + '\n'.join(f"{i}. {query['sql']}" for i, query in enumerate(queries.captured_queries, start=1))
+            )
+        if len(commands) > budget.redis_commands:
+            self.fail(
+                f"{name}: {len(commands)} Redis commands, budget {budget.redis_commands}:\n"
+                + '\n'.join(f"{i}. {command}" for i, command in enumerate(commands.commands, start=1))
+            )
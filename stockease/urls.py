@@ -17,6 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
+from .metrics import metrics_view
 
 def health_check(request):
     return JsonResponse({"status": "ok"})
@@ -27,4 +28,5 @@ urlpatterns = [
     path("api/users/", include("accounts.user_urls")),
     path("api/products/", include("inventory.urls")), 
     path("health/", health_check),
+    path("metrics", metrics_view, name="metrics"),
 ]
\ No newline at end of file